@@ -0,0 +1,276 @@
+"""Artwork requirement checks for per-method print files.
+
+Each method image is analyzed once per file content: pixel size, embedded
+DPI, how many distinct colors it uses and how much of it is (partly)
+transparent. Analysis runs in the process pool on a downsampled copy and
+is stored in `artwork_analysis` by file hash. Checking an analysis against
+a method's rules and the product's color limit is cheap and done per
+request, so editing a product's spec cells never needs a re-analysis.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import NamedTuple, Optional
+from database import UPLOADS_DIR, connection
+from imaging import HASH_CHARS
+from specs import METHOD_FIELDS
+from workers import WORKER_PROCESSES, run_in_process, spawn
+
+logger = logging.getLogger(__name__)
+
+# Bump when analyze_artwork changes so stored analyses are redone
+ANALYSIS_VERSION = 1
+# Images are downsampled to at most this many pixels a side before counting colors
+ANALYSIS_MAX_SIDE = 512
+# Colors are counted after quantizing to this many; a count this high means full color
+MAX_PALETTE = 32
+# A color counts once it covers this share of the opaque area (drops anti-aliasing)
+COLOR_MIN_SHARE = 0.01
+# Pixels with alpha >= this are opaque enough to print
+OPAQUE_ALPHA = 128
+# Share of partly transparent pixels tolerated by methods that can't print them
+SEMI_TRANSPARENT_LIMIT = 0.01
+CHECK_BATCH = 200  # products per query in catalog-wide checks
+
+_CONTENT_NAME = re.compile(rf"[0-9a-f]{{{HASH_CHARS}}}")
+
+
+class ArtworkRule(NamedTuple):
+    min_dpi: int  # when the file says its DPI
+    min_side: int  # pixels on the short side
+    semi_transparency: bool  # can reproduce partial opacity (gradients into the substrate)
+    transparent_background: bool  # transparent areas simply stay unprinted
+
+
+METHOD_RULES = {
+    "screen_printing": ArtworkRule(300, 1000, False, True),
+    "uv_printing": ArtworkRule(300, 1000, True, True),
+    "offset_printing": ArtworkRule(300, 1200, True, False),
+    "digital_printing": ArtworkRule(300, 1000, True, False),
+    "laser_engraving": ArtworkRule(300, 800, False, True),
+    "dtg_dtf": ArtworkRule(150, 1500, True, True),
+    "embroidery": ArtworkRule(72, 500, False, True),
+    "sublimation": ArtworkRule(150, 1500, True, False),
+}
+METHOD_NAMES = {field: name for name, field in METHOD_FIELDS}
+
+
+# ── Analysis (worker processes) ───────────────────────────────────────────────
+
+def analyze_artwork(path: str) -> dict:
+    """Measure an image file; runs in a worker process. Files Pillow can't
+    decode come back as {"unreadable": reason}.
+
+    Colors and transparency are measured on a nearest-neighbour downsample,
+    which keeps the original palette (no blended edge colors) while making
+    quantization cost independent of the upload's size.
+    """
+    import numpy as np
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            fmt = img.format or ""
+            width, height = img.size
+            dpi = img.info.get("dpi")
+            img.draft("RGB", (ANALYSIS_MAX_SIDE, ANALYSIS_MAX_SIDE))  # JPEG: decode at reduced scale
+            # Downsample in the file's own mode, then convert only the small copy
+            img.thumbnail((ANALYSIS_MAX_SIDE, ANALYSIS_MAX_SIDE), Image.NEAREST)
+            img = img.convert("RGBA")
+    except FileNotFoundError:
+        raise
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        return {"unreadable": str(exc) or type(exc).__name__}
+
+    pixels = np.asarray(img).reshape(-1, 4)
+    alpha = pixels[:, 3]
+    opaque = alpha >= OPAQUE_ALPHA
+    colors = 0
+    if opaque.any():
+        solid = Image.fromarray(np.ascontiguousarray(pixels[opaque, :3]).reshape(-1, 1, 3), "RGB")
+        quantized = solid.quantize(colors=MAX_PALETTE, method=Image.Quantize.FASTOCTREE)
+        counts = np.bincount(np.asarray(quantized).ravel(), minlength=MAX_PALETTE)
+        colors = int((counts >= COLOR_MIN_SHARE * opaque.sum()).sum())
+    return {
+        "width": width,
+        "height": height,
+        "format": fmt,
+        "dpi": round(float(min(dpi)), 1) if dpi and min(dpi) > 0 else None,
+        "colors": colors,
+        "transparent": round(float((alpha == 0).mean()), 4),
+        "semi_transparent": round(float(((alpha > 0) & (alpha < 255)).mean()), 4),
+    }
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+
+def file_hash(filename: str) -> str:
+    """Content hash of an upload; free for content-addressed names."""
+    stem = os.path.splitext(filename)[0]
+    if _CONTENT_NAME.fullmatch(stem):
+        return stem
+    digest = hashlib.sha256()
+    with open(os.path.join(UPLOADS_DIR, filename), "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_CHARS]
+
+
+async def load_analyses(db, hashes) -> dict:
+    """{file_hash: analysis} for the hashes already analyzed by this version."""
+    hashes = list(dict.fromkeys(hashes))
+    found = {}
+    for start in range(0, len(hashes), CHECK_BATCH):
+        chunk = hashes[start:start + CHECK_BATCH]
+        cursor = await db.execute(f"""
+            SELECT file_hash, analysis FROM artwork_analysis
+            WHERE version = ? AND file_hash IN ({','.join('?' * len(chunk))})
+        """, [ANALYSIS_VERSION, *chunk])
+        found.update((h, json.loads(a)) for h, a in await cursor.fetchall())
+    return found
+
+
+async def _analyze(filename: str, digest: str):
+    try:
+        return digest, await run_in_process(analyze_artwork, os.path.join(UPLOADS_DIR, filename))
+    except FileNotFoundError:
+        return None, None  # removed since it was hashed
+
+
+async def analyze_files(filenames, refresh: bool = False) -> dict:
+    """{filename: analysis or None (file missing)}, analyzing cache misses in
+    parallel across the process pool and storing the results."""
+    hashes = {}
+    for filename in dict.fromkeys(f for f in filenames if f):
+        try:
+            hashes[filename] = await asyncio.to_thread(file_hash, filename)
+        except FileNotFoundError:
+            hashes[filename] = None
+    known = {}
+    if not refresh:
+        async with connection() as db:
+            known = await load_analyses(db, [h for h in hashes.values() if h])
+    # Each distinct content once, even when several names share it
+    missing = list({h: f for f, h in reversed(hashes.items()) if h and h not in known}.items())
+    fresh = {}
+    # A couple of files per worker process at a time keeps the pool queue short
+    step = WORKER_PROCESSES * 2
+    for start in range(0, len(missing), step):
+        results = await asyncio.gather(*(_analyze(f, h) for h, f in missing[start:start + step]))
+        fresh.update((digest, analysis) for digest, analysis in results if digest)
+    if fresh:
+        async with connection(write=True) as db:
+            await db.executemany("""
+                INSERT INTO artwork_analysis (file_hash, version, analysis) VALUES (?, ?, ?)
+                ON CONFLICT(file_hash) DO UPDATE SET
+                    version = excluded.version, analysis = excluded.analysis,
+                    analyzed_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+            """, [(digest, ANALYSIS_VERSION, json.dumps(analysis)) for digest, analysis in fresh.items()])
+            await db.commit()
+        known.update(fresh)
+    return {f: known.get(h) if h else None for f, h in hashes.items()}
+
+
+def schedule_analysis(filename: str):
+    """Analyze a freshly uploaded print file in the background, so the first
+    check finds it cached."""
+    async def run():
+        try:
+            await analyze_files([filename])
+        except Exception:
+            logger.exception("Artwork analysis failed for %s", filename)
+
+    spawn(run())
+
+
+# ── Checks ────────────────────────────────────────────────────────────────────
+
+def _issue(code: str, severity: str, message: str) -> dict:
+    return {"code": code, "severity": severity, "message": message}
+
+
+def check_artwork(method_key: str, analysis: Optional[dict], available: bool,
+                  max_colors: Optional[int], multi_color: bool):
+    """Issues for one print file against its method's rules and the
+    product's color limit for that method."""
+    method = METHOD_NAMES[method_key]
+    if analysis is None:
+        return [_issue("FILE_MISSING", "error", "The uploaded file is missing")]
+    if "unreadable" in analysis:
+        return [_issue("FILE_UNREADABLE", "error", f"The file can't be read as an image: {analysis['unreadable']}")]
+    rule = METHOD_RULES[method_key]
+    issues = []
+    if not available:
+        issues.append(_issue("METHOD_UNAVAILABLE", "warning", f"{method} is not offered for this product"))
+    if analysis["dpi"] is not None and analysis["dpi"] < rule.min_dpi:
+        issues.append(_issue(
+            "LOW_DPI", "error", f"{analysis['dpi']:g} DPI; {method} needs at least {rule.min_dpi}"))
+    short_side = min(analysis["width"], analysis["height"])
+    if short_side < rule.min_side:
+        issues.append(_issue(
+            "LOW_RESOLUTION", "error",
+            f"{analysis['width']}×{analysis['height']} px; {method} needs at least {rule.min_side} px on the short side"))
+    if not multi_color and max_colors is not None and analysis["colors"] > max_colors:
+        found = f"{MAX_PALETTE}+" if analysis["colors"] >= MAX_PALETTE else str(analysis["colors"])
+        issues.append(_issue(
+            "TOO_MANY_COLORS", "error", f"{found} colors; {method} allows {max_colors} on this product"))
+    if not rule.semi_transparency and analysis["semi_transparent"] > SEMI_TRANSPARENT_LIMIT:
+        issues.append(_issue(
+            "SEMI_TRANSPARENT", "error",
+            f"{analysis['semi_transparent']:.0%} of the image is partly transparent; {method} can't print partial opacity"))
+    if not rule.transparent_background and analysis["transparent"] > 0:
+        issues.append(_issue(
+            "TRANSPARENT_AREAS", "warning", f"Transparent areas will print as the material color with {method}"))
+    return issues
+
+
+async def load_method_images(db, product_ids):
+    """{product_id: [(method_key, filename, available, max_colors, multi_color)]}
+    with every method image set, for the given products that exist."""
+    found = {}
+    cols = ", ".join(f"{key}_image" for key in METHOD_RULES)
+    for start in range(0, len(product_ids), CHECK_BATCH):
+        chunk = product_ids[start:start + CHECK_BATCH]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = await db.execute(f"SELECT id, {cols} FROM products WHERE id IN ({placeholders})", chunk)
+        images = {r[0]: dict(zip(METHOD_RULES, r[1:])) for r in await cursor.fetchall()}
+        cursor = await db.execute(f"""
+            SELECT product_id, method_key, available, max_colors, multi_color
+            FROM product_methods WHERE product_id IN ({placeholders})
+        """, chunk)
+        specs = {(pid, key): (bool(available), max_colors, bool(multi))
+                 for pid, key, available, max_colors, multi in await cursor.fetchall()}
+        for pid, by_method in images.items():
+            found[pid] = [
+                (key, filename, *specs.get((pid, key), (False, None, False)))
+                for key, filename in by_method.items() if filename
+            ]
+    return found
+
+
+async def check_products(product_ids, refresh: bool = False):
+    """[ArtworkReport dict] for the given products that exist, in order."""
+    async with connection() as db:
+        method_images = await load_method_images(db, list(dict.fromkeys(product_ids)))
+    analyses = await analyze_files(
+        [filename for images in method_images.values() for _, filename, *_ in images], refresh
+    )
+    reports = []
+    for pid in dict.fromkeys(product_ids):
+        if pid not in method_images:
+            continue
+        checks = []
+        for key, filename, available, max_colors, multi in method_images[pid]:
+            issues = check_artwork(key, analyses[filename], available, max_colors, multi)
+            checks.append({
+                "method_key": key,
+                "image": filename,
+                "ok": not any(i["severity"] == "error" for i in issues),
+                "analysis": None if "unreadable" in (analyses[filename] or {}) else analyses[filename],
+                "issues": issues,
+            })
+        reports.append({"product_id": pid, "ok": all(c["ok"] for c in checks), "checks": checks})
+    return reports
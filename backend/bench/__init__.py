@@ -0,0 +1,8 @@
+"""Backend benchmarks: parser micro-benchmarks and an in-process load harness.
+
+Run from the backend directory (needs httpx, see requirements-dev.txt):
+
+    python -m bench run --output bench.json
+    python -m bench run --sizes 100,10000 --baseline bench.json
+    python -m bench compare old.json new.json
+"""
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = "100,10000"  # add 1000000 for the full run; it takes minutes
+DEFAULT_THRESHOLD = 0.25  # allowed slowdown before a metric counts as a regression
+MIN_DELTA_MS = 0.05  # ignore latency changes smaller than this (timer noise)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _meta(args) -> dict:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+
+
+def _run_load(size: int, args) -> dict:
+    cmd = [
+        sys.executable, "-m", "bench.load", "--size", str(size),
+        "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+    ]
+    out = subprocess.run(cmd, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        sys.exit(f"load run for {size} products failed:\n{out.stderr}")
+    return json.loads(out.stdout)
+
+
+def compare(old: dict, new: dict, threshold: float):
+    """Metrics in `new` slower than `old` by more than `threshold`: [(name, old, new)]."""
+    regressions = []
+    for name, result in new.get("micro", {}).items():
+        before = old.get("micro", {}).get(name)
+        if before and result["ns_per_op"] > before["ns_per_op"] * (1 + threshold):
+            regressions.append((f"micro {name} ns/op", before["ns_per_op"], result["ns_per_op"]))
+    for size, run in new.get("load", {}).items():
+        old_endpoints = old.get("load", {}).get(size, {}).get("endpoints", {})
+        for name, result in run["endpoints"].items():
+            before = old_endpoints.get(name)
+            if not before:
+                continue
+            slower = result["p95_ms"] - before["p95_ms"]
+            if slower > MIN_DELTA_MS and result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+                regressions.append((f"load {size} {name} p95 ms", before["p95_ms"], result["p95_ms"]))
+    return regressions
+
+
+def _report(results: dict):
+    for name, r in results.get("micro", {}).items():
+        print(f"{name:40} {r['ns_per_op']:>12,.1f} ns/op")
+    for size, run in results.get("load", {}).items():
+        print(f"\n{int(size):,} products (build {run['build_seconds']}s, startup {run['startup_seconds']}s)")
+        print(f"{'endpoint':24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}")
+        for name, r in run["endpoints"].items():
+            print(f"{name:24} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['rps']:>9} {r['errors']:>7}")
+            if "rss_peak_mb" in r:
+                print(f"{'':24} resident memory {r['rss_start_mb']} MB -> peak {r['rss_peak_mb']} MB")
+
+
+def _check(old: dict, new: dict, threshold: float) -> int:
+    regressions = compare(old, new, threshold)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def cmd_run(args) -> int:
+    results = {"meta": _meta(args), "micro": {}, "load": {}}
+    if not args.skip_micro:
+        from bench import micro
+
+        results["micro"] = micro.run_all()
+    if not args.skip_load:
+        for size in (int(s) for s in args.sizes.split(",") if s):
+            print(f"load: {size:,} products ...", file=sys.stderr)
+            results["load"][str(size)] = _run_load(size, args)
+    _report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            return _check(json.load(f), results, args.threshold)
+    return 0
+
+
+def cmd_compare(args) -> int:
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    return _check(old, new, args.threshold)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="run the benchmarks")
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated catalog sizes")
+    p.add_argument("--requests", type=int, default=500, help="requests per endpoint and size")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--skip-micro", action="store_true")
+    p.add_argument("--skip-load", action="store_true")
+    p.add_argument("--output", help="write results as JSON here")
+    p.add_argument("--baseline", help="fail (exit 1) on regressions against this JSON")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    p.set_defaults(run=cmd_run)
+    p = sub.add_parser("compare", help="compare two result files")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    p.set_defaults(run=cmd_compare)
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
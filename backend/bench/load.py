@@ -0,0 +1,209 @@
+"""In-process load harness for one synthetic catalog size.
+
+Each size runs in its own process (`python -m bench.load --size N`) because
+the database path and all in-memory caches are fixed per process. Prints a
+JSON result on stdout.
+
+Besides the read endpoints, an upload scenario posts near-cap images
+concurrently and reports the process's resident memory before and at its
+peak (Linux), which should stay flat as uploads stream to disk.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BUILD_CHUNK = 10000
+UPLOAD_IMAGES = 4  # distinct files cycled through by the upload scenario
+UPLOAD_SIDE = 1000  # px; a noise PNG this size is about 3 MB
+UPLOAD_REQUESTS = 200
+RSS_SAMPLE_SECONDS = 0.01
+SUGGEST_QUERIES = ("mu", "pen", "bag", "tote pa", "dia", "cer", "t-sh", "key")
+
+# name -> path builder(rng, catalog size)
+ENDPOINTS = {
+    "products.page": lambda rng, n: "/api/products?limit=100",
+    "products.search": lambda rng, n: "/api/products?search=mug&limit=20",
+    "products.filter": lambda rng, n: "/api/products?method=uv_printing&max_days=4&limit=100",
+    "products.get": lambda rng, n: f"/api/products/{rng.randint(1, n)}",
+    "products.categories": lambda rng, n: "/api/products/categories",
+    "products.suggest": lambda rng, n: f"/api/products/suggest?q={rng.choice(SUGGEST_QUERIES)}",
+    "recommend.get": lambda rng, n: f"/api/recommend/{rng.randint(1, n)}",
+    "recommend.ranked": lambda rng, n: f"/api/recommend/{rng.randint(1, n)}?qty=100&colors=2",
+    "recommend.top": lambda rng, n: "/api/recommend/top?qty=100&k=10",
+}
+
+
+async def build_catalog(size: int):
+    """Fill the (empty) database at DB_PATH with `size` products cycled from the seed data."""
+    import aiosqlite
+    import database
+
+    await database.init_db()  # schema plus the seed products
+    seeds = database.SEED_PRODUCTS
+    async with aiosqlite.connect(database.DB_PATH) as db:
+        await db.execute("PRAGMA synchronous = OFF")
+        for start in range(len(seeds), size, BUILD_CHUNK):
+            stop = min(size, start + BUILD_CHUNK)
+            rows = [
+                (f"{seeds[i % len(seeds)][0]} #{i + 1}", *seeds[i % len(seeds)][1:])
+                for i in range(start, stop)
+            ]
+            await db.executemany("""
+                INSERT INTO products (
+                    name, category, material,
+                    screen_printing, uv_printing, offset_printing, digital_printing,
+                    laser_engraving, dtg_dtf, embroidery, sublimation, production_time
+                ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+            """, rows)
+            await database.refresh_product_specs(db, range(start + 1, stop + 1))
+            await db.commit()
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+async def drive(client, paths, concurrency: int, send=None) -> dict:
+    """Send `paths` with `concurrency` requests in flight; time each one.
+
+    `send(client, item)` makes the request for an item; by default a GET.
+    """
+    send = send or (lambda client, path: client.get(path))
+    queue = list(reversed(paths))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            path = queue.pop()
+            t0 = time.perf_counter()
+            response = await send(client, path)
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def rss_bytes():
+    """Resident memory of this process, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def upload_images(rng, count: int):
+    """`count` distinct near-cap PNGs of random noise (incompressible)."""
+    import io
+    from PIL import Image
+
+    images = []
+    for _ in range(count):
+        out = io.BytesIO()
+        Image.frombytes("RGB", (UPLOAD_SIDE, UPLOAD_SIDE), rng.randbytes(UPLOAD_SIDE * UPLOAD_SIDE * 3)).save(out, "PNG")
+        images.append(out.getvalue())
+    return images
+
+
+async def drive_uploads(client, rng, size: int, concurrency: int) -> dict:
+    """POST images to random products and sample resident memory meanwhile."""
+    from routers.auth import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin', 'role': 'admin'})}"}
+    images = upload_images(rng, UPLOAD_IMAGES)
+    items = [(rng.randint(1, size), images[i % len(images)]) for i in range(UPLOAD_REQUESTS)]
+
+    def send(client, item):
+        product_id, body = item
+        return client.post(
+            f"/api/products/{product_id}/upload-image",
+            files={"file": ("bench.png", body, "image/png")}, headers=headers,
+        )
+
+    start_rss = peak_rss = rss_bytes()
+    done = asyncio.Event()
+
+    async def sample():
+        nonlocal peak_rss
+        while not done.is_set():
+            peak_rss = max(peak_rss, rss_bytes())
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+
+    sampler = asyncio.create_task(sample()) if start_rss is not None else None
+    try:
+        result = await drive(client, items, concurrency, send)
+    finally:
+        done.set()
+        if sampler:
+            await sampler
+    if start_rss is not None:
+        result["rss_start_mb"] = round(start_rss / 2**20, 1)
+        result["rss_peak_mb"] = round(peak_rss / 2**20, 1)
+    return result
+
+
+async def run(size: int, requests: int, concurrency: int, seed: int) -> dict:
+    import httpx
+
+    t0 = time.perf_counter()
+    await build_catalog(size)
+    build_seconds = time.perf_counter() - t0
+
+    from main import app
+
+    rng = random.Random(seed)
+    results = {}
+    t0 = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup_seconds = time.perf_counter() - t0
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_path in ENDPOINTS.items():
+                await client.get(make_path(rng, size))  # warm-up
+                paths = [make_path(rng, size) for _ in range(requests)]
+                results[name] = await drive(client, paths, concurrency)
+            results["images.upload"] = await drive_uploads(client, rng, size, concurrency)
+    return {
+        "size": size,
+        "build_seconds": round(build_seconds, 2),
+        "startup_seconds": round(startup_seconds, 3),
+        "endpoints": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.load")
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, f"catalog-{args.size}.db")
+        os.environ["UPLOADS_DIR"] = os.path.join(tmp, "uploads")
+        result = asyncio.run(run(args.size, args.requests, args.concurrency, args.seed))
+    json.dump(result, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import asyncio
+import random
+import sqlite3
+import timeit
+from typing import List
+import numpy as np
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from database import SEED_PRICES, SEED_PRODUCTS
+from models import ProductOut
+from jose import jwt
+from routers.auth import ALGORITHM, SECRET_KEY, create_access_token, decode_token
+from routers.products import PRODUCT_COLUMNS, row_to_dict
+from quotes import METHOD_INDEX, compile_prices, compile_specs, pick_methods, quote_matrix
+from serialize import encode_rows
+from specs import method_rows, parse_color_limit, parse_production_time, parse_schedule
+
+REPEAT = 5
+QUOTE_LINES = 10000
+LISTING_ROWS = 10000
+SCHEDULE = SEED_PRODUCTS[0][-1]  # three-line production_time text
+# production_time cells as written in "Product printing spec.xlsx"
+XLSX_SCHEDULES = {
+    "no_qty_word": "Screen (Qty 100-500) = 4 working day\nUV(50)  = 4 working day\nEngraving (100)  = 1 working day",
+    "space_before_paren": "Screen(100)  = 5 working day\nUV  (100)= 4 working day",
+    "days_only": "Screen(100)  = 5 working day\nUV(100)  = 4 working day\nSubilimation = 3 working day",
+    "qty_colon": "Screen (Qty:1-100) =  5 working day\nEmb:(Qty : 10) = 2 working day",
+}
+
+
+def sample_row():
+    """A real sqlite3.Row (what aiosqlite hands to row_to_dict) for a seed product."""
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.execute(f"CREATE TABLE products ({', '.join(PRODUCT_COLUMNS)})")
+    values = (1, *SEED_PRODUCTS[0]) + (None,) * (len(PRODUCT_COLUMNS) - 1 - len(SEED_PRODUCTS[0]))
+    db.execute(f"INSERT INTO products VALUES ({','.join('?' * len(values))})", values)
+    return db.execute("SELECT * FROM products").fetchone()
+
+
+def sample_rows():
+    """LISTING_ROWS product row tuples cycling over the seed products."""
+    padding = (None,) * (len(PRODUCT_COLUMNS) - 1 - len(SEED_PRODUCTS[0]))
+    return [(i, *SEED_PRODUCTS[i % len(SEED_PRODUCTS)], *padding) for i in range(1, LISTING_ROWS + 1)]
+
+
+def pydantic_listing(field, rows) -> bytes:
+    """What a `response_model=List[ProductOut]` route returning dicts costs:
+    dict per row, then FastAPI's validation, serialization and JSONResponse."""
+    items = [dict(zip(PRODUCT_COLUMNS, r)) for r in rows]
+    content = asyncio.run(serialize_response(field=field, response_content=items))
+    return JSONResponse(content).body
+
+
+def sample_quote():
+    """A QUOTE_LINES-line quote over the seed products, as quote_matrix arguments."""
+    fields = ("name", "category", "material", *METHOD_INDEX, "production_time")
+    methods, slots = [], []
+    for pid, seed in enumerate(SEED_PRODUCTS, 1):
+        schedule = parse_schedule(seed[-1])
+        for key, available, _, max_colors, multi, _, _ in method_rows(dict(zip(fields, seed)), schedule):
+            methods.append((pid, METHOD_INDEX[key], available, max_colors, multi))
+        slots.extend((pid, METHOD_INDEX[e[0]], e[2], e[3], e[4]) for e in schedule if e[4] is not None)
+    specs = compile_specs(np.arange(1, len(SEED_PRODUCTS) + 1), methods, slots)
+    rng = random.Random(1)
+    product = np.array([rng.randrange(len(SEED_PRODUCTS)) for _ in range(QUOTE_LINES)])
+    qty = np.array([rng.randint(1, 2000) for _ in range(QUOTE_LINES)])
+    colors = np.array([rng.randint(1, 3) for _ in range(QUOTE_LINES)])
+    requested = np.array([rng.randrange(-1, len(METHOD_INDEX)) for _ in range(QUOTE_LINES)])
+    return specs, compile_prices(SEED_PRICES), product, qty, colors, requested
+
+
+def cases():
+    row = sample_row()
+    specs, prices, product, qty, colors, requested = sample_quote()
+    token = create_access_token({"sub": "admin", "role": "admin"})
+    rows = sample_rows()
+    listing_field = create_response_field(name="Response_list_products", type_=List[ProductOut])
+    return {
+        "parse_production_time.first_line": lambda: parse_production_time(SCHEDULE, "Screen Printing"),
+        "parse_production_time.last_line": lambda: parse_production_time(SCHEDULE, "Laser Engraving"),
+        "parse_production_time.missing": lambda: parse_production_time(SCHEDULE, "Sublimation"),
+        **{f"parse_schedule.{name}": (lambda text=text: parse_schedule(text))
+           for name, text in XLSX_SCHEDULES.items()},
+        "parse_color_limit.count": lambda: parse_color_limit("2"),
+        "parse_color_limit.count_note": lambda: parse_color_limit("4 (Prices may vary)"),
+        "parse_color_limit.multi": lambda: parse_color_limit("Multi"),
+        "parse_color_limit.na": lambda: parse_color_limit("NA"),
+        "parse_color_limit.text": lambda: parse_color_limit("Engraved finish"),
+        "row_to_dict": lambda: row_to_dict(row),
+        # A 10k-row product listing: per-row pydantic path vs. zipped rows + orjson
+        "listing.pydantic_10k": lambda: pydantic_listing(listing_field, rows),
+        "listing.orjson_10k": lambda: encode_rows(PRODUCT_COLUMNS, rows),
+        # What every admin write paid before the token cache, vs. a cache hit
+        "auth.jwt_decode": lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]),
+        "auth.decode_token_cached": lambda: decode_token(token),
+        # Every line against every method, then the chosen method per line
+        "quotes.matrix_10k": lambda: pick_methods(quote_matrix(specs, prices, product, qty, colors), requested),
+    }
+
+
+def measure(fn) -> dict:
+    """Best-of-REPEAT time per call, with the loop count picked by timeit."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=REPEAT, number=number)) / number
+    return {"ns_per_op": round(best * 1e9, 1), "ops_per_sec": round(1 / best)}
+
+
+def run_all() -> dict:
+    return {name: measure(fn) for name, fn in cases().items()}
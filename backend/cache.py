@@ -0,0 +1,201 @@
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+from fastapi import HTTPException, Request, Response
+from database import connection
+from engine import recommendation_engine
+from suggest import suggest_index
+from workers import spawn
+
+logger = logging.getLogger(__name__)
+
+# Shared caches may keep a catalog response this long without revalidating
+CATALOG_S_MAXAGE = int(os.environ.get("CATALOG_S_MAXAGE", "0"))
+# How often each process checks catalog_changes for writes made elsewhere
+CHANGE_POLL_INTERVAL = float(os.environ.get("CHANGE_POLL_INTERVAL", "0.5"))
+CHANGE_BATCH = 1000
+# The change log keeps this many most recent entries (clients further behind reload)
+CHANGE_LOG_KEEP = int(os.environ.get("CHANGE_LOG_KEEP", "100000"))
+CHANGE_LOG_PRUNE_INTERVAL = 3600
+
+
+def _code_id() -> str:
+    """Same for every worker of one deployment, different after a redeploy,
+    so ETags never outlive a change in response format."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.blake2b(digest_size=4)
+    for path in sorted(glob.glob(os.path.join(here, "*.py")) + glob.glob(os.path.join(here, "routers", "*.py"))):
+        st = os.stat(path)
+        digest.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+_CODE_ID = _code_id()
+_BOOT_ID = os.urandom(4).hex()
+# Newest catalog_changes.seq applied to this process's caches. Every worker
+# converges on the same value, so their ETags agree.
+_catalog_seq = 0
+# Writes made here that the change watcher hasn't seen in the log yet
+_unconfirmed = 0
+
+
+def catalog_version() -> str:
+    if _unconfirmed:
+        # Our own write is newer than _catalog_seq: never reuse a shared tag
+        return f"{_catalog_seq}.{_BOOT_ID}.{_unconfirmed}"
+    return str(_catalog_seq)
+
+
+def _invalidate(product_id: int = None):
+    recommendation_engine.invalidate(product_id)
+    suggest_index.mark_dirty(product_id)
+
+
+def catalog_changed(product_id: int = None):
+    """Call after every catalog write: drops the affected product from this
+    process's caches (all of them when no id is given) and wakes the change
+    watcher, which moves the shared catalog version forward."""
+    global _unconfirmed
+    _unconfirmed += 1
+    _invalidate(product_id)
+    change_watcher.wake()
+
+
+class ChangeWatcher:
+    """Follows the catalog_changes log that triggers on `products` fill.
+
+    Writes made by other worker processes (or the catalog_io CLI) reach this
+    process's caches within CHANGE_POLL_INTERVAL; local writes wake it
+    straight away. A poll is one indexed read, so idle workers cost nothing.
+    """
+
+    def __init__(self):
+        self._wake = None
+        self._advanced = None  # set (and replaced) whenever _catalog_seq moves
+        self._next_prune = 0.0
+
+    async def start(self):
+        global _catalog_seq
+        async with connection() as db:
+            cursor = await db.execute("SELECT COALESCE(MAX(seq), 0) FROM catalog_changes")
+            _catalog_seq = (await cursor.fetchone())[0]
+        self._wake = asyncio.Event()
+        self._advanced = asyncio.Event()
+        spawn(self._run())
+
+    def wake(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    @property
+    def seq(self) -> int:
+        return _catalog_seq
+
+    async def wait_past(self, seq: int, timeout: float) -> bool:
+        """Wait until this process has applied a change newer than `seq`."""
+        if _catalog_seq > seq:
+            return True
+        if self._advanced is None:
+            await asyncio.sleep(timeout)
+            return _catalog_seq > seq
+        try:
+            await asyncio.wait_for(self._advanced.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return _catalog_seq > seq
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), CHANGE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.poll()
+                if asyncio.get_running_loop().time() >= self._next_prune:
+                    self._next_prune = asyncio.get_running_loop().time() + CHANGE_LOG_PRUNE_INTERVAL
+                    await self.prune()
+            except Exception:
+                logger.exception("Could not read catalog changes")
+
+    async def prune(self):
+        async with connection(write=True) as db:
+            await db.execute(
+                "DELETE FROM catalog_changes WHERE seq <= (SELECT MAX(seq) FROM catalog_changes) - ?",
+                (CHANGE_LOG_KEEP,),
+            )
+            await db.commit()
+
+    async def poll(self):
+        """Apply logged changes newer than the last one seen here."""
+        global _catalog_seq, _unconfirmed
+        pending = _unconfirmed
+        before = _catalog_seq
+        async with connection() as db:
+            cursor = await db.execute(
+                "SELECT seq, product_id FROM catalog_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (_catalog_seq, CHANGE_BATCH),
+            )
+            rows = await cursor.fetchall()
+            if len(rows) == CHANGE_BATCH:
+                # A bulk import or similar: cheaper to start the caches over
+                cursor = await db.execute("SELECT MAX(seq) FROM catalog_changes")
+                latest = (await cursor.fetchone())[0]
+                _invalidate()
+                _catalog_seq = latest
+            elif rows:
+                for _, product_id in rows:
+                    _invalidate(product_id)
+                _catalog_seq = rows[-1][0]
+        _unconfirmed -= pending
+        if _catalog_seq != before:
+            self._advanced.set()
+            self._advanced = asyncio.Event()
+
+
+change_watcher = ChangeWatcher()
+
+
+def cache_control() -> str:
+    # Browsers always revalidate (a 304 is cheap); proxies may hold it briefly
+    value = "public, max-age=0, must-revalidate"
+    if CATALOG_S_MAXAGE > 0:
+        value += f", s-maxage={CATALOG_S_MAXAGE}"
+    return value
+
+
+def make_etag(request: Request) -> str:
+    """Strong ETag for the current catalog version and this exact URL."""
+    key = f"{request.url.path}?{request.url.query}".encode()
+    digest = hashlib.blake2b(key, digest_size=8).hexdigest()
+    return f'"{_CODE_ID}-{catalog_version()}-{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+async def catalog_etag(request: Request, response: Response) -> str:
+    """Dependency for catalog reads: answers 304 before any DB work when the
+    client's If-None-Match is current, else tags the response.
+
+    List it before `get_db` so a 304 never borrows a connection. Handlers
+    returning their own Response must copy `etag_headers(etag)` onto it.
+    """
+    etag = make_etag(request)
+    headers = etag_headers(etag)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return etag
+
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control()}
@@ -0,0 +1,304 @@
+"""Bulk catalog import (XLSX/CSV) and streaming export (CSV/NDJSON).
+
+Also usable from the command line, from the backend directory:
+
+    python -m catalog_io import "../Product printing spec.xlsx" --category Promotional
+    python -m catalog_io export products.csv
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import sys
+from itertools import islice
+from pydantic import ValidationError
+from database import connection, init_db, refresh_product_specs
+from models import ProductCreate
+
+IMPORT_COLUMNS = list(ProductCreate.model_fields)
+EXPORT_COLUMNS = ["id"] + IMPORT_COLUMNS
+IMPORT_BATCH_SIZE = 2000  # rows parsed and written per executemany
+EXPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Header prefixes used by the supplier spec sheet (normalized, checked in order)
+HEADER_ALIASES = [
+    ("products", "name"),
+    ("product", "name"),
+    ("screen", "screen_printing"),
+    ("uv", "uv_printing"),
+    ("offset", "offset_printing"),
+    ("digital", "digital_printing"),
+    ("l engraving", "laser_engraving"),
+    ("laser", "laser_engraving"),
+    ("engraving", "laser_engraving"),
+    ("dtg", "dtg_dtf"),
+    ("estimated production time", "production_time"),
+]
+FORMATS = {".xlsx": "xlsx", ".xlsm": "xlsx", ".csv": "csv", ".txt": "csv"}
+
+
+class ImportFormatError(ValueError):
+    """The file can't be read as a catalog sheet at all."""
+
+
+def _normalize(header) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", str(header or "").lower()))
+
+
+def map_header(cells):
+    """Column name (or None) for each header cell, plus the ignored headers.
+
+    Exact column names win ("screen_printing_image"), then the spec sheet's
+    own headings ("Screen Printing\\nImprint color(s)"). First match wins.
+    """
+    exact = {_normalize(c): c for c in EXPORT_COLUMNS}
+    mapped, ignored, seen = [], [], set()
+    for cell in cells:
+        key = _normalize(cell)
+        column = exact.get(key) or next(
+            (col for prefix, col in HEADER_ALIASES if key.startswith(prefix)), None
+        )
+        if column in seen:
+            column = None
+        if column is None:
+            if key:
+                ignored.append(str(cell).strip())
+        else:
+            seen.add(column)
+        mapped.append(column)
+    return mapped, ignored
+
+
+def clean_cell(value):
+    """Spreadsheet cell → stripped text (None for blanks); 2.0 becomes "2"."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def detect_format(filename: str) -> str:
+    fmt = FORMATS.get(os.path.splitext(filename or "")[1].lower())
+    if fmt is None:
+        raise ImportFormatError("Expected an .xlsx or .csv file")
+    return fmt
+
+
+def _iter_cells(fileobj, fmt: str):
+    if fmt == "xlsx":
+        from openpyxl import load_workbook
+
+        try:
+            workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        except Exception as exc:
+            raise ImportFormatError(f"Not a readable .xlsx file: {exc}")
+        try:
+            yield from workbook.worksheets[0].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        try:
+            yield from csv.reader(text)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ImportFormatError(f"Not a readable UTF-8 .csv file: {exc}")
+        finally:
+            if not text.buffer.closed:
+                text.detach()  # leave the caller's file open
+
+
+def read_table(fileobj, fmt: str):
+    """Open a sheet: returns (columns, ignored_headers, rows).
+
+    `rows` lazily yields (row_no, {column: value}) with 1-based sheet row
+    numbers, skipping blank rows, so large files are never held in memory.
+    """
+    cells = _iter_cells(fileobj, fmt)
+    header = next(cells, None)
+    mapped, ignored = map_header(header or ())
+    if "name" not in mapped:
+        cells.close()
+        raise ImportFormatError("The file is empty" if header is None else "No product name column found")
+
+    def rows():
+        for row_no, row in enumerate(cells, 2):
+            values = {col: clean_cell(v) for col, v in zip(mapped, row) if col}
+            if any(v is not None for v in values.values()):
+                yield row_no, values
+
+    return [c for c in mapped if c], ignored, rows()
+
+
+def validate_row(values: dict, default_category: str = None):
+    """(product_id or None, ProductCreate) for a row; raises ValueError/ValidationError."""
+    values = dict(values)
+    product_id = values.pop("id", None)
+    if product_id is not None:
+        try:
+            product_id = int(product_id)
+        except ValueError:
+            raise ValueError(f"id: not an integer: {product_id!r}")
+    if values.get("category") is None and default_category:
+        values["category"] = default_category
+    return product_id, ProductCreate(**{k: v for k, v in values.items() if v is not None})
+
+
+def _row_errors(exc) -> list:
+    if isinstance(exc, ValidationError):
+        return [f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()]
+    return [str(exc)]
+
+
+def _next_batch(rows):
+    return list(islice(rows, IMPORT_BATCH_SIZE))
+
+
+async def import_table(db, columns, rows, default_category: str = None, dry_run: bool = False) -> dict:
+    """Validate and write sheet rows in one transaction; returns the report.
+
+    Rows with an `id` column value update that product (or create it with
+    that id); the rest are inserted. Only columns present in the sheet are
+    written, so re-importing an export never clears images it didn't carry.
+    Invalid rows are skipped and listed in the report. The caller commits.
+    """
+    write_cols = [c for c in columns if c != "id"]
+    if default_category and "category" not in write_cols:
+        write_cols.append("category")
+    names = ", ".join(write_cols)
+    marks = ",".join("?" * len(write_cols))
+    insert_sql = f"INSERT INTO products ({names}) VALUES ({marks})"
+    upsert_sql = (
+        f"INSERT INTO products (id, {names}) VALUES (?,{marks}) ON CONFLICT(id) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in write_cols)
+    )
+    report = {
+        "rows": 0, "created": 0, "updated": 0, "invalid": 0, "dry_run": dry_run,
+        "errors": [],
+    }
+    cursor = await db.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'products'")
+    last_id = (await cursor.fetchone())[0]
+    upserted = []
+
+    while batch := await asyncio.to_thread(_next_batch, rows):
+        inserts, upserts = [], []
+        for row_no, values in batch:
+            report["rows"] += 1
+            try:
+                product_id, product = validate_row(values, default_category)
+            except (ValueError, ValidationError) as exc:
+                report["invalid"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"row": row_no, "errors": _row_errors(exc)})
+                continue
+            params = tuple(getattr(product, c) for c in write_cols)
+            if product_id is None:
+                inserts.append(params)
+            else:
+                upserts.append((product_id, *params))
+
+        if upserts:
+            ids = list({u[0] for u in upserts})
+            placeholders = ",".join("?" * len(ids))
+            cursor = await db.execute(f"SELECT COUNT(*) FROM products WHERE id IN ({placeholders})", ids)
+            existing = (await cursor.fetchone())[0]
+            report["updated"] += existing
+            report["created"] += len(ids) - existing
+            upserted.extend(ids)
+        report["created"] += len(inserts)
+        if dry_run:
+            continue
+        if inserts:
+            await db.executemany(insert_sql, inserts)
+        if upserts:
+            await db.executemany(upsert_sql, upserts)
+
+    if not dry_run:
+        cursor = await db.execute("SELECT id FROM products WHERE id > ?", (last_id,))
+        changed = {r[0] for r in await cursor.fetchall()}
+        await refresh_product_specs(db, changed.union(upserted))
+    return report
+
+
+def _encode_chunk(rows, fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, r)), ensure_ascii=False) + "\n" for r in rows)
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue()
+
+
+async def export_chunks(fmt: str = "csv"):
+    """Yield the catalog as CSV or NDJSON text, one id-keyed page at a time.
+
+    Each page borrows its own connection, so a slow client never pins one.
+    """
+    if fmt == "csv":
+        yield _encode_chunk([EXPORT_COLUMNS], fmt)
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM products WHERE id > ? ORDER BY id LIMIT ?"
+    last_id = 0
+    while True:
+        async with connection() as db:
+            cursor = await db.execute(query, (last_id, EXPORT_CHUNK_SIZE))
+            rows = await cursor.fetchall()
+        if not rows:
+            return
+        yield _encode_chunk(rows, fmt)
+        last_id = rows[-1][0]
+
+
+# ── Command line ──────────────────────────────────────────────────────────────
+
+async def _cli_import(args):
+    from cache import catalog_changed
+
+    await init_db()
+    with open(args.path, "rb") as f:
+        columns, ignored, rows = read_table(f, detect_format(args.path))
+        async with connection(write=True) as db:
+            report = await import_table(db, columns, rows, args.category, args.dry_run)
+            await db.commit()
+    catalog_changed()
+    report["ignored_columns"] = ignored
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["invalid"] else 0
+
+
+async def _cli_export(args):
+    await init_db()
+    out = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8", newline="")
+    try:
+        async for chunk in export_chunks(args.format):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m catalog_io", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="import products from an .xlsx or .csv sheet")
+    p.add_argument("path")
+    p.add_argument("--category", help="category for rows that don't have one")
+    p.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    p.set_defaults(run=_cli_import)
+    p = sub.add_parser("export", help="export all products")
+    p.add_argument("path", help="output file, or - for stdout")
+    p.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    p.set_defaults(run=_cli_export)
+    args = parser.parse_args(argv)
+    try:
+        return asyncio.run(args.run(args))
+    except (ImportFormatError, OSError) as exc:
+        parser.exit(2, f"error: {exc}\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,39 @@
 import aiosqlite
+import logging
+import metrics
 import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from fastapi import Request
+from pool import ConnectionPool
+from specs import method_rows, parse_schedule
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "printing_system.db")
-UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+DB_PATH = os.environ.get("DB_PATH") or os.path.join(os.path.dirname(__file__), "printing_system.db")
+UPLOADS_DIR = os.environ.get("UPLOADS_DIR") or os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
+# Connection pool settings (override via environment)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+
+# Per-connection performance settings: page cache and memory-mapped I/O sizes
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "65536"))
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",  # safe with WAL: only the last commits can be lost on power failure
+    "PRAGMA busy_timeout=5000",
+    f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}",  # negative: KiB rather than pages
+    f"PRAGMA mmap_size={DB_MMAP_SIZE}",
+)
+MIGRATION_TIMEOUT = 60  # seconds to wait for another process's migration
+
+logger = logging.getLogger(__name__)
+
+db_pool = ConnectionPool(DB_PATH, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, pragmas=CONNECTION_PRAGMAS)
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
 # All 19 products from the Excel spec
 # Fields: name, category, material, screen_printing, uv_printing, offset_printing,
 #         digital_printing, laser_engraving, dtg_dtf, embroidery, sublimation, production_time
@@ -107,63 +136,467 @@ SEED_PRODUCTS = [
 ]
 
 
-async def get_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+@asynccontextmanager
+async def connection(write: bool = False):
+    """Borrow a pooled connection outside of a request (streams, background jobs)."""
+    mode = "direct" if db_pool.closed else "write" if write else "read"
+    metrics.db_connections.inc(1, (mode,))
+    start = time.perf_counter()
+    try:
+        if db_pool.closed:
+            # Pool not started (e.g. scripts importing the routers directly)
+            async with aiosqlite.connect(DB_PATH) as db:
+                db.row_factory = aiosqlite.Row
+                yield metrics.TimedConnection(db)
+            return
+        async with (db_pool.writer() if write else db_pool.reader()) as db:
+            yield metrics.TimedConnection(db)
+    finally:
+        metrics.db_connection_hold.observe(time.perf_counter() - start, (mode,))
+
+
+async def get_db(request: Request):
+    """Yield a pooled connection: a reader for safe methods, else the writer."""
+    async with connection(write=request.method not in READ_METHODS) as db:
         yield db
 
 
+PRODUCTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        material TEXT,
+        screen_printing TEXT,
+        uv_printing TEXT,
+        offset_printing TEXT,
+        digital_printing TEXT,
+        laser_engraving TEXT,
+        dtg_dtf TEXT,
+        embroidery TEXT,
+        sublimation TEXT,
+        production_time TEXT,
+        image TEXT,
+        screen_printing_image TEXT,
+        uv_printing_image TEXT,
+        offset_printing_image TEXT,
+        digital_printing_image TEXT,
+        laser_engraving_image TEXT,
+        dtg_dtf_image TEXT,
+        embroidery_image TEXT,
+        sublimation_image TEXT
+    )
+"""
+
+
+# Full-text index over name / category / material, kept in sync by triggers
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, category, material,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, category, material)
+        VALUES (new.id, new.name, new.category, new.material);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, category, material)
+        VALUES ('delete', old.id, old.name, old.category, old.material);
+    END;
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, category, material ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, category, material)
+        VALUES ('delete', old.id, old.name, old.category, old.material);
+        INSERT INTO products_fts(rowid, name, category, material)
+        VALUES (new.id, new.name, new.category, new.material);
+    END;
+"""
+
+
+# Normalized per-method availability and production schedule, parsed from the
+# spec cells once at write time
+METHODS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS product_methods (
+        product_id INTEGER NOT NULL,
+        method_key TEXT NOT NULL,
+        available INTEGER NOT NULL,
+        min_colors INTEGER,
+        max_colors INTEGER,
+        multi_color INTEGER NOT NULL DEFAULT 0,
+        min_qty INTEGER,
+        working_days INTEGER,
+        PRIMARY KEY (product_id, method_key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_product_methods_lookup
+        ON product_methods(method_key, available, working_days, max_colors);
+    CREATE INDEX IF NOT EXISTS idx_products_material ON products(material COLLATE NOCASE);
+    CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+    CREATE TABLE IF NOT EXISTS product_schedule (
+        product_id INTEGER NOT NULL,
+        method_key TEXT NOT NULL,
+        line_no INTEGER NOT NULL,
+        qty_min INTEGER,
+        qty_max INTEGER,
+        working_days INTEGER,
+        description TEXT NOT NULL,
+        PRIMARY KEY (product_id, method_key, line_no)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_product_schedule_qty
+        ON product_schedule(method_key, qty_min, qty_max, working_days);
+    CREATE TRIGGER IF NOT EXISTS product_methods_ad AFTER DELETE ON products BEGIN
+        DELETE FROM product_methods WHERE product_id = old.id;
+        DELETE FROM product_schedule WHERE product_id = old.id;
+    END;
+"""
+
+
+# Every product write in commit order, filled by triggers so no write path can
+# forget it; other worker processes follow it to keep their caches current
+CHANGES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS catalog_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+    CREATE TRIGGER IF NOT EXISTS catalog_changes_ai AFTER INSERT ON products BEGIN
+        INSERT INTO catalog_changes (product_id, op) VALUES (new.id, 'insert');
+    END;
+    CREATE TRIGGER IF NOT EXISTS catalog_changes_au AFTER UPDATE ON products BEGIN
+        INSERT INTO catalog_changes (product_id, op) VALUES (new.id, 'update');
+    END;
+    CREATE TRIGGER IF NOT EXISTS catalog_changes_ad AFTER DELETE ON products BEGIN
+        INSERT INTO catalog_changes (product_id, op) VALUES (old.id, 'delete');
+    END;
+"""
+
+
+# Printing price lists with quantity breaks: a break applies from its qty_min up
+# to the next one. Money columns are in QUOTE_CURRENCY (see quotes.py).
+PRICES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS method_prices (
+        method_key TEXT NOT NULL,
+        qty_min INTEGER NOT NULL,
+        unit_price REAL NOT NULL,
+        extra_color_price REAL NOT NULL DEFAULT 0,
+        setup_fee REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (method_key, qty_min)
+    ) WITHOUT ROWID;
+"""
+
+# Indicative list prices seeded on first run; edit them via PUT /api/quotes/prices
+# Fields: method_key, qty_min, unit_price, extra_color_price (per unit, per color
+#         beyond the first), setup_fee (per quote line)
+SEED_PRICES = [
+    ("screen_printing", 1, 25.0, 5.0, 500.0),
+    ("screen_printing", 100, 12.0, 3.0, 500.0),
+    ("screen_printing", 500, 8.0, 2.0, 500.0),
+    ("screen_printing", 1000, 6.0, 1.5, 500.0),
+    ("uv_printing", 1, 40.0, 5.0, 300.0),
+    ("uv_printing", 100, 25.0, 3.0, 300.0),
+    ("uv_printing", 500, 18.0, 2.0, 300.0),
+    ("uv_printing", 1000, 15.0, 2.0, 300.0),
+    ("offset_printing", 1, 10.0, 0.0, 1500.0),
+    ("offset_printing", 500, 4.0, 0.0, 1500.0),
+    ("offset_printing", 1000, 2.5, 0.0, 1500.0),
+    ("offset_printing", 5000, 1.5, 0.0, 1500.0),
+    ("digital_printing", 1, 20.0, 0.0, 0.0),
+    ("digital_printing", 100, 12.0, 0.0, 0.0),
+    ("digital_printing", 500, 8.0, 0.0, 0.0),
+    ("digital_printing", 1000, 6.0, 0.0, 0.0),
+    ("laser_engraving", 1, 30.0, 0.0, 200.0),
+    ("laser_engraving", 100, 18.0, 0.0, 200.0),
+    ("laser_engraving", 500, 12.0, 0.0, 200.0),
+    ("laser_engraving", 1000, 10.0, 0.0, 200.0),
+    ("dtg_dtf", 1, 150.0, 0.0, 0.0),
+    ("dtg_dtf", 50, 110.0, 0.0, 0.0),
+    ("dtg_dtf", 100, 90.0, 0.0, 0.0),
+    ("dtg_dtf", 500, 70.0, 0.0, 0.0),
+    ("embroidery", 1, 120.0, 10.0, 800.0),
+    ("embroidery", 50, 90.0, 8.0, 800.0),
+    ("embroidery", 100, 75.0, 6.0, 800.0),
+    ("embroidery", 500, 60.0, 5.0, 800.0),
+    ("sublimation", 1, 60.0, 0.0, 0.0),
+    ("sublimation", 50, 45.0, 0.0, 0.0),
+    ("sublimation", 100, 35.0, 0.0, 0.0),
+    ("sublimation", 500, 28.0, 0.0, 0.0),
+]
+
+
+# PDF export jobs (see exports.py); any worker can report on any job
+EXPORTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS export_jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        params TEXT NOT NULL,
+        pages INTEGER,
+        error TEXT,
+        created_at TEXT NOT NULL,
+        finished_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_export_jobs_created ON export_jobs(created_at);
+"""
+
+
+# Every column holding an uploaded image filename
+IMAGE_COLUMNS = (
+    "image", "screen_printing_image", "uv_printing_image", "offset_printing_image",
+    "digital_printing_image", "laser_engraving_image", "dtg_dtf_image",
+    "embroidery_image", "sublimation_image",
+)
+
+
+def _image_refs_schema() -> str:
+    """image_refs counts the references to each stored image across all
+    IMAGE_COLUMNS; triggers keep it exact, and a file is only deleted once
+    its row is gone."""
+    def add(col, only_if_changed=False):
+        changed = f" AND old.{col} IS NOT new.{col}" if only_if_changed else ""
+        return (
+            f"INSERT INTO image_refs (filename, refs) SELECT new.{col}, 1 "
+            f"WHERE new.{col} IS NOT NULL{changed} ON CONFLICT(filename) DO UPDATE SET refs = refs + 1;"
+        )
+
+    def drop(col, only_if_changed=False):
+        changed = f" AND old.{col} IS NOT new.{col}" if only_if_changed else ""
+        return f"UPDATE image_refs SET refs = refs - 1 WHERE filename = old.{col}{changed};"
+
+    cleanup = (
+        f"DELETE FROM image_refs WHERE refs <= 0 "
+        f"AND filename IN ({', '.join(f'old.{c}' for c in IMAGE_COLUMNS)});"
+    )
+    sep = "\n        "
+    return f"""
+    CREATE TABLE IF NOT EXISTS image_refs (
+        filename TEXT PRIMARY KEY,
+        refs INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TRIGGER IF NOT EXISTS image_refs_ai AFTER INSERT ON products BEGIN
+        {sep.join(add(c) for c in IMAGE_COLUMNS)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS image_refs_au AFTER UPDATE OF {", ".join(IMAGE_COLUMNS)} ON products BEGIN
+        {sep.join(drop(c, True) + sep + add(c, True) for c in IMAGE_COLUMNS)}
+        {cleanup}
+    END;
+    CREATE TRIGGER IF NOT EXISTS image_refs_ad AFTER DELETE ON products BEGIN
+        {sep.join(drop(c) for c in IMAGE_COLUMNS)}
+        {cleanup}
+    END;
+"""
+
+
+IMAGE_REFS_SCHEMA = _image_refs_schema()
+
+
+# Resized WebP/AVIF derivatives of uploaded images, keyed by original filename
+IMAGES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS image_variants (
+        source TEXT NOT NULL,
+        format TEXT NOT NULL,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        PRIMARY KEY (source, format, width)
+    ) WITHOUT ROWID;
+"""
+
+
+# Artwork analyses (see artwork.py), keyed by file content hash so a file used
+# by many products, or re-uploaded, is analyzed once
+ARTWORK_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS artwork_analysis (
+        file_hash TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        analysis TEXT NOT NULL,
+        analyzed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    ) WITHOUT ROWID;
+"""
+
+
+async def refresh_product_specs(db, product_ids):
+    """Re-derive product_methods / product_schedule rows for the given products.
+
+    The caller commits, so this runs inside the write's own transaction.
+    """
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), 500):
+        chunk = product_ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        await db.execute(f"DELETE FROM product_methods WHERE product_id IN ({placeholders})", chunk)
+        await db.execute(f"DELETE FROM product_schedule WHERE product_id IN ({placeholders})", chunk)
+        cursor = await db.execute(f"SELECT * FROM products WHERE id IN ({placeholders})", chunk)
+        columns = [d[0] for d in cursor.description]
+        rows = []
+        slots = []
+        for row in await cursor.fetchall():
+            product = dict(zip(columns, row))
+            schedule = parse_schedule(product.get("production_time"))
+            rows.extend((product["id"], *r) for r in method_rows(product, schedule))
+            slots.extend((product["id"], *e) for e in schedule)
+        await db.executemany("""
+            INSERT INTO product_schedule (
+                product_id, method_key, line_no, qty_min, qty_max, working_days, description
+            ) VALUES (?,?,?,?,?,?,?)
+        """, slots)
+        await db.executemany("""
+            INSERT INTO product_methods (
+                product_id, method_key, available, min_colors, max_colors,
+                multi_color, min_qty, working_days
+            ) VALUES (?,?,?,?,?,?,?,?)
+        """, rows)
+
+
+# ── Migrations ────────────────────────────────────────────────────────────────
+#
+# The schema version lives in PRAGMA user_version. Each step moves it up by
+# one; steps only ever get appended. A database created before versioning
+# (user_version 0) may already have some of the tables, so every step must
+# also be safe to run over them.
+
+async def _execute_script(db, script: str):
+    """Run a multi-statement script inside the open transaction.
+
+    `executescript` would commit first, so statements (triggers included)
+    are split with `sqlite3.complete_statement` and executed one by one.
+    """
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                await db.execute(statement)
+            statement = ""
+
+
+async def _migrate_products(db):
+    await db.execute(PRODUCTS_SCHEMA)
+    # Databases from before image uploads lack some image columns
+    cursor = await db.execute("PRAGMA table_info(products)")
+    existing = {row[1] for row in await cursor.fetchall()}
+    for col in IMAGE_COLUMNS:
+        if col not in existing:
+            await db.execute(f"ALTER TABLE products ADD COLUMN {col} TEXT")
+    cursor = await db.execute("SELECT COUNT(*) FROM products")
+    if (await cursor.fetchone())[0] == 0:
+        await db.executemany("""
+            INSERT INTO products (
+                name, category, material,
+                screen_printing, uv_printing, offset_printing, digital_printing,
+                laser_engraving, dtg_dtf, embroidery, sublimation, production_time
+            ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+        """, SEED_PRODUCTS)
+
+
+async def _migrate_fts(db):
+    await _execute_script(db, FTS_SCHEMA)
+    await db.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+async def _migrate_methods(db):
+    await _execute_script(db, METHODS_SCHEMA)
+    cursor = await db.execute("SELECT id FROM products")
+    await refresh_product_specs(db, [r[0] for r in await cursor.fetchall()])
+
+
+async def _migrate_images(db):
+    await _execute_script(db, IMAGES_SCHEMA)
+
+
+async def _migrate_changes(db):
+    await _execute_script(db, CHANGES_SCHEMA)
+
+
+async def _migrate_prices(db):
+    await _execute_script(db, PRICES_SCHEMA)
+    cursor = await db.execute("SELECT COUNT(*) FROM method_prices")
+    if (await cursor.fetchone())[0] == 0:
+        await db.executemany("""
+            INSERT INTO method_prices (method_key, qty_min, unit_price, extra_color_price, setup_fee)
+            VALUES (?,?,?,?,?)
+        """, SEED_PRICES)
+
+
+async def _migrate_exports(db):
+    await _execute_script(db, EXPORTS_SCHEMA)
+
+
+async def _migrate_image_refs(db):
+    await _execute_script(db, IMAGE_REFS_SCHEMA)
+    # Recount from scratch: the table may predate versioning
+    union = " UNION ALL ".join(f"SELECT {col} AS filename FROM products" for col in IMAGE_COLUMNS)
+    await db.execute("DELETE FROM image_refs")
+    await db.execute(f"""
+        INSERT INTO image_refs (filename, refs)
+        SELECT filename, COUNT(*) FROM ({union}) WHERE filename IS NOT NULL GROUP BY filename
+    """)
+
+
+async def _migrate_artwork(db):
+    await _execute_script(db, ARTWORK_SCHEMA)
+
+
+async def _migrate_export_leases(db):
+    # Which worker process runs a job, renewed while it is queued or running
+    await db.execute("ALTER TABLE export_jobs ADD COLUMN worker TEXT")
+    await db.execute("ALTER TABLE export_jobs ADD COLUMN renewed_at TEXT")
+
+
+async def _migrate_schedules(db):
+    # Schedule parsing learned "UV(50)", "(Qty:1-100)" and days-only lines
+    cursor = await db.execute("SELECT id FROM products")
+    await refresh_product_specs(db, [r[0] for r in await cursor.fetchall()])
+
+
+# Step n takes the schema from version n - 1 to n
+MIGRATIONS = [
+    _migrate_products,
+    _migrate_fts,
+    _migrate_methods,
+    _migrate_images,
+    _migrate_changes,
+    _migrate_prices,
+    _migrate_exports,
+    _migrate_image_refs,
+    _migrate_artwork,
+    _migrate_schedules,
+    _migrate_export_leases,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+async def _user_version(db) -> int:
+    cursor = await db.execute("PRAGMA user_version")
+    return (await cursor.fetchone())[0]
+
+
 async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                category TEXT NOT NULL,
-                material TEXT,
-                screen_printing TEXT,
-                uv_printing TEXT,
-                offset_printing TEXT,
-                digital_printing TEXT,
-                laser_engraving TEXT,
-                dtg_dtf TEXT,
-                embroidery TEXT,
-                sublimation TEXT,
-                production_time TEXT,
-                image TEXT
+    """Bring the database up to SCHEMA_VERSION; returns the steps applied.
+
+    A current database costs one PRAGMA read. Pending steps run in a single
+    BEGIN IMMEDIATE transaction, so a failed step leaves the schema as it
+    was, and workers starting together migrate once: the rest wait on the
+    lock and then find nothing to do.
+    """
+    async with aiosqlite.connect(DB_PATH, timeout=MIGRATION_TIMEOUT) as db:
+        # Persistent: stored in the database file, so set here once for all connections
+        await db.execute("PRAGMA journal_mode=WAL")
+        if await _user_version(db) == SCHEMA_VERSION:
+            return []
+        await db.execute("BEGIN IMMEDIATE")
+        version = await _user_version(db)  # another process may have just migrated
+        if version > SCHEMA_VERSION:
+            await db.rollback()
+            raise RuntimeError(
+                f"Database schema version {version} is newer than this code ({SCHEMA_VERSION})"
             )
-        """)
-        # Migration: add image column if it doesn't exist yet
-        try:
-            await db.execute("ALTER TABLE products ADD COLUMN image TEXT")
-            await db.commit()
-        except Exception:
-            pass  # Column already exists
-
-        # Migration: add per-method image columns
-        METHOD_IMG_COLS = [
-            "screen_printing_image", "uv_printing_image", "offset_printing_image",
-            "digital_printing_image", "laser_engraving_image", "dtg_dtf_image",
-            "embroidery_image", "sublimation_image",
-        ]
-        for col in METHOD_IMG_COLS:
-            try:
-                await db.execute(f"ALTER TABLE products ADD COLUMN {col} TEXT")
-                await db.commit()
-            except Exception:
-                pass  # Column already exists
+        applied = []
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            start = time.perf_counter()
+            await step(db)
+            applied.append((number, step.__name__.removeprefix("_migrate_"), time.perf_counter() - start))
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         await db.commit()
-
-
-        # Seed only if empty
-        cursor = await db.execute("SELECT COUNT(*) FROM products")
-        count = (await cursor.fetchone())[0]
-        if count == 0:
-            await db.executemany("""
-                INSERT INTO products (
-                    name, category, material,
-                    screen_printing, uv_printing, offset_printing, digital_printing,
-                    laser_engraving, dtg_dtf, embroidery, sublimation, production_time
-                ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-            """, SEED_PRODUCTS)
-            await db.commit()
+    for number, name, seconds in applied:
+        logger.info("Applied migration %d (%s) in %.1f ms", number, name, seconds * 1000)
+    return applied
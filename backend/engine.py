@@ -0,0 +1,136 @@
+import os
+from collections import OrderedDict
+from typing import NamedTuple, Tuple
+from models import ProductOut
+from serialize import dumps
+from specs import build_methods, method_specs, MethodSpec
+
+RECOMMEND_CACHE_SIZE = int(os.environ.get("RECOMMEND_CACHE_SIZE", "10000"))
+BATCH_CHUNK_SIZE = 500  # ids per IN (...) query, well under SQLite's variable limit
+PRODUCT_FIELDS = ["id"] + [f for f in ProductOut.model_fields if f != "id"]
+
+
+class Entry(NamedTuple):
+    """One product's precompiled recommendation.
+
+    `payload` is the full RecommendationOut JSON; `product_json` and
+    `method_json` are its pieces so ranked responses can be spliced together
+    without re-serializing, and `specs` holds the numeric data ranking uses.
+    """
+    payload: bytes
+    product_json: bytes
+    method_json: Tuple[bytes, ...]
+    specs: Tuple[MethodSpec, ...]
+
+
+def build_entry(product: dict, schedule) -> Entry:
+    product_json = dumps({field: product.get(field) for field in PRODUCT_FIELDS})
+    method_json = tuple(dumps(m) for m in build_methods(product, schedule))
+    payload = b'{"product":' + product_json + b',"methods":[' + b",".join(method_json) + b"]}"
+    return Entry(payload, product_json, method_json, method_specs(product, schedule))
+
+
+async def load_schedules(db, product_ids):
+    """{product_id: {method_key: [(qty_min, qty_max, working_days, description), ...]}}"""
+    schedules = {pid: {} for pid in product_ids}
+    if not product_ids:
+        return schedules
+    placeholders = ",".join("?" * len(product_ids))
+    cursor = await db.execute(f"""
+        SELECT product_id, method_key, qty_min, qty_max, working_days, description
+        FROM product_schedule WHERE product_id IN ({placeholders})
+        ORDER BY product_id, line_no
+    """, list(product_ids))
+    for pid, method_key, qty_min, qty_max, days, description in await cursor.fetchall():
+        schedules[pid].setdefault(method_key, []).append((qty_min, qty_max, days, description))
+    return schedules
+
+
+class RecommendationEngine:
+    """In-memory cache of precompiled recommendations keyed by product id.
+
+    Each product is parsed once into an Entry; later calls are a dict
+    lookup. Writers call `invalidate(product_id)` so only the changed entry
+    is rebuilt on the next request.
+    """
+
+    def __init__(self, maxsize: int = RECOMMEND_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, Entry]" = OrderedDict()
+        # Bumped on every invalidation so a build that raced a write is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, product_id: int, entry: Entry, generation: int):
+        if generation != self._generation:
+            return
+        self._entries[product_id] = entry
+        self._entries.move_to_end(product_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def lookup(self, product_id: int):
+        entry = self._entries.get(product_id)
+        if entry is not None:
+            self._entries.move_to_end(product_id)
+            self.hits += 1
+        return entry
+
+    async def get(self, db, product_id: int):
+        """Return the product's Entry, or None if the product is missing."""
+        entry = self.lookup(product_id)
+        if entry is not None:
+            return entry
+        self.misses += 1
+        generation = self._generation
+        cursor = await db.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        schedules = await load_schedules(db, [product_id])
+        entry = build_entry(dict(row), schedules[product_id])
+        self._store(product_id, entry, generation)
+        return entry
+
+    async def get_many(self, db, product_ids):
+        """Return {product_id: Entry} for the ids that exist.
+
+        Cache misses are fetched with one `IN (...)` query per chunk of ids.
+        """
+        found = {}
+        missing = []
+        for pid in dict.fromkeys(product_ids):
+            entry = self.lookup(pid)
+            if entry is None:
+                missing.append(pid)
+            else:
+                found[pid] = entry
+        self.misses += len(missing)
+        generation = self._generation
+        for start in range(0, len(missing), BATCH_CHUNK_SIZE):
+            chunk = missing[start:start + BATCH_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = await db.execute(f"SELECT * FROM products WHERE id IN ({placeholders})", chunk)
+            rows = await cursor.fetchall()
+            schedules = await load_schedules(db, [row["id"] for row in rows])
+            for row in rows:
+                product = dict(row)
+                entry = build_entry(product, schedules[product["id"]])
+                self._store(product["id"], entry, generation)
+                found[product["id"]] = entry
+        return found
+
+    def invalidate(self, product_id: int = None):
+        """Drop one product's entry, or everything when no id is given."""
+        self._generation += 1
+        if product_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(product_id, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+recommendation_engine = RecommendationEngine()
@@ -0,0 +1,465 @@
+"""PDF exports: product spec sheets, quotes and the whole catalog.
+
+Pages are rendered in the shared process pool, never on the event loop.
+Spec-sheet pages are cached on disk under a hash of everything drawn on
+them (the product's recommendation JSON plus its image files), so an
+unchanged product is never rendered twice. Documents are written page by
+page, either to a client (`catalog_pdf`) or to a job's file on disk; jobs
+are queued per process and tracked in the export_jobs table, so any worker
+can answer status and download requests. Each worker renews a lease on
+its unfinished jobs; when one stops, another re-queues its queued jobs and
+fails the one it was running.
+"""
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from database import DB_PATH, UPLOADS_DIR, connection
+from engine import recommendation_engine
+from pdfdoc import (
+    MARGIN, PAGE_HEIGHT, PAGE_WIDTH, Canvas, PDFWriter, jpeg_image, pack_pages, text_width, truncate,
+    unpack_pages, wrap,
+)
+from workers import run_in_process, spawn
+
+logger = logging.getLogger(__name__)
+
+# Job files and the page cache; beside the database unless set
+EXPORTS_DIR = os.environ.get("EXPORTS_DIR") or os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "exports")
+PAGES_DIR = os.path.join(EXPORTS_DIR, "pages")
+JOBS_DIR = os.path.join(EXPORTS_DIR, "jobs")
+
+# Export jobs run at once per process; more wait in the queue
+EXPORT_CONCURRENCY = int(os.environ.get("EXPORT_CONCURRENCY", "2"))
+# Finished jobs (and their files) are kept this many hours
+EXPORT_JOB_TTL_HOURS = float(os.environ.get("EXPORT_JOB_TTL_HOURS", "24"))
+# Cached spec-sheet pages kept on disk (least recently used go first)
+EXPORT_PAGE_CACHE_FILES = int(os.environ.get("EXPORT_PAGE_CACHE_FILES", "20000"))
+# Seconds a worker's hold on its queued/running jobs lasts without renewal;
+# after that (the process died) another worker takes them over
+EXPORT_LEASE_SECONDS = 60
+EXPORT_CHUNK_SIZE = 32  # products fetched and rendered together
+RENDER_VERSION = b"spec-sheet-1"  # bump when the page layout changes
+IMAGE_DPI_SCALE = 2  # image pixels per point of the box they're drawn in
+
+# ── Rendering (runs in worker processes) ──────────────────────────────────────
+
+def _load_image(filename, box: float):
+    if not filename:
+        return None
+    try:
+        return jpeg_image(os.path.join(UPLOADS_DIR, filename), int(box * IMAGE_DPI_SCALE))
+    except Exception:
+        return None  # missing or unreadable file: leave the space empty
+
+
+def render_spec_pages(payload: bytes):
+    """Spec-sheet page(s) for one product from its RecommendationOut JSON."""
+    rec = json.loads(payload)
+    product = rec["product"]
+    text_right = PAGE_WIDTH - MARGIN - 180
+    pages = []
+    canvas = Canvas()
+
+    y = PAGE_HEIGHT - MARGIN - 18
+    for line in wrap(product["name"], text_right - MARGIN, 18, bold=True):
+        canvas.text(MARGIN, y, line, size=18, bold=True)
+        y -= 22
+    details = f"Category: {product['category']}"
+    if product.get("material"):
+        details += f"    Material: {product['material']}"
+    canvas.text(MARGIN, y, details, size=10, gray=0.35)
+    y -= 14
+    main_image = _load_image(product.get("image"), 160)
+    if main_image is not None:
+        canvas.image(main_image, PAGE_WIDTH - MARGIN - 160, PAGE_HEIGHT - MARGIN - 160, 160, 160)
+        y = min(y, PAGE_HEIGHT - MARGIN - 172)
+
+    y -= 16
+    canvas.text(MARGIN, y, "Printing methods", size=13, bold=True)
+    y -= 10
+    text_width_limit = PAGE_WIDTH - 2 * MARGIN - 70
+    unavailable = []
+    for method in rec["methods"]:
+        if not method["available"]:
+            unavailable.append(method["method"])
+            continue
+        lines = []
+        if method.get("color_limit"):
+            lines.append(f"Colors: {method['color_limit']}")
+        if method.get("notes"):
+            lines.extend(wrap(f"Notes: {method['notes']}", text_width_limit, 9))
+        if method.get("production_time"):
+            lines.extend(wrap(f"Production: {method['production_time']}", text_width_limit, 9))
+        facts = []
+        if method.get("min_qty") is not None:
+            facts.append(f"Minimum qty {method['min_qty']}")
+        if method.get("working_days") is not None:
+            facts.append(f"from {method['working_days']} working day(s)")
+        if facts:
+            lines.append(", ".join(facts))
+        height = max(16 + 12 * len(lines), 64) + 8
+        if y - height < MARGIN + 10:
+            pages.append(canvas.page())
+            canvas = Canvas()
+            y = PAGE_HEIGHT - MARGIN - 14
+            canvas.text(MARGIN, y, f"{product['name']} (continued)", size=12, bold=True)
+            y -= 10
+        canvas.line(MARGIN, y, PAGE_WIDTH - MARGIN, y)
+        row_top = y - 8
+        canvas.text(MARGIN, row_top - 11, method["method"], size=11, bold=True)
+        line_y = row_top - 27
+        for line in lines:
+            canvas.text(MARGIN, line_y, line, size=9, gray=0.2)
+            line_y -= 12
+        method_image = _load_image(method.get("method_image"), 60)
+        if method_image is not None:
+            canvas.image(method_image, PAGE_WIDTH - MARGIN - 60, row_top - 62, 60, 60)
+        y -= height
+    if unavailable:
+        y -= 8
+        for line in wrap("Not available: " + ", ".join(unavailable), PAGE_WIDTH - 2 * MARGIN, 9):
+            canvas.text(MARGIN, y, line, size=9, gray=0.45)
+            y -= 12
+    pages.append(canvas.page())
+    return pages
+
+
+QUOTE_ROWS_PER_PAGE = 48
+# (heading, x of the column's left edge, or its right edge when right-aligned)
+QUOTE_COLUMNS = (
+    ("#", MARGIN, False), ("Product", MARGIN + 24, False), ("Method", MARGIN + 168, False),
+    ("Qty", MARGIN + 304, True), ("Colors", MARGIN + 336, True), ("Unit", MARGIN + 378, True),
+    ("Setup", MARGIN + 426, True), ("Total", PAGE_WIDTH - MARGIN - 26, True), ("Days", PAGE_WIDTH - MARGIN, True),
+)
+
+
+def _money(value) -> str:
+    return "" if value is None else f"{value:,.2f}"
+
+
+def render_quote_pages(quote: dict, names: dict, title: str):
+    """Table pages for a build_quote() result; `names` maps product id to name."""
+    lines = quote["lines"]
+    pages = []
+    for start in range(0, max(len(lines), 1), QUOTE_ROWS_PER_PAGE):
+        canvas = Canvas()
+        y = PAGE_HEIGHT - MARGIN - 18
+        if start == 0:
+            canvas.text(MARGIN, y, title, size=18, bold=True)
+            y -= 18
+            lead = quote["lead_days"]
+            summary = (
+                f"Total {quote['currency']} {_money(quote['total'])}    "
+                f"{quote['feasible_lines']} of {len(lines)} line(s) can be made"
+                + (f"    Lead time up to {lead} working day(s)" if lead is not None else "")
+            )
+            canvas.text(MARGIN, y, summary, size=10, gray=0.35)
+            y -= 24
+        for heading, x, right in QUOTE_COLUMNS:
+            canvas.text(x - text_width(heading, 9, True) if right else x, y, heading, size=9, bold=True)
+        y -= 5
+        canvas.line(MARGIN, y, PAGE_WIDTH - MARGIN, y)
+        y -= 12
+        for number, line in enumerate(lines[start:start + QUOTE_ROWS_PER_PAGE], start + 1):
+            feasible = line["feasible"]
+            cells = [
+                str(number),
+                truncate(names.get(line["product_id"], f"#{line['product_id']}"), 140, 8),
+                truncate((line["method"] if feasible else line["reason"]) or "", 100, 8),
+                str(line["qty"]), str(line["colors"]),
+                _money(line["unit_price"]), _money(line["setup_fee"]), _money(line["total"]),
+                "" if line["lead_days"] is None else str(line["lead_days"]),
+            ]
+            gray = 0 if feasible else 0.5
+            for (_, x, right), cell in zip(QUOTE_COLUMNS, cells):
+                canvas.text(x - text_width(cell, 8) if right else x, y, cell, size=8, gray=gray)
+            y -= 13
+        pages.append(canvas.page())
+    return pages
+
+
+def render_notice_page(title: str, message: str):
+    canvas = Canvas()
+    canvas.text(MARGIN, PAGE_HEIGHT - MARGIN - 18, title, size=18, bold=True)
+    canvas.text(MARGIN, PAGE_HEIGHT - MARGIN - 40, message, size=10, gray=0.35)
+    return canvas.page()
+
+
+# ── Spec-sheet page cache ─────────────────────────────────────────────────────
+
+def _image_names(payload: bytes):
+    rec = json.loads(payload)
+    return [rec["product"].get("image")] + [m.get("method_image") for m in rec["methods"]]
+
+
+def page_key(payload: bytes) -> str:
+    """Hash of everything a spec sheet shows: the recommendation JSON and the
+    name, size and mtime of each image file it embeds."""
+    digest = hashlib.blake2b(RENDER_VERSION + b"\0" + payload, digest_size=16)
+    for name in _image_names(payload):
+        if name:
+            try:
+                st = os.stat(os.path.join(UPLOADS_DIR, name))
+                digest.update(f"\0{name}:{st.st_size}:{st.st_mtime_ns}".encode())
+            except OSError:
+                digest.update(f"\0{name}:missing".encode())
+    return digest.hexdigest()
+
+
+def _read_cached(key: str):
+    path = os.path.join(PAGES_DIR, f"{key}.pages")
+    try:
+        with open(path, "rb") as f:
+            pages = unpack_pages(f.read())
+        os.utime(path)  # mark as recently used
+        return pages
+    except (OSError, ValueError):
+        return None  # missing, or not a complete pack: render again
+
+
+def _write_cached(key: str, pages):
+    path = os.path.join(PAGES_DIR, f"{key}.pages")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    with open(tmp_path, "wb") as f:
+        f.write(pack_pages(pages))
+    os.replace(tmp_path, path)
+
+
+async def spec_pages(payload: bytes):
+    """A product's rendered pages, from the cache when it is unchanged."""
+    key = await asyncio.to_thread(page_key, payload)
+    pages = await asyncio.to_thread(_read_cached, key)
+    if pages is None:
+        pages = await run_in_process(render_spec_pages, payload)
+        await asyncio.to_thread(_write_cached, key, pages)
+    return pages
+
+
+def prune_page_cache(keep: int = EXPORT_PAGE_CACHE_FILES):
+    paths = glob.glob(os.path.join(PAGES_DIR, "*.pages"))
+    if len(paths) <= keep:
+        return
+    by_age = sorted(paths, key=lambda p: os.stat(p).st_mtime)
+    for path in by_age[:len(paths) - keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ── Documents ─────────────────────────────────────────────────────────────────
+
+async def spec_sheet_chunks(writer: PDFWriter, product_ids):
+    """PDF bytes for one spec sheet per existing product, in the given order.
+
+    Products are fetched and rendered EXPORT_CHUNK_SIZE at a time, so only
+    that many pages are ever held here while the document is written out.
+    """
+    yield writer.begin()
+    for start in range(0, len(product_ids), EXPORT_CHUNK_SIZE):
+        chunk = product_ids[start:start + EXPORT_CHUNK_SIZE]
+        async with connection() as db:
+            entries = await recommendation_engine.get_many(db, chunk)
+        rendered = await asyncio.gather(*(spec_pages(entries[pid].payload) for pid in chunk if pid in entries))
+        yield b"".join(writer.add_page(page, writer.title) for pages in rendered for page in pages)
+    if writer.page_count == 0:
+        yield writer.add_page(render_notice_page(writer.title, "No products to export."))
+    yield writer.end()
+
+
+async def catalog_ids(category: str = None):
+    query = "SELECT id FROM products" + (" WHERE category = ?" if category else "") + " ORDER BY id"
+    async with connection() as db:
+        cursor = await db.execute(query, (category,) if category else ())
+        return [r[0] for r in await cursor.fetchall()]
+
+
+async def catalog_pdf(category: str = None):
+    """The catalog (or one category) as spec sheets, streamed page by page."""
+    title = f"{category} catalog" if category else "Product catalog"
+    async for chunk in spec_sheet_chunks(PDFWriter(title), await catalog_ids(category)):
+        yield chunk
+
+
+async def quote_chunks(writer: PDFWriter, lines):
+    from quotes import build_quote
+
+    async with connection() as db:
+        quote = await build_quote(db, lines)
+        ids = sorted({line["product_id"] for line in quote["lines"]})
+        names = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor = await db.execute(
+                f"SELECT id, name FROM products WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            names.update({r[0]: r[1] for r in await cursor.fetchall()})
+    pages = await run_in_process(render_quote_pages, quote, names, writer.title)
+    yield writer.begin()
+    for page in pages:
+        yield writer.add_page(page, writer.title)
+    yield writer.end()
+
+
+# ── Jobs ──────────────────────────────────────────────────────────────────────
+
+def job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.pdf")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+async def _update_job(job_id: str, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    async with connection(write=True) as db:
+        await db.execute(f"UPDATE export_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        await db.commit()
+
+
+def _write(f, chunk: bytes):
+    f.write(chunk)
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def run_job(job_id: str, kind: str, params: dict):
+    await _update_job(job_id, status="running")
+    tmp_path = job_path(job_id) + ".part"
+    try:
+        if kind == "quote":
+            from models import QuoteRequest
+
+            writer = PDFWriter(params.get("title") or "Quotation")
+            chunks = quote_chunks(writer, QuoteRequest(lines=params["lines"]).lines)
+        elif kind == "catalog":
+            category = params.get("category")
+            writer = PDFWriter(f"{category} catalog" if category else "Product catalog")
+            chunks = spec_sheet_chunks(writer, await catalog_ids(category))
+        else:
+            writer = PDFWriter(params.get("title") or "Product spec sheets")
+            chunks = spec_sheet_chunks(writer, params["product_ids"])
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(_write, f, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.replace, tmp_path, job_path(job_id))
+    except Exception as exc:
+        logger.exception("Export job %s failed", job_id)
+        await asyncio.to_thread(_discard, tmp_path)
+        await _update_job(job_id, status="failed", error=str(exc) or type(exc).__name__, finished_at=_now())
+        return
+    await _update_job(job_id, status="done", pages=writer.page_count, finished_at=_now())
+
+
+async def sweep():
+    """Forget jobs past EXPORT_JOB_TTL_HOURS and trim the page cache."""
+    cutoff = datetime.fromtimestamp(time.time() - EXPORT_JOB_TTL_HOURS * 3600, timezone.utc)
+    async with connection(write=True) as db:
+        cursor = await db.execute(
+            "DELETE FROM export_jobs WHERE created_at < ? RETURNING id", (cutoff.strftime("%Y-%m-%dT%H:%M:%SZ"),)
+        )
+        expired = [r[0] for r in await cursor.fetchall()]
+        await db.commit()
+    for job_id in expired:
+        await asyncio.to_thread(_discard, job_path(job_id))
+    await asyncio.to_thread(prune_page_cache)
+
+
+class ExportQueue:
+    """FIFO of export jobs for this process, run EXPORT_CONCURRENCY at a time."""
+
+    def __init__(self):
+        self._queue = None
+        self._unfinished = 0  # jobs of this worker queued or running
+        self.worker_id = uuid.uuid4().hex
+
+    def start(self):
+        os.makedirs(PAGES_DIR, exist_ok=True)
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        self._queue = asyncio.Queue()
+        for _ in range(EXPORT_CONCURRENCY):
+            spawn(self._consume())
+        spawn(self._keep_leases())
+
+    async def submit(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        async with connection(write=True) as db:
+            await db.execute("""
+                INSERT INTO export_jobs (id, kind, status, params, created_at, worker, renewed_at)
+                VALUES (?, ?, 'queued', ?, ?, ?, ?)
+            """, (job_id, kind, json.dumps(params), _now(), self.worker_id, _now()))
+            await db.commit()
+        self._unfinished += 1
+        self._queue.put_nowait((job_id, kind, params))
+        spawn(sweep())
+        return job_id
+
+    async def _consume(self):
+        while True:
+            job_id, kind, params = await self._queue.get()
+            try:
+                await run_job(job_id, kind, params)
+            except Exception:
+                logger.exception("Export job %s could not be recorded", job_id)
+            finally:
+                self._unfinished -= 1
+                self._queue.task_done()
+
+    async def _keep_leases(self):
+        """Renew this worker's jobs and adopt those of workers that stopped
+        (at startup, then every third of a lease)."""
+        while True:
+            try:
+                await self._renew_and_adopt()
+            except Exception:
+                logger.exception("Export job leases could not be renewed")
+            await asyncio.sleep(EXPORT_LEASE_SECONDS / 3)
+
+    async def _renew_and_adopt(self):
+        cutoff = datetime.fromtimestamp(time.time() - EXPORT_LEASE_SECONDS, timezone.utc)
+        cutoff = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
+        stale = "status IN ('queued', 'running') AND (renewed_at IS NULL OR renewed_at < ?)"
+        async with connection() as db:
+            cursor = await db.execute(f"SELECT 1 FROM export_jobs WHERE {stale} LIMIT 1", (cutoff,))
+            found_stale = await cursor.fetchone() is not None
+        if not found_stale and not self._unfinished:
+            return  # idle workers only read
+        async with connection(write=True) as db:
+            await db.execute("""
+                UPDATE export_jobs SET renewed_at = ?
+                WHERE worker = ? AND status IN ('queued', 'running')
+            """, (_now(), self.worker_id))
+            # A job that was running may be what stopped its worker: don't retry it
+            await db.execute(f"""
+                UPDATE export_jobs SET status = 'failed', error = 'Interrupted by a server restart', finished_at = ?
+                WHERE {stale} AND status = 'running'
+            """, (_now(), cutoff))
+            cursor = await db.execute(f"""
+                UPDATE export_jobs SET worker = ?, renewed_at = ?
+                WHERE {stale}
+                RETURNING created_at, id, kind, params
+            """, (self.worker_id, _now(), cutoff))
+            adopted = sorted(tuple(r) for r in await cursor.fetchall())
+            await db.commit()
+        for _, job_id, kind, params in adopted:
+            logger.info("Re-queued export job %s from a stopped worker", job_id)
+            self._unfinished += 1
+            self._queue.put_nowait((job_id, kind, json.loads(params)))
+
+
+export_queue = ExportQueue()
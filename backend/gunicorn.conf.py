@@ -0,0 +1,24 @@
+"""Multi-process launch for Linux/macOS, from the backend directory:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Each worker is a full copy of the app with its own pool and caches; they stay
+consistent through the catalog_changes log (see cache.ChangeWatcher).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 60
+graceful_timeout = 20
+keepalive = 5
+
+
+def on_starting(server):
+    """Create or migrate the database once, in the master, before any worker starts."""
+    import asyncio
+    from database import init_db
+
+    asyncio.run(init_db())
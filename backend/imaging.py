@@ -0,0 +1,281 @@
+import asyncio
+import glob
+import logging
+import os
+import time
+from cache import catalog_changed
+from database import UPLOADS_DIR, connection
+from workers import run_in_process, spawn
+
+logger = logging.getLogger(__name__)
+
+# Uploads are stored as <first 32 hex digits of their SHA-256><extension>
+CONTENT_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+HASH_CHARS = 32
+# Seconds between sweeps for unreferenced files (per worker process)
+UPLOAD_SWEEP_INTERVAL = float(os.environ.get("UPLOAD_SWEEP_INTERVAL", "3600"))
+# Files younger than this are left alone: they may belong to an upload in progress
+ORPHAN_GRACE_SECONDS = 3600
+SWEEP_BATCH = 500
+
+# Stored uploads are world-readable, so a proxy or static server running as
+# another user can serve /uploads
+UPLOAD_FILE_MODE = 0o644
+# Widths generated for every uploaded image (never upscaled; a narrower
+# image gets its own width as the largest)
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_QUALITY = 80
+
+
+def variant_filename(source: str, width: int, fmt: str) -> str:
+    stem = os.path.splitext(source)[0]
+    return f"{stem}__w{width}.{fmt}"
+
+
+def variant_files(source: str):
+    """Paths of all derivatives of `source` currently on disk."""
+    stem = glob.escape(os.path.splitext(source)[0])
+    return glob.glob(os.path.join(UPLOADS_DIR, f"{stem}__w*.*"))
+
+
+def render_variants(source_path: str, out_dir: str):
+    """Write resized WebP (and AVIF when Pillow supports it) copies of an image.
+
+    Runs in a worker process. Returns [(width, height, fmt, filename)].
+    """
+    from PIL import ExifTags, Image, ImageOps, features
+
+    formats = ["webp"] + (["avif"] if features.check("avif") else [])
+    source = os.path.basename(source_path)
+    largest = max(VARIANT_WIDTHS)
+    results = []
+    with Image.open(source_path) as img:
+        mode = "RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB"
+        img.draft(None, (largest, largest))  # JPEG: decode at reduced scale
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert(mode)  # palette and other modes can't be resampled as-is
+        # Shrink to the largest variant before rotating and converting, so
+        # neither touches full-size pixels; the rotation swaps the axes
+        sideways = img.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8)
+        upright_width = img.height if sideways else img.width
+        if upright_width > largest:
+            scale = largest / upright_width
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+        img = ImageOps.exif_transpose(img).convert(mode)
+        widths = [w for w in VARIANT_WIDTHS if w < img.width] + [img.width]
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                filename = variant_filename(source, width, fmt)
+                tmp_path = os.path.join(out_dir, f".{filename}.part")
+                resized.save(tmp_path, format=fmt.upper(), quality=VARIANT_QUALITY)
+                os.replace(tmp_path, os.path.join(out_dir, filename))
+                results.append((width, height, fmt, filename))
+    return results
+
+
+def content_filename(digest_hex: str, content_type: str) -> str:
+    return digest_hex[:HASH_CHARS] + CONTENT_EXTENSIONS.get(content_type, ".jpg")
+
+
+def is_variant(filename: str) -> bool:
+    return "__w" in filename
+
+
+def store_blob(tmp_path: str, filename: str) -> bool:
+    """Move a finished upload into place under its content name.
+
+    Returns False (and drops the temp file) when identical content is
+    already stored, so repeated logos and mockups are kept once.
+    """
+    final_path = os.path.join(UPLOADS_DIR, filename)
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+        return False
+    os.chmod(tmp_path, UPLOAD_FILE_MODE)  # mkstemp makes it owner-only
+    os.replace(tmp_path, final_path)
+    return True
+
+
+def delete_image_files(filename: str):
+    """Remove a stored image and its derivatives from disk."""
+    try:
+        os.remove(os.path.join(UPLOADS_DIR, filename))
+    except OSError:
+        pass
+    delete_variant_files(filename)
+
+
+async def unreferenced(db, filenames):
+    """The given filenames that no product image column refers to."""
+    filenames = list(dict.fromkeys(f for f in filenames if f))
+    referenced = set()
+    for start in range(0, len(filenames), SWEEP_BATCH):
+        chunk = filenames[start:start + SWEEP_BATCH]
+        cursor = await db.execute(
+            f"SELECT filename FROM image_refs WHERE filename IN ({','.join('?' * len(chunk))})", chunk
+        )
+        referenced.update(r[0] for r in await cursor.fetchall())
+    return [f for f in filenames if f not in referenced]
+
+
+def delete_variant_files(source: str):
+    for path in variant_files(source):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def forget_variants(db, source: str):
+    """Drop a source image's variant rows (caller commits)."""
+    if source:
+        await db.execute("DELETE FROM image_variants WHERE source = ?", (source,))
+
+
+async def generate_variants(source: str):
+    source_path = os.path.join(UPLOADS_DIR, source)
+    try:
+        variants = await run_in_process(render_variants, source_path, UPLOADS_DIR)
+    except Exception:
+        logger.exception("Could not generate variants for %s", source)
+        return
+    async with connection(write=True) as db:
+        if not os.path.exists(source_path):
+            # The original was replaced or removed while we were rendering
+            delete_variant_files(source)
+            return
+        await db.executemany("""
+            INSERT OR REPLACE INTO image_variants (source, format, width, height, filename)
+            VALUES (?,?,?,?,?)
+        """, [(source, fmt, width, height, filename) for width, height, fmt, filename in variants])
+        # Product listings embed the main image's srcset: log a change so
+        # their ETags move on and clients pick the variants up
+        cursor = await db.execute("""
+            INSERT INTO catalog_changes (product_id, op)
+            SELECT id, 'update' FROM products WHERE image = ? RETURNING product_id
+        """, (source,))
+        changed = [r[0] for r in await cursor.fetchall()]
+        await db.commit()
+    for product_id in changed:
+        catalog_changed(product_id)
+
+
+def schedule_variants(source: str):
+    """Queue derivative generation for a freshly saved upload."""
+    spawn(generate_variants(source))
+
+
+async def backfill_variants():
+    """Queue variants for referenced images that have none (e.g. older uploads)."""
+    async with connection() as db:
+        cursor = await db.execute("""
+            SELECT filename FROM image_refs
+            WHERE filename NOT IN (SELECT DISTINCT source FROM image_variants)
+        """)
+        missing = [r[0] for r in await cursor.fetchall()]
+    for source in missing:
+        if os.path.exists(os.path.join(UPLOADS_DIR, source)):
+            schedule_variants(source)
+
+
+async def load_variants(db, sources):
+    """{source: [(format, width, height, filename), ...]} ordered by width."""
+    sources = [s for s in sources if s]
+    variants = {s: [] for s in sources}
+    if not sources:
+        return variants
+    placeholders = ",".join("?" * len(sources))
+    cursor = await db.execute(f"""
+        SELECT source, format, width, height, filename FROM image_variants
+        WHERE source IN ({placeholders}) ORDER BY source, format, width
+    """, sources)
+    for source, fmt, width, height, filename in await cursor.fetchall():
+        variants[source].append((fmt, width, height, filename))
+    return variants
+
+
+def build_srcset(variants) -> dict:
+    """{format: "url 320w, url 640w, ..."} for an image's variants."""
+    srcset = {}
+    for fmt, width, _, filename in variants:
+        entry = f"/uploads/{filename} {width}w"
+        srcset[fmt] = f"{srcset[fmt]}, {entry}" if fmt in srcset else entry
+    return srcset
+
+
+# ── Orphan sweeper ────────────────────────────────────────────────────────────
+
+def _scan_uploads(grace: float):
+    """(stale temp files, old enough originals, old enough variants, stems on disk)."""
+    now = time.time()
+    temp, originals, variants, stems = [], [], [], set()
+    with os.scandir(UPLOADS_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            name = entry.name
+            old_enough = now - entry.stat().st_mtime >= grace
+            if name.startswith("."):
+                if name.endswith(".part") and old_enough:
+                    temp.append(entry.path)  # failed upload or variant render
+            elif is_variant(name):
+                if old_enough:
+                    variants.append(name)
+            else:
+                stems.add(os.path.splitext(name)[0])
+                if old_enough:
+                    originals.append(name)
+    return temp, originals, variants, stems
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def sweep_uploads(grace: float = ORPHAN_GRACE_SECONDS) -> int:
+    """Delete files no product refers to: images of deleted products, temp
+    files of failed uploads, and variants whose original is gone.
+
+    Each batch is checked and removed under the write lock (BEGIN IMMEDIATE),
+    as uploads store their file under it too, so a file can't be deleted
+    just as new content is deduplicated onto it. Returns files removed.
+    """
+    temp, originals, variants, stems = await asyncio.to_thread(_scan_uploads, grace)
+    for path in temp:
+        await asyncio.to_thread(_remove, path)
+    removed = len(temp)
+    for start in range(0, len(originals), SWEEP_BATCH):
+        async with connection(write=True) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            orphans = await unreferenced(db, originals[start:start + SWEEP_BATCH])
+            for filename in orphans:
+                await forget_variants(db, filename)
+                await asyncio.to_thread(delete_image_files, filename)
+            await db.commit()
+        removed += len(orphans)
+        stems.difference_update(os.path.splitext(f)[0] for f in orphans)
+    for name in variants:
+        if name.split("__w")[0] not in stems:
+            await asyncio.to_thread(_remove, os.path.join(UPLOADS_DIR, name))
+            removed += 1
+    if removed:
+        logger.info("Removed %d unreferenced upload file(s)", removed)
+    return removed
+
+
+async def _sweep_forever():
+    while True:
+        try:
+            await sweep_uploads()
+        except Exception:
+            logger.exception("Upload sweep failed")
+        await asyncio.sleep(UPLOAD_SWEEP_INTERVAL)
+
+
+def start_upload_sweeper():
+    spawn(_sweep_forever())
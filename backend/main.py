@@ -1,15 +1,56 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from database import init_db, UPLOADS_DIR
-from routers import products, recommend, auth, images
+from cache import change_watcher
+from database import init_db, db_pool, SCHEMA_VERSION, UPLOADS_DIR
+from engine import recommendation_engine
+from exports import export_queue
+from pool import PoolTimeout
+from imaging import backfill_variants, start_upload_sweeper
+from routers import products, recommend, auth, images, catalog, quotes, exports
+from static import UploadFiles
+from suggest import suggest_index
+import logging
+import metrics
+import time
+import workers
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent in each startup phase of this worker, for /api/startup
+startup_timings = {}
+startup_migrations = []  # (number, name, seconds) applied by this worker
+
+
+async def _timed(name: str, step):
+    start = time.perf_counter()
+    result = await step()
+    startup_timings[name] = time.perf_counter() - start
+    return result
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    start = time.perf_counter()
+    startup_migrations[:] = await _timed("migrate", init_db)
+    await _timed("pool", db_pool.open)
+    await _timed("variants", backfill_variants)
+    await _timed("suggest", suggest_index.refresh)
+    await _timed("changes", change_watcher.start)
+    startup_timings["total"] = time.perf_counter() - start
+    logger.info(
+        "Started in %.1f ms (%s; %d migration(s) applied)",
+        startup_timings["total"] * 1000,
+        ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in startup_timings.items() if name != "total"),
+        len(startup_migrations),
+    )
+    export_queue.start()
+    start_upload_sweeper()
     yield
+    await workers.shutdown()
+    await db_pool.close()
 
 
 app = FastAPI(
@@ -17,23 +58,80 @@ app = FastAPI(
     description="API for recommending printing methods for promotional products.",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# Added before CORS so its 413 responses still get CORS headers
+app.add_middleware(images.UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "X-Next-Cursor", "Server-Timing"],
 )
+# Outermost, so its timings include every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
 
-# Serve uploaded product images as static files
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": "Database busy, please retry"})
+
+
+# Serve uploaded product images as static files (immutable, content-addressed)
+app.mount("/uploads", UploadFiles(directory=UPLOADS_DIR), name="uploads")
 
 app.include_router(products.router)
 app.include_router(images.router)
+app.include_router(catalog.router)
 app.include_router(recommend.router)
+app.include_router(quotes.router)
+app.include_router(exports.router)
 app.include_router(auth.router)
+if metrics.SERVER_TIMING:
+    metrics.instrument_endpoints(app)
+
+
+@app.get("/api/db/pool", tags=["Health"])
+async def pool_stats():
+    return db_pool.stats()
+
+
+@app.get("/api/startup", tags=["Health"])
+async def startup_report():
+    """Where this worker's boot time went, in milliseconds per phase."""
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in startup_timings.items()},
+        "migrations_applied": [
+            {"version": number, "name": name, "ms": round(seconds * 1000, 1)}
+            for number, name, seconds in startup_migrations
+        ],
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def prometheus_metrics():
+    """Request, database and upload metrics in the Prometheus text format."""
+    gauges = {
+        f"db_pool_{key}": (f"Connection pool {key.replace('_', ' ')}", value)
+        for key, value in db_pool.stats().items()
+    }
+    gauges.update({
+        f"recommend_cache_{key}": (f"Recommendation cache {key}", value)
+        for key, value in recommendation_engine.stats().items()
+    })
+    gauges.update({
+        f"auth_token_cache_{key}": (f"Verified-token cache {key}", value)
+        for key, value in auth.token_cache.stats().items()
+    })
+    gauges.update({
+        f"startup_{name}_seconds": (f"Startup time spent in {name}", value)
+        for name, value in startup_timings.items()
+    })
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
@@ -0,0 +1,267 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Add a Server-Timing header (db / serialize / total) to every response
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, labels=()):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.label_names, key)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels=()):
+        self._values[labels] = value
+
+
+class Histogram:
+    """Prometheus-style histogram; buckets are stored per bucket and summed on render."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value: float, labels=()):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self):
+        names = self.label_names + ("le",)
+        for key, (counts, total) in self._values.items():
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                yield f"{self.name}_bucket{_labels(names, key + (bound,))} {running}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {total}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {running}"
+
+
+REGISTRY = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+http_requests = _register(Counter(
+    "http_requests_total", "HTTP responses by route and status", ("method", "route", "status")))
+http_latency = _register(Histogram(
+    "http_request_duration_seconds", "Time from request to last response byte", ("method", "route")))
+http_in_progress = _register(Gauge("http_requests_in_progress", "Requests being handled"))
+db_queries = _register(Histogram(
+    "db_query_duration_seconds", "Time per SQLite statement, fetch or commit", ("op",), QUERY_BUCKETS))
+db_rows = _register(Counter("db_rows_fetched_total", "Rows returned to handlers"))
+db_connections = _register(Counter(
+    "db_connections_total", "Connections handed out (pooled reader/writer, or direct)", ("mode",)))
+db_connection_hold = _register(Histogram(
+    "db_connection_hold_seconds", "How long a borrowed connection was kept", ("mode",)))
+uploads = _register(Counter("uploads_total", "Image uploads by outcome", ("result",)))
+upload_bytes = _register(Counter("upload_bytes_total", "Bytes of image uploads stored"))
+
+
+def render(extra_gauges=None) -> str:
+    """All metrics in the Prometheus text format; `extra_gauges` maps name -> (help, value)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for name, (help, value) in (extra_gauges or {}).items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {int(value) if isinstance(value, bool) else value}")
+    return "\n".join(lines) + "\n"
+
+
+# ── Per-request timing ────────────────────────────────────────────────────────
+
+class RequestTiming:
+    __slots__ = ("start", "db", "endpoint_done")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.endpoint_done = None
+
+
+_current = ContextVar("request_timing", default=None)
+
+
+def record_query(op: str, elapsed: float):
+    db_queries.observe(elapsed, (op,))
+    timing = _current.get()
+    if timing is not None:
+        timing.db += elapsed
+
+
+class TimedCursor:
+    """Cursor proxy timing each fetch and counting the rows it returns."""
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def fetchone(self):
+        start = time.perf_counter()
+        row = await self._cursor.fetchone()
+        record_query("fetch", time.perf_counter() - start)
+        if row is not None:
+            db_rows.inc()
+        return row
+
+    async def fetchall(self):
+        start = time.perf_counter()
+        rows = await self._cursor.fetchall()
+        record_query("fetch", time.perf_counter() - start)
+        db_rows.inc(len(rows))
+        return rows
+
+    async def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = await (self._cursor.fetchmany() if size is None else self._cursor.fetchmany(size))
+        record_query("fetch", time.perf_counter() - start)
+        db_rows.inc(len(rows))
+        return rows
+
+
+class TimedConnection:
+    """aiosqlite connection proxy that times every statement and commit."""
+    __slots__ = ("_db",)
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    async def _timed(self, op: str, call):
+        start = time.perf_counter()
+        try:
+            return await call
+        finally:
+            record_query(op, time.perf_counter() - start)
+
+    async def execute(self, sql, parameters=None):
+        return TimedCursor(await self._timed("execute", self._db.execute(sql, parameters)))
+
+    async def executemany(self, sql, parameters):
+        return TimedCursor(await self._timed("executemany", self._db.executemany(sql, parameters)))
+
+    async def executescript(self, sql_script):
+        return TimedCursor(await self._timed("executescript", self._db.executescript(sql_script)))
+
+    async def commit(self):
+        await self._timed("commit", self._db.commit())
+
+    async def rollback(self):
+        await self._timed("rollback", self._db.rollback())
+
+
+def _mark_endpoint_done(call):
+    async def endpoint(*args, **kwargs):
+        try:
+            return await call(*args, **kwargs)
+        finally:
+            timing = _current.get()
+            if timing is not None:
+                timing.endpoint_done = time.perf_counter()
+    endpoint.__wrapped__ = call
+    return endpoint
+
+
+def instrument_endpoints(app):
+    """Note when each endpoint returns, so Server-Timing can split out the
+    response-model validation and encoding that follow."""
+    from fastapi.routing import APIRoute
+
+    for route in app.routes:
+        if isinstance(route, APIRoute) and asyncio.iscoroutinefunction(route.dependant.call):
+            route.dependant.call = _mark_endpoint_done(route.dependant.call)
+
+
+def _server_timing(timing: RequestTiming, now: float) -> bytes:
+    parts = [f"db;dur={timing.db * 1000:.2f}"]
+    if timing.endpoint_done is not None:
+        parts.append(f"serialize;dur={(now - timing.endpoint_done) * 1000:.2f}")
+    parts.append(f"total;dur={(now - timing.start) * 1000:.2f}")
+    return ", ".join(parts).encode()
+
+
+class MetricsMiddleware:
+    """Per-route latency histograms and status counters for every HTTP request.
+
+    Requests are labelled by route template (`/api/products/{product_id}`),
+    not raw path, so ids never explode the label space. With SERVER_TIMING
+    set, responses carry `Server-Timing: db, serialize, total` (up to the
+    response headers, so streamed bodies count only until their first byte).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    header = (b"server-timing", _server_timing(timing, time.perf_counter()))
+                    message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        http_in_progress.inc(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_progress.inc(-1)
+            _current.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "other"
+            method = scope["method"]
+            http_latency.observe(time.perf_counter() - timing.start, (method, path))
+            http_requests.inc(1, (method, path, str(status)))
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Literal
 
 
 class Token(BaseModel):
@@ -12,6 +12,13 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class ProductionSlot(BaseModel):
+    qty_min: Optional[int] = None
+    qty_max: Optional[int] = None  # None = no upper bound
+    working_days: Optional[int] = None
+    description: str
+
+
 class PrintingMethodDetail(BaseModel):
     method: str
     method_key: str
@@ -20,6 +27,9 @@ class PrintingMethodDetail(BaseModel):
     notes: Optional[str]
     production_time: Optional[str]
     method_image: Optional[str] = None  # filename of per-method uploaded image
+    min_qty: Optional[int] = None  # smallest quantity with a known lead time
+    working_days: Optional[int] = None  # fastest known lead time
+    schedule: List[ProductionSlot] = []
 
 
 class ProductBase(BaseModel):
@@ -54,6 +64,22 @@ class ProductUpdate(ProductCreate):
     pass
 
 
+class ProductPatch(BaseModel):
+    """Partial update: only the fields actually sent are written."""
+    name: Optional[str] = None
+    category: Optional[str] = None
+    material: Optional[str] = None
+    screen_printing: Optional[str] = None
+    uv_printing: Optional[str] = None
+    offset_printing: Optional[str] = None
+    digital_printing: Optional[str] = None
+    laser_engraving: Optional[str] = None
+    dtg_dtf: Optional[str] = None
+    embroidery: Optional[str] = None
+    sublimation: Optional[str] = None
+    production_time: Optional[str] = None
+
+
 class ProductOut(ProductCreate):
     id: int
 
@@ -61,6 +87,220 @@ class ProductOut(ProductCreate):
         from_attributes = True
 
 
+class ProductListOut(ProductOut):
+    # Resized variants of `image` (format -> srcset value), once generated
+    image_srcset: Optional[Dict[str, str]] = None
+
+
 class RecommendationOut(BaseModel):
     product: ProductOut
     methods: List[PrintingMethodDetail]
+
+
+class RankedMethodDetail(PrintingMethodDetail):
+    rank: int
+    feasible: bool
+    lead_days: Optional[int] = None  # working days at the requested quantity
+    reason: Optional[str] = None  # why the method is not feasible
+
+
+class RankedRecommendationOut(BaseModel):
+    product: ProductOut
+    qty: Optional[int] = None
+    colors: Optional[int] = None
+    methods: List[RankedMethodDetail]
+
+
+class TopMethodOut(BaseModel):
+    product_id: int
+    product_name: str
+    category: str
+    method: str
+    method_key: str
+    lead_days: Optional[int] = None  # no parsed schedule
+    max_colors: Optional[int] = None
+    multi_color: bool
+
+
+class BatchRecommendRequest(BaseModel):
+    ids: List[int]
+
+
+class BatchRecommendationItem(BaseModel):
+    product_id: int
+    found: bool
+    recommendation: Optional[RecommendationOut] = None
+    error: Optional[str] = None
+
+
+class BatchRecommendationOut(BaseModel):
+    results: List[BatchRecommendationItem]
+
+
+class ImageVariant(BaseModel):
+    format: str
+    width: int
+    height: int
+    url: str
+
+
+class ProductImageOut(BaseModel):
+    key: str  # "product" or a method key
+    image: str
+    image_url: str
+    variants: List[ImageVariant]
+    srcset: Dict[str, str]  # format -> srcset attribute value
+
+
+class SuggestionOut(BaseModel):
+    id: int
+    name: str
+    field: str  # which column matched: name, category or material
+    highlight: str  # matched column text, HTML-escaped, with <mark> around matches
+
+
+class ImportRowError(BaseModel):
+    row: int  # sheet row number, header is row 1
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    rows: int
+    created: int
+    updated: int
+    invalid: int
+    dry_run: bool
+    ignored_columns: List[str] = []
+    errors: List[ImportRowError] = []  # first 1000 invalid rows
+
+
+class BulkOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None  # required for update / delete
+    data: Optional[ProductPatch] = None  # full product for create, changed fields for update
+
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
+
+
+class BulkResult(BaseModel):
+    op: str
+    id: int
+    product: Optional[ProductOut] = None  # None for deletes
+
+
+class BulkResponse(BaseModel):
+    results: List[BulkResult]
+
+
+class ProductChange(BaseModel):
+    seq: int  # newest change to this product in the log
+    id: int
+    deleted: bool  # tombstone: drop the product
+    product: Optional[ProductOut] = None  # current row, for upserts
+
+
+class ChangeFeed(BaseModel):
+    since: Optional[int]
+    next: int  # pass back as `since` for the following changes
+    reset: bool  # the log no longer reaches back to `since`: reload everything
+    more: bool  # another page is waiting
+    changes: List[ProductChange]
+
+
+class MethodPrice(BaseModel):
+    method_key: str
+    qty_min: int = Field(ge=1)  # the break applies from here up to the next one
+    unit_price: float = Field(ge=0)
+    extra_color_price: float = Field(0, ge=0)  # per unit, per color beyond the first
+    setup_fee: float = Field(0, ge=0)  # once per quote line
+
+
+class QuoteLine(BaseModel):
+    product_id: int
+    method_key: Optional[str] = None  # None: the cheapest method that can do it
+    qty: int = Field(ge=1)
+    colors: int = Field(1, ge=1)
+
+
+class QuoteRequest(BaseModel):
+    lines: List[QuoteLine]
+
+
+class QuoteLineOut(BaseModel):
+    product_id: int
+    method_key: Optional[str] = None
+    method: Optional[str] = None
+    qty: int
+    colors: int
+    feasible: bool
+    reason: Optional[str] = None
+    unit_price: Optional[float] = None
+    setup_fee: Optional[float] = None
+    total: Optional[float] = None
+    lead_days: Optional[int] = None
+
+
+class QuoteOut(BaseModel):
+    currency: str
+    feasible_lines: int
+    total: float  # sum over feasible lines
+    lead_days: Optional[int] = None  # slowest known lead time among them
+    lines: List[QuoteLineOut]
+
+
+class ExportRequest(BaseModel):
+    kind: Literal["spec_sheets", "quote", "catalog"]
+    title: Optional[str] = None
+    product_ids: Optional[List[int]] = None  # spec_sheets: one sheet per product, in order
+    category: Optional[str] = None  # catalog: only this category
+    lines: Optional[List[QuoteLine]] = None  # quote
+
+
+class ExportJob(BaseModel):
+    id: str
+    kind: str
+    status: Literal["queued", "running", "done", "failed"]
+    pages: Optional[int] = None
+    error: Optional[str] = None
+    created_at: str
+    finished_at: Optional[str] = None
+    download_url: Optional[str] = None  # once done
+
+
+class ArtworkIssue(BaseModel):
+    code: str  # e.g. LOW_DPI, LOW_RESOLUTION, TOO_MANY_COLORS, SEMI_TRANSPARENT
+    severity: Literal["error", "warning"]
+    message: str
+
+
+class ArtworkAnalysis(BaseModel):
+    width: int  # pixels
+    height: int
+    format: str
+    dpi: Optional[float] = None  # as recorded in the file
+    colors: int  # distinct colors covering at least 1% of the opaque area
+    transparent: float  # share of fully transparent pixels
+    semi_transparent: float  # share of partly transparent pixels
+
+
+class ArtworkCheck(BaseModel):
+    method_key: str
+    image: str
+    ok: bool  # no errors (warnings allowed)
+    analysis: Optional[ArtworkAnalysis] = None  # None when the file is missing or unreadable
+    issues: List[ArtworkIssue]
+
+
+class ArtworkReport(BaseModel):
+    product_id: int
+    ok: bool
+    checks: List[ArtworkCheck]  # one per method image
+
+
+class ArtworkCheckRequest(BaseModel):
+    product_ids: Optional[List[int]] = None  # None: the whole catalog
+    category: Optional[str] = None  # without product_ids: only this category
+    refresh: bool = False  # analyze again even when a stored analysis exists
+    failed_only: bool = False  # leave out products whose artwork passes
@@ -0,0 +1,260 @@
+"""A small PDF writer: Helvetica text, rules and JPEG images, nothing else.
+
+Pages are built with `Canvas` into self-contained `Page` fragments (a
+compressed content stream plus its images), which can be passed between
+processes and cached on disk (`pack_pages`). `PDFWriter` turns fragments into a document one
+page at a time, returning the bytes to send next, so long documents are
+streamed rather than assembled in memory.
+"""
+import io
+import json
+import struct
+import zlib
+from typing import NamedTuple, Tuple
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 48
+
+# Advance widths (1/1000 em) of printable ASCII, from the standard Helvetica AFMs
+_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+_DEFAULT_WIDTH = 556
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    widths = _HELVETICA_BOLD if bold else _HELVETICA
+    total = 0
+    for ch in text:
+        code = ord(ch) - 32
+        total += widths[code] if 0 <= code < len(widths) else _DEFAULT_WIDTH
+    return total * size / 1000
+
+
+def wrap(text: str, width: float, size: float, bold: bool = False):
+    """Split text into lines no wider than `width` points, breaking at spaces."""
+    lines = []
+    for paragraph in str(text or "").split("\n"):
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and text_width(candidate, size, bold) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def truncate(text: str, width: float, size: float, bold: bool = False) -> str:
+    """Cut text to fit `width` points, ending in an ellipsis when shortened."""
+    text = str(text or "")
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + "…", size, bold) > width:
+        text = text[:-1]
+    return text.rstrip() + "…"
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = str(text).encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _num(value: float) -> bytes:
+    return (b"%.2f" % value).rstrip(b"0").rstrip(b".") or b"0"
+
+
+class Image(NamedTuple):
+    width: int  # pixels
+    height: int
+    jpeg: bytes
+
+
+class Page(NamedTuple):
+    content: bytes  # Flate-compressed content stream
+    images: Tuple[Image, ...]  # drawn as /Im0, /Im1, ... in this order
+
+
+_PACK_MAGIC = b"PDFPAGES1\n"
+_PACK_HEADER = struct.Struct(">I")
+
+
+def pack_pages(pages) -> bytes:
+    """Pages as bytes: a JSON index of sizes, then every content stream and
+    JPEG in order. Plain data, so reading it back never runs code."""
+    index = [[len(p.content), [[i.width, i.height, len(i.jpeg)] for i in p.images]] for p in pages]
+    header = json.dumps(index, separators=(",", ":")).encode()
+    blobs = [b for p in pages for b in (p.content, *(i.jpeg for i in p.images))]
+    return b"".join([_PACK_MAGIC, _PACK_HEADER.pack(len(header)), header, *blobs])
+
+
+def unpack_pages(data: bytes):
+    """Inverse of `pack_pages`; ValueError when the bytes aren't a complete pack."""
+    if not data.startswith(_PACK_MAGIC):
+        raise ValueError("Not a packed page list")
+    start = len(_PACK_MAGIC) + _PACK_HEADER.size
+    if len(data) < start:
+        raise ValueError("Truncated page pack")
+    (header_len,) = _PACK_HEADER.unpack_from(data, len(_PACK_MAGIC))
+    index = json.loads(data[start:start + header_len])
+    at = start + header_len
+    pages = []
+    try:
+        for content_len, images in index:
+            content, at = data[at:at + content_len], at + content_len
+            decoded = []
+            for width, height, size in images:
+                decoded.append(Image(int(width), int(height), data[at:at + size]))
+                at += size
+            pages.append(Page(content, tuple(decoded)))
+    except TypeError as exc:
+        raise ValueError(f"Malformed page pack index: {exc}")
+    if at != len(data):
+        raise ValueError("Page pack size mismatch")
+    return pages
+
+
+def jpeg_image(path: str, max_side: int) -> Image:
+    """Load an image file as an RGB JPEG no larger than `max_side` pixels."""
+    from PIL import Image as PILImage, ImageOps
+
+    with PILImage.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_side, max_side))
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = PILImage.new("RGB", img.size, "white")
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        else:
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=80)
+        return Image(img.width, img.height, out.getvalue())
+
+
+class Canvas:
+    """Collects drawing operations for one page; y grows upwards from the bottom."""
+
+    def __init__(self):
+        self._ops = []
+        self._images = []
+
+    def text(self, x: float, y: float, text: str, size: float = 10, bold: bool = False, gray: float = 0):
+        self._ops.append(
+            b"BT /F%d %s Tf %s g 1 0 0 1 %s %s Tm %s Tj ET" % (
+                2 if bold else 1, _num(size), _num(gray), _num(x), _num(y), _pdf_string(text))
+        )
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5, gray: float = 0.8):
+        self._ops.append(b"%s w %s G %s %s m %s %s l S" % (
+            _num(width), _num(gray), _num(x1), _num(y1), _num(x2), _num(y2)))
+
+    def image(self, image: Image, x: float, y: float, box_width: float, box_height: float):
+        """Draw an image scaled to fit the box, centered in it."""
+        scale = min(box_width / image.width, box_height / image.height)
+        w, h = image.width * scale, image.height * scale
+        x += (box_width - w) / 2
+        y += (box_height - h) / 2
+        self._ops.append(b"q %s 0 0 %s %s %s cm /Im%d Do Q" % (
+            _num(w), _num(h), _num(x), _num(y), len(self._images)))
+        self._images.append(image)
+
+    def page(self) -> Page:
+        return Page(zlib.compress(b"\n".join(self._ops)), tuple(self._images))
+
+
+class PDFWriter:
+    """Writes a PDF incrementally: `begin()`, then `add_page()` per page and
+    `end()`, each returning the next bytes of the file. Only object offsets
+    are kept, so memory does not grow with page content."""
+
+    def __init__(self, title: str = ""):
+        self.title = title
+        self.page_count = 0
+        self._offset = 0
+        self._offsets = {}
+        self._next_id = 5  # 1 catalog, 2 page tree, 3-4 fonts
+        self._page_ids = []
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id - 1
+
+    def _object(self, obj_id: int, body: bytes) -> bytes:
+        data = b"%d 0 obj\n%s\nendobj\n" % (obj_id, body)
+        self._offsets[obj_id] = self._offset
+        self._offset += len(data)
+        return data
+
+    def _stream(self, obj_id: int, header: bytes, data: bytes) -> bytes:
+        return self._object(obj_id, b"<< %s /Length %d >>\nstream\n%s\nendstream" % (header, len(data), data))
+
+    def begin(self) -> bytes:
+        header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self._offset = len(header)
+        fonts = [
+            self._object(font_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % name)
+            for font_id, name in ((3, b"Helvetica"), (4, b"Helvetica-Bold"))
+        ]
+        return header + b"".join(fonts)
+
+    def add_page(self, page: Page, footer: str = None) -> bytes:
+        parts = []
+        xobjects = []
+        for i, image in enumerate(page.images):
+            image_id = self._new_id()
+            parts.append(self._stream(image_id, b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                                      b"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode"
+                                      % (image.width, image.height), image.jpeg))
+            xobjects.append(b"/Im%d %d 0 R" % (i, image_id))
+        contents = [self._new_id()]
+        parts.append(self._stream(contents[0], b"/Filter /FlateDecode", page.content))
+        self.page_count += 1
+        if footer is not None:
+            # Per-document text lives in its own stream so cached pages stay reusable
+            canvas = Canvas()
+            canvas.text(MARGIN, MARGIN / 2, footer, size=8, gray=0.5)
+            label = f"{self.page_count}"
+            canvas.text(PAGE_WIDTH - MARGIN - text_width(label, 8), MARGIN / 2, label, size=8, gray=0.5)
+            contents.append(self._new_id())
+            parts.append(self._stream(contents[1], b"/Filter /FlateDecode", canvas.page().content))
+        page_id = self._new_id()
+        parts.append(self._object(page_id, (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents [%s] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> /XObject << %s >> >> >>"
+        ) % (PAGE_WIDTH, PAGE_HEIGHT, b" ".join(b"%d 0 R" % c for c in contents), b" ".join(xobjects))))
+        self._page_ids.append(page_id)
+        return b"".join(parts)
+
+    def end(self) -> bytes:
+        kids = b" ".join(b"%d 0 R" % p for p in self._page_ids)
+        info_id = self._new_id()
+        parts = [
+            self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._page_ids))),
+            self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+            self._object(info_id, b"<< /Title %s /Producer (PrintSpec) >>" % _pdf_string(self.title)),
+        ]
+        xref_at = self._offset
+        entries = [b"0000000000 65535 f \n"] + [
+            b"%010d 00000 n \n" % self._offsets[i] for i in range(1, self._next_id)
+        ]
+        parts.append(b"xref\n0 %d\n%s" % (self._next_id, b"".join(entries)))
+        parts.append(b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            self._next_id, info_id, xref_at))
+        return b"".join(parts)
@@ -0,0 +1,151 @@
+import asyncio
+import time
+import aiosqlite
+from contextlib import asynccontextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be acquired within the timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of warm SQLite reader connections plus one serialized writer.
+
+    SQLite in WAL mode lets any number of readers run alongside a single
+    writer, so reads are spread over `size` long-lived connections while all
+    writes go through one connection guarded by a lock.
+    """
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 5.0, pragmas=()):
+        self.path = path
+        self.pragmas = tuple(pragmas)  # run on every new connection
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._all_readers = []
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._closed = True
+        self._waiting = 0  # callers queued for a reader
+        self._stats = {
+            "acquired": 0,
+            "released": 0,
+            "timeouts": 0,
+            "waited": 0,
+            "wait_seconds": 0.0,
+            "writes": 0,
+            "write_wait_seconds": 0.0,
+        }
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def _connect(self, readonly: bool) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path)
+        db.row_factory = aiosqlite.Row
+        await db.execute("PRAGMA journal_mode=WAL")
+        for pragma in self.pragmas:
+            await db.execute(pragma)
+        if readonly:
+            await db.execute("PRAGMA query_only=ON")
+        return db
+
+    async def open(self):
+        if not self._closed:
+            return
+        # Queues and locks bind to the running loop, so build them fresh here
+        self._readers = asyncio.Queue()
+        self._write_lock = asyncio.Lock()
+        # The writer goes first so WAL is switched on before readers attach
+        self._writer = await self._connect(readonly=False)
+        for _ in range(self.size):
+            db = await self._connect(readonly=True)
+            self._all_readers.append(db)
+            self._readers.put_nowait(db)
+        self._closed = False
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        async with self._write_lock:
+            await self._writer.close()
+            self._writer = None
+        for db in self._all_readers:
+            await db.close()
+        self._all_readers.clear()
+
+    async def acquire_reader(self) -> aiosqlite.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is not open")
+        if not self._waiting:
+            # Only skip the line when nobody is in it, or a released connection
+            # goes to whoever arrives next and queued callers starve
+            try:
+                return self._readers.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        start = time.perf_counter()
+        self._stats["waited"] += 1
+        self._waiting += 1
+        try:
+            db = await asyncio.wait_for(self._readers.get(), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise PoolTimeout("Timed out waiting for a database connection")
+        finally:
+            self._waiting -= 1
+            self._stats["wait_seconds"] += time.perf_counter() - start
+        return db
+
+    def release_reader(self, db: aiosqlite.Connection):
+        self._stats["released"] += 1
+        if not self._closed:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def reader(self):
+        """Context manager yielding a pooled read-only connection."""
+        db = await self.acquire_reader()
+        self._stats["acquired"] += 1
+        try:
+            yield db
+        finally:
+            self.release_reader(db)
+
+    @asynccontextmanager
+    async def writer(self):
+        """Context manager yielding the writer connection under the write lock.
+
+        Anything left uncommitted when the caller finishes (e.g. after an
+        exception) is rolled back so the next writer starts clean.
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is not open")
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._write_lock.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise PoolTimeout("Timed out waiting for the database writer")
+        self._stats["write_wait_seconds"] += time.perf_counter() - start
+        self._stats["writes"] += 1
+        try:
+            yield self._writer
+        finally:
+            try:
+                if self._writer is not None and self._writer.in_transaction:
+                    await self._writer.rollback()
+            finally:
+                self._write_lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._readers.qsize(),
+            "in_use": 0 if self._closed else self.size - self._readers.qsize(),
+            "writer_busy": self._write_lock.locked(),
+            "timeout": self.timeout,
+            **self._stats,
+        }
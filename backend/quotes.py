@@ -0,0 +1,277 @@
+"""Print-cost quotes, evaluated for whole (line × method) matrices at once.
+
+Every quote line is priced against all printing methods in one batch of
+NumPy array operations: availability, color capacity and production slots
+come from the product_methods / product_schedule tables that `specs.py`
+derives, prices from the method_prices quantity breaks. Lines name a method,
+or leave it to the cheapest feasible one.
+"""
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from specs import METHOD_FIELDS
+
+QUOTE_CURRENCY = os.environ.get("QUOTE_CURRENCY", "INR")
+CHUNK_SIZE = 500  # product ids per IN (...) query
+
+METHOD_KEYS = [field for _, field in METHOD_FIELDS]
+METHOD_NAMES = [name for name, _ in METHOD_FIELDS]
+METHOD_INDEX = {key: i for i, key in enumerate(METHOD_KEYS)}
+# method_key -> column index, computed by SQLite so rows convert straight to arrays
+_METHOD_CASE = "CASE method_key " + " ".join(
+    f"WHEN '{key}' THEN {i}" for i, key in enumerate(METHOD_KEYS)
+) + " END"
+
+# Why a (line, method) cell can't be quoted, in the order they are checked
+OK, MISSING, UNAVAILABLE, TOO_MANY_COLORS, NO_SLOT, UNPRICED, NO_METHOD = range(7)
+
+
+class PriceTable(NamedTuple):
+    """Quantity breaks padded to a (methods, breaks) grid; padding never applies."""
+    qty_min: np.ndarray  # inf past a method's last break
+    unit: np.ndarray
+    extra_color: np.ndarray
+    setup: np.ndarray
+    priced: np.ndarray  # (methods,) has at least one break
+
+
+class ProductSpecs(NamedTuple):
+    """Quoting data for a sorted array of product ids, one row per id."""
+    ids: np.ndarray
+    found: np.ndarray  # (products,)
+    available: np.ndarray  # (products, methods)
+    capacity: np.ndarray  # colors per method; inf for multi-color
+    has_slots: np.ndarray  # (products * methods,) any timed schedule line
+    lowest_qty: np.ndarray  # (products * methods,) smallest qty_min, inf if none
+    slot_min: np.ndarray  # (products * methods, slots); inf padding never matches
+    slot_max: np.ndarray
+    slot_days: np.ndarray
+
+
+def compile_prices(rows) -> PriceTable:
+    """PriceTable from (method_key, qty_min, unit_price, extra_color_price, setup_fee) rows."""
+    per_method = [[] for _ in METHOD_KEYS]
+    for key, *values in rows:
+        if key in METHOD_INDEX:
+            per_method[METHOD_INDEX[key]].append(values)
+    width = max(1, max(len(breaks) for breaks in per_method))
+    grid = np.zeros((4, len(METHOD_KEYS), width))
+    grid[0] = np.inf
+    for m, breaks in enumerate(per_method):
+        if breaks:
+            grid[:, m, :len(breaks)] = np.array(sorted(breaks), dtype=float).T
+    return PriceTable(grid[0], grid[1], grid[2], grid[3], np.isfinite(grid[0, :, 0]))
+
+
+def compile_specs(ids, method_rows, slot_rows) -> ProductSpecs:
+    """ProductSpecs for sorted unique `ids`.
+
+    `method_rows` are (product_id, method_index, available, max_colors,
+    multi_color) and `slot_rows` (product_id, method_index, qty_min,
+    qty_max, working_days), with None for open bounds.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    n_methods = len(METHOD_KEYS)
+    cells = len(ids) * n_methods
+    found = np.zeros(len(ids), dtype=bool)
+    available = np.zeros(cells, dtype=bool)
+    capacity = np.ones(cells)
+    if method_rows:
+        rows = np.array(method_rows, dtype=float)
+        products = np.searchsorted(ids, rows[:, 0])
+        cell = products * n_methods + rows[:, 1].astype(np.int64)
+        found[products] = True
+        available[cell] = rows[:, 2] > 0
+        colors = np.nan_to_num(rows[:, 3], nan=1.0)
+        capacity[cell] = np.where(rows[:, 4] > 0, np.inf, colors)
+
+    has_slots = np.zeros(cells, dtype=bool)
+    lowest_qty = np.full(cells, np.inf)
+    width = 1
+    if slot_rows:
+        rows = np.array(slot_rows, dtype=float)
+        cell = np.searchsorted(ids, rows[:, 0]) * n_methods + rows[:, 1].astype(np.int64)
+        order = np.argsort(cell, kind="stable")
+        cell, rows = cell[order], rows[order]
+        starts, counts = np.unique(cell, return_index=True, return_counts=True)[1:]
+        position = np.arange(len(cell)) - np.repeat(starts, counts)
+        width = int(counts.max())
+        has_slots[cell] = True
+        np.minimum.at(lowest_qty, cell, np.nan_to_num(rows[:, 2], nan=np.inf))
+    slot_min = np.full((cells, width), np.inf)
+    slot_max = np.full((cells, width), np.inf)
+    slot_days = np.full((cells, width), np.inf)
+    if slot_rows:
+        slot_min[cell, position] = np.nan_to_num(rows[:, 2], nan=0.0)
+        slot_max[cell, position] = np.nan_to_num(rows[:, 3], nan=np.inf)
+        slot_days[cell, position] = rows[:, 4]
+    return ProductSpecs(
+        ids, found, available.reshape(-1, n_methods), capacity.reshape(-1, n_methods),
+        has_slots, lowest_qty, slot_min, slot_max, slot_days,
+    )
+
+
+async def load_prices(db) -> PriceTable:
+    cursor = await db.execute(
+        "SELECT method_key, qty_min, unit_price, extra_color_price, setup_fee FROM method_prices"
+    )
+    return compile_prices(await cursor.fetchall())
+
+
+async def load_specs(db, ids) -> ProductSpecs:
+    """ProductSpecs for sorted unique ids, one IN (...) query per chunk and table."""
+    method_rows, slot_rows = [], []
+    id_list = ids.tolist()
+    for start in range(0, len(id_list), CHUNK_SIZE):
+        chunk = id_list[start:start + CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = await db.execute(f"""
+            SELECT product_id, {_METHOD_CASE}, available, max_colors, multi_color
+            FROM product_methods WHERE product_id IN ({placeholders})
+        """, chunk)
+        method_rows.extend(await cursor.fetchall())
+        cursor = await db.execute(f"""
+            SELECT product_id, {_METHOD_CASE}, qty_min, qty_max, working_days
+            FROM product_schedule
+            WHERE working_days IS NOT NULL AND product_id IN ({placeholders})
+        """, chunk)
+        slot_rows.extend(await cursor.fetchall())
+    return compile_specs(ids, [tuple(r) for r in method_rows], [tuple(r) for r in slot_rows])
+
+
+def quote_matrix(specs: ProductSpecs, prices: PriceTable, product, qty, colors) -> dict:
+    """Evaluate every line against every method.
+
+    `product` indexes rows of `specs`; `qty` and `colors` are per line. The
+    returned (lines, methods) arrays follow evaluate_method in specs.py: a slot
+    applies when qty_min <= qty <= qty_max, and methods without a timed
+    schedule stay feasible with unknown (NaN) lead time.
+    """
+    n_methods = len(METHOD_KEYS)
+    methods = np.arange(n_methods)
+    cell = product[:, None] * n_methods + methods  # (lines, methods)
+    q = qty[:, None].astype(float)
+
+    in_slot = (specs.slot_min[cell] <= q[..., None]) & (q[..., None] <= specs.slot_max[cell])
+    lead = np.where(in_slot, specs.slot_days[cell], np.inf).min(axis=-1)
+    has_slots = specs.has_slots[cell]
+    qty_ok = ~has_slots | np.isfinite(lead)
+    lead = np.where(has_slots & qty_ok, lead, np.nan)
+
+    # Breaks at or below qty; none means qty is under the method's first break
+    breaks = (prices.qty_min[None] <= q[..., None]).sum(axis=-1)
+    tier = np.maximum(breaks - 1, 0)
+    extra_colors = (colors[:, None] - 1).clip(min=0)
+    unit = prices.unit[methods, tier] + prices.extra_color[methods, tier] * extra_colors
+    setup = prices.setup[methods, tier]
+
+    reason = np.select(
+        [
+            ~specs.found[product][:, None].repeat(n_methods, axis=1),
+            ~specs.available[product],
+            colors[:, None] > specs.capacity[product],
+            ~qty_ok,
+            breaks == 0,
+        ],
+        [MISSING, UNAVAILABLE, TOO_MANY_COLORS, NO_SLOT, UNPRICED],
+        OK,
+    )
+    return {
+        "reason": reason, "lead": lead, "unit": unit, "setup": setup,
+        "total": unit * q + setup, "cell": cell,
+    }
+
+
+def pick_methods(matrix: dict, requested):
+    """Column per line: the requested method, or (for -1) the cheapest feasible
+    one. Returns (column, reason); unmet automatic picks get NO_METHOD (or MISSING)."""
+    cost = np.where(matrix["reason"] == OK, matrix["total"], np.inf)
+    cheapest = cost.argmin(axis=1)
+    auto = requested < 0
+    column = np.where(auto, cheapest, requested)
+    rows = np.arange(len(column))
+    reason = matrix["reason"][rows, column]
+    missing = matrix["reason"][:, 0] == MISSING
+    reason = np.where(auto & ~np.isfinite(cost[rows, cheapest]), np.where(missing, MISSING, NO_METHOD), reason)
+    return column, reason
+
+
+def _reason_text(code: int, specs: ProductSpecs, prices: PriceTable, cell: int, qty: int):
+    if code == MISSING:
+        return "Product not found"
+    if code == UNAVAILABLE:
+        return "Not available for this product"
+    if code == TOO_MANY_COLORS:
+        return f"Supports at most {int(specs.capacity.flat[cell])} color(s)"
+    if code == NO_SLOT:
+        lowest = specs.lowest_qty[cell]
+        if qty < lowest:
+            return f"Minimum quantity is {int(lowest)}"
+        return f"No production slot for quantity {qty}"
+    if code == UNPRICED:
+        method = cell % len(METHOD_KEYS)
+        if prices.priced[method]:
+            return f"Priced from quantity {int(prices.qty_min[method, 0])}"
+        return "No price list for this method"
+    return "No method can print this line"
+
+
+async def build_quote(db, lines) -> dict:
+    """Price QuoteLine objects; raises ValueError naming the first unknown method."""
+    if not lines:
+        return {"currency": QUOTE_CURRENCY, "feasible_lines": 0, "total": 0.0, "lead_days": None, "lines": []}
+    requested = np.empty(len(lines), dtype=np.int64)
+    for i, line in enumerate(lines):
+        if line.method_key is None:
+            requested[i] = -1
+        elif line.method_key in METHOD_INDEX:
+            requested[i] = METHOD_INDEX[line.method_key]
+        else:
+            raise ValueError(f"Line {i}: unknown method '{line.method_key}'")
+    product_ids = np.fromiter((line.product_id for line in lines), dtype=np.int64, count=len(lines))
+    qty = np.fromiter((line.qty for line in lines), dtype=np.int64, count=len(lines))
+    colors = np.fromiter((line.colors for line in lines), dtype=np.int64, count=len(lines))
+
+    ids, product = np.unique(product_ids, return_inverse=True)
+    specs = await load_specs(db, ids)
+    prices = await load_prices(db)
+    matrix = quote_matrix(specs, prices, product, qty, colors)
+    column, reason = pick_methods(matrix, requested)
+
+    rows = np.arange(len(lines))
+    feasible = reason == OK
+    unit = np.round(matrix["unit"][rows, column], 2)
+    setup = np.round(matrix["setup"][rows, column], 2)
+    total = np.round(matrix["total"][rows, column], 2)
+    lead = matrix["lead"][rows, column]
+    cell = matrix["cell"][rows, column]
+    known_lead = lead[feasible & ~np.isnan(lead)]
+
+    out = []
+    for i, (pid, m, q, c, ok, code, auto) in enumerate(zip(
+        product_ids.tolist(), column.tolist(), qty.tolist(), colors.tolist(),
+        feasible.tolist(), reason.tolist(), (requested < 0).tolist(),
+    )):
+        chosen = ok or not auto
+        out.append({
+            "product_id": pid,
+            "method_key": METHOD_KEYS[m] if chosen else None,
+            "method": METHOD_NAMES[m] if chosen else None,
+            "qty": q,
+            "colors": c,
+            "feasible": ok,
+            "reason": None if ok else _reason_text(code, specs, prices, int(cell[i]), q),
+            "unit_price": float(unit[i]) if ok else None,
+            "setup_fee": float(setup[i]) if ok else None,
+            "total": float(total[i]) if ok else None,
+            "lead_days": int(lead[i]) if ok and not np.isnan(lead[i]) else None,
+        })
+    return {
+        "currency": QUOTE_CURRENCY,
+        "feasible_lines": int(feasible.sum()),
+        "total": round(float(total[feasible].sum()), 2),
+        "lead_days": int(known_lead.max()) if known_lead.size else None,
+        "lines": out,
+    }
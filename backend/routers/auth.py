@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from models import LoginRequest, Token
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from jose import jwt
+from jose import JWTError, jwt
+import hashlib
+import os
+import time
 
 router = APIRouter(prefix="/api/auth", tags=["Auth"])
 
 SECRET_KEY = "printartsSecretKey2026!SpecSystem"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 8  # 8 hours
+# Verified tokens remembered so repeat requests skip the signature check
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "1024"))
 
 # MVP: single hardcoded admin user
 ADMIN_USERNAME = "admin"
@@ -21,6 +28,77 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+class TokenCache:
+    """LRU of already-verified tokens keyed by their SHA-256, each dropped at its `exp`.
+
+    Only successfully decoded tokens are stored, and never past their
+    expiry, so a hit is exactly as trustworthy as a fresh jwt.decode.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # sha256 digest -> (exp, claims)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: bytes, claims: dict):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or self.maxsize <= 0:
+            return
+        self._entries[key] = (exp, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache()
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def decode_token(token: str) -> dict:
+    """Claims of a valid token, verifying the signature only on a cache miss."""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        token_cache.put(key, claims)
+    return claims
+
+
+async def require_admin(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+    """Dependency for write endpoints: a valid admin bearer token or 401/403."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"}
+        )
+    claims = decode_token(credentials.credentials)
+    if claims.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return claims
+
+
 @router.post("/login", response_model=Token)
 async def login(data: LoginRequest):
     if data.username != ADMIN_USERNAME or data.password != ADMIN_PASSWORD:
@@ -31,8 +109,5 @@ async def login(data: LoginRequest):
 
 @router.get("/verify")
 async def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return {"valid": True, "username": payload.get("sub"), "role": payload.get("role")}
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    payload = decode_token(token)
+    return {"valid": True, "username": payload.get("sub"), "role": payload.get("role")}
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from database import get_db
+from routers.auth import require_admin
+from cache import catalog_changed
+from catalog_io import ImportFormatError, detect_format, read_table, import_table, export_chunks
+from models import ImportReport
+from typing import Optional
+import aiosqlite
+import asyncio
+
+router = APIRouter(prefix="/api/catalog", tags=["Catalog"])
+
+EXPORT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+@router.post("/import", response_model=ImportReport, dependencies=[Depends(require_admin)])
+async def import_catalog(
+    file: UploadFile = File(...),
+    category: Optional[str] = Query(None, description="Category for rows that don't have one"),
+    dry_run: bool = False,
+    db: aiosqlite.Connection = Depends(get_db)
+):
+    """Bulk-load products from an .xlsx or .csv sheet in one transaction.
+
+    Accepts the supplier spec layout or an export from `/api/catalog/export`
+    (rows with an `id` update that product). Invalid rows are skipped and
+    reported by sheet row number; `dry_run=true` only validates.
+    """
+    try:
+        fmt = detect_format(file.filename)
+        columns, ignored, rows = await asyncio.to_thread(read_table, file.file, fmt)
+        report = await import_table(db, columns, rows, category, dry_run)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if not dry_run:
+        await db.commit()
+        catalog_changed()
+    report["ignored_columns"] = ignored
+    return report
+
+
+@router.get("/export")
+async def export_catalog(format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    """Stream every product as CSV or NDJSON without loading the table in memory."""
+    return StreamingResponse(
+        export_chunks(format),
+        media_type=EXPORT_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from database import connection, get_db
+from exports import catalog_pdf, export_queue, job_path
+from models import ExportJob, ExportRequest
+from routers.auth import require_admin
+from routers.quotes import MAX_QUOTE_LINES
+from typing import Optional
+from urllib.parse import quote
+import aiosqlite
+import os
+import re
+
+router = APIRouter(prefix="/api/exports", tags=["Exports"])
+
+MAX_EXPORT_PRODUCTS = 10000
+
+
+def _attachment(filename: str) -> str:
+    """Content-Disposition for a download name that may be any Unicode text:
+    an ASCII fallback plus the exact name as an RFC 5987 `filename*`."""
+    stem, ext = os.path.splitext(filename)
+    fallback = (re.sub(r"[^A-Za-z0-9-]+", "_", stem).strip("_") or "export") + ext
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def _job_out(row) -> dict:
+    job = {k: row[k] for k in ("id", "kind", "status", "pages", "error", "created_at", "finished_at")}
+    job["download_url"] = f"{router.prefix}/{row['id']}/download" if row["status"] == "done" else None
+    return job
+
+
+@router.post("", response_model=ExportJob, status_code=202, dependencies=[Depends(require_admin)])
+async def create_export(data: ExportRequest):
+    """Queue a PDF: spec sheets for `product_ids`, a `quote` for `lines`, or
+    the `catalog` (optionally one `category`). Poll the job, then download."""
+    if data.kind == "spec_sheets":
+        if not data.product_ids:
+            raise HTTPException(status_code=400, detail="product_ids is required for spec sheets")
+        if len(data.product_ids) > MAX_EXPORT_PRODUCTS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_EXPORT_PRODUCTS} products per export")
+        params = {"product_ids": data.product_ids}
+    elif data.kind == "quote":
+        if not data.lines:
+            raise HTTPException(status_code=400, detail="lines is required for a quote")
+        if len(data.lines) > MAX_QUOTE_LINES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_QUOTE_LINES} lines per quote")
+        params = {"lines": [line.model_dump() for line in data.lines]}
+    else:
+        params = {"category": data.category}
+    if data.title:
+        params["title"] = data.title
+    job_id = await export_queue.submit(data.kind, params)
+    async with connection() as db:
+        cursor = await db.execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,))
+        return _job_out(await cursor.fetchone())
+
+
+@router.get("/catalog.pdf")
+async def export_catalog(category: Optional[str] = Query(None)):
+    """The catalog as spec sheets, streamed page by page while it renders."""
+    return StreamingResponse(
+        catalog_pdf(category), media_type="application/pdf",
+        headers={"Content-Disposition": _attachment(f"{category or 'catalog'}.pdf")},
+    )
+
+
+@router.get("/{job_id}", response_model=ExportJob)
+async def get_export(job_id: str, db: aiosqlite.Connection = Depends(get_db)):
+    cursor = await db.execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,))
+    row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return _job_out(row)
+
+
+@router.get("/{job_id}/download")
+async def download_export(job_id: str, db: aiosqlite.Connection = Depends(get_db)):
+    cursor = await db.execute("SELECT kind, status FROM export_jobs WHERE id = ?", (job_id,))
+    row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if row["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Export is {row['status']}")
+    return FileResponse(job_path(job_id), media_type="application/pdf", filename=f"{row['kind']}-{job_id[:8]}.pdf")
@@ -1,13 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from database import get_db, UPLOADS_DIR
+from fastapi.responses import StreamingResponse
+from artwork import CHECK_BATCH, check_products, schedule_analysis
+from database import connection, get_db, UPLOADS_DIR
+from routers.auth import require_admin
+from cache import catalog_changed
+from imaging import (
+    build_srcset, content_filename, delete_image_files, forget_variants, load_variants,
+    schedule_variants, store_blob, unreferenced,
+)
+from models import ArtworkCheckRequest, ArtworkReport, ProductImageOut
+from serialize import dumps
+from typing import List
 import aiosqlite
+import asyncio
+import hashlib
+import metrics
 import os
-import uuid
+import tempfile
 
 router = APIRouter(prefix="/api/products", tags=["Images"])
 
 ALLOWED_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
 MAX_SIZE_BYTES = 5 * 1024 * 1024  # 5 MB
+CHUNK_SIZE = 64 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # room for form boundaries and part headers
 
 # Valid method keys → DB column names
 METHOD_IMAGE_COLS = {
@@ -23,88 +39,257 @@ METHOD_IMAGE_COLS = {
 }
 
 
-async def _save_upload(file: UploadFile, prefix: str):
-    """Validate and save upload; return filename."""
+class UploadSizeLimitMiddleware:
+    """Reject oversized uploads while the body streams in.
+
+    A Content-Length over the cap is refused before anything is read; chunked
+    uploads (no Content-Length) or bodies longer than declared are cut off by
+    counting bytes as the app receives them, before Starlette spools the rest.
+    """
+
+    LIMIT = MAX_SIZE_BYTES + MULTIPART_OVERHEAD
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not (scope["type"] == "http" and scope["method"] == "POST" and scope["path"].startswith(router.prefix)):
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length and length.isdigit() and int(length) > self.LIMIT:
+            metrics.uploads.inc(1, ("too_large",))
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json")],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Image must be under 5 MB"}'})
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.LIMIT:
+                    metrics.uploads.inc(1, ("too_large",))
+                    # Raised inside the body read, so the app's exception handling answers it
+                    raise HTTPException(status_code=413, detail="Image must be under 5 MB")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _close_file(out):
+    out.close()
+
+
+def _remove_temp(tmp_path: str):
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass  # already moved into place
+
+
+def _discard_file(out, tmp_path: str):
+    out.close()
+    _remove_temp(tmp_path)
+
+
+def _write_chunk(out, digest, chunk: bytes):
+    digest.update(chunk)
+    out.write(chunk)
+
+
+async def _save_upload(file: UploadFile):
+    """Validate and stream an upload to a temp file; return (filename, tmp_path).
+
+    The file is hashed while it streams to disk and is named after its
+    content; no database connection is held meanwhile. Callers move it into
+    place with `store_blob` under the write lock. All disk I/O runs in worker
+    threads.
+    """
     if file.content_type not in ALLOWED_TYPES:
+        metrics.uploads.inc(1, ("bad_type",))
         raise HTTPException(status_code=400, detail="Only JPG, PNG, WEBP or GIF allowed")
-    contents = await file.read()
-    if len(contents) > MAX_SIZE_BYTES:
-        raise HTTPException(status_code=400, detail="Image must be under 5 MB")
-    ext = os.path.splitext(file.filename)[1] or ".jpg"
-    filename = f"{prefix}_{uuid.uuid4().hex[:8]}{ext}"
-    with open(os.path.join(UPLOADS_DIR, filename), "wb") as f:
-        f.write(contents)
+    if file.size is not None and file.size > MAX_SIZE_BYTES:
+        metrics.uploads.inc(1, ("too_large",))
+        raise HTTPException(status_code=413, detail="Image must be under 5 MB")
+    fd, tmp_path = await asyncio.to_thread(
+        tempfile.mkstemp, dir=UPLOADS_DIR, prefix=".upload-", suffix=".part"
+    )
+    out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    try:
+        written = 0
+        while chunk := await file.read(CHUNK_SIZE):
+            written += len(chunk)
+            if written > MAX_SIZE_BYTES:
+                metrics.uploads.inc(1, ("too_large",))
+                raise HTTPException(status_code=413, detail="Image must be under 5 MB")
+            await asyncio.to_thread(_write_chunk, out, digest, chunk)
+        await asyncio.to_thread(_close_file, out)
+    except BaseException:
+        await asyncio.to_thread(_discard_file, out, tmp_path)
+        raise
+    metrics.uploads.inc(1, ("stored",))
+    metrics.upload_bytes.inc(written)
+    return content_filename(digest.hexdigest(), file.content_type), tmp_path
+
+
+async def _delete_file(db: aiosqlite.Connection, filename: str):
+    """Remove an uploaded image and its derivatives once nothing refers to it.
+
+    Call after the UPDATE that dropped the reference, before committing:
+    the write lock keeps another upload of the same content from landing
+    on the file while it is deleted.
+    """
+    if filename and await unreferenced(db, [filename]):
+        await forget_variants(db, filename)
+        await asyncio.to_thread(delete_image_files, filename)
+
+
+async def _replace_image(product_id: int, col: str, file: UploadFile) -> str:
+    """Point a product image column at an upload.
+
+    The upload is copied and hashed before the write lock is taken; the lock
+    only covers the row update, moving the file into place and the commit.
+    """
+    filename, tmp_path = await _save_upload(file)
+    try:
+        async with connection(write=True) as db:
+            cursor = await db.execute(f"SELECT {col} FROM products WHERE id = ?", (product_id,))
+            row = await cursor.fetchone()
+            if not row:
+                raise HTTPException(status_code=404, detail="Product not found")
+            await db.execute(f"UPDATE products SET {col} = ? WHERE id = ?", (filename, product_id))
+            stored = await asyncio.to_thread(store_blob, tmp_path, filename)
+            if row[0] != filename:
+                await _delete_file(db, row[0])
+            await db.commit()
+    except BaseException:
+        await asyncio.to_thread(_remove_temp, tmp_path)  # no-op once stored
+        raise
+    if stored:
+        schedule_variants(filename)
+        if col != "image":
+            schedule_analysis(filename)  # print artwork: warm the checker's cache
+    catalog_changed(product_id)
     return filename
 
 
-def _delete_file(filename: str):
-    if filename:
-        path = os.path.join(UPLOADS_DIR, filename)
-        if os.path.exists(path):
-            try:
-                os.remove(path)
-            except Exception:
-                pass
+# ── Derivatives ───────────────────────────────────────────────────────────────
+
+@router.get("/{product_id}/images", response_model=List[ProductImageOut])
+async def list_product_images(product_id: int, db: aiosqlite.Connection = Depends(get_db)):
+    """Every image on a product with its resized variants and srcset strings."""
+    cols = ", ".join(METHOD_IMAGE_COLS.values())
+    cursor = await db.execute(f"SELECT {cols} FROM products WHERE id = ?", (product_id,))
+    row = await cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Product not found")
+    images = [(key, filename) for key, filename in zip(METHOD_IMAGE_COLS, row) if filename]
+    variants = await load_variants(db, [filename for _, filename in images])
+    return [
+        {
+            "key": key,
+            "image": filename,
+            "image_url": f"/uploads/{filename}",
+            "variants": [
+                {"format": fmt, "width": width, "height": height, "url": f"/uploads/{name}"}
+                for fmt, width, height, name in variants[filename]
+            ],
+            "srcset": build_srcset(variants[filename]),
+        }
+        for key, filename in images
+    ]
+
+
+# ── Artwork checks ────────────────────────────────────────────────────────────
+
+@router.get("/{product_id}/artwork", response_model=ArtworkReport)
+async def check_product_artwork(product_id: int):
+    """Check each per-method image against its method's print requirements
+    (resolution, DPI, color count vs. the product's color limit, transparency)."""
+    reports = await check_products([product_id])
+    if not reports:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return reports[0]
+
+
+@router.post("/artwork/check", dependencies=[Depends(require_admin)])
+async def check_catalog_artwork(data: ArtworkCheckRequest):
+    """Re-check the artwork of many products (default: the whole catalog).
+
+    Streams NDJSON, one ArtworkReport per product that has method images.
+    Files are analyzed in parallel across the worker processes; stored
+    analyses are reused unless `refresh` is set.
+    """
+    if data.product_ids is not None:
+        product_ids = list(dict.fromkeys(data.product_ids))
+    else:
+        query, params = "SELECT id FROM products", []
+        if data.category:
+            query += " WHERE category = ?"
+            params.append(data.category)
+        async with connection() as db:
+            cursor = await db.execute(query + " ORDER BY id", params)
+            product_ids = [r[0] for r in await cursor.fetchall()]
+
+    async def lines():
+        for start in range(0, len(product_ids), CHECK_BATCH):
+            reports = await check_products(product_ids[start:start + CHECK_BATCH], data.refresh)
+            yield b"".join(
+                dumps(report) + b"\n" for report in reports
+                if report["checks"] and not (data.failed_only and report["ok"])
+            )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 # ── Product main image ────────────────────────────────────────────────────────
 
-@router.post("/{product_id}/upload-image")
+@router.post("/{product_id}/upload-image", dependencies=[Depends(require_admin)])
 async def upload_product_image(
     product_id: int,
     file: UploadFile = File(...),
-    db: aiosqlite.Connection = Depends(get_db)
 ):
-    cursor = await db.execute("SELECT id, image FROM products WHERE id = ?", (product_id,))
-    row = await cursor.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    _delete_file(row[1])
-    filename = await _save_upload(file, f"product_{product_id}")
-    await db.execute("UPDATE products SET image = ? WHERE id = ?", (filename, product_id))
-    await db.commit()
+    filename = await _replace_image(product_id, "image", file)
     return {"image": filename, "image_url": f"/uploads/{filename}"}
 
 
-@router.delete("/{product_id}/image")
+@router.delete("/{product_id}/image", dependencies=[Depends(require_admin)])
 async def delete_product_image(product_id: int, db: aiosqlite.Connection = Depends(get_db)):
     cursor = await db.execute("SELECT image FROM products WHERE id = ?", (product_id,))
     row = await cursor.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Product not found")
-    _delete_file(row[0])
     await db.execute("UPDATE products SET image = NULL WHERE id = ?", (product_id,))
+    await _delete_file(db, row[0])
     await db.commit()
+    catalog_changed(product_id)
     return {"message": "Image removed"}
 
 
 # ── Per-method images ─────────────────────────────────────────────────────────
 
-@router.post("/{product_id}/method-image/{method_key}")
+@router.post("/{product_id}/method-image/{method_key}", dependencies=[Depends(require_admin)])
 async def upload_method_image(
     product_id: int,
     method_key: str,
     file: UploadFile = File(...),
-    db: aiosqlite.Connection = Depends(get_db)
 ):
     col = METHOD_IMAGE_COLS.get(method_key)
     if not col or method_key == "product":
         raise HTTPException(status_code=400, detail=f"Invalid method key: {method_key}")
 
-    cursor = await db.execute(f"SELECT id, {col} FROM products WHERE id = ?", (product_id,))
-    row = await cursor.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    _delete_file(row[1])
-    filename = await _save_upload(file, f"p{product_id}_{method_key}")
-    await db.execute(f"UPDATE products SET {col} = ? WHERE id = ?", (filename, product_id))
-    await db.commit()
+    filename = await _replace_image(product_id, col, file)
     return {"image": filename, "image_url": f"/uploads/{filename}", "method": method_key}
 
 
-@router.delete("/{product_id}/method-image/{method_key}")
+@router.delete("/{product_id}/method-image/{method_key}", dependencies=[Depends(require_admin)])
 async def delete_method_image(
     product_id: int,
     method_key: str,
@@ -119,7 +304,8 @@ async def delete_method_image(
     if not row:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    _delete_file(row[0])
     await db.execute(f"UPDATE products SET {col} = NULL WHERE id = ?", (product_id,))
+    await _delete_file(db, row[0])
     await db.commit()
+    catalog_changed(product_id)
     return {"message": "Method image removed"}
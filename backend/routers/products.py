@@ -1,98 +1,410 @@
-from fastapi import APIRouter, Depends, HTTPException
-from database import get_db
-from models import ProductOut, ProductCreate, ProductUpdate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from database import connection, get_db, refresh_product_specs
+from routers.auth import require_admin
+from cache import catalog_changed, catalog_etag, change_watcher, etag_headers
+from engine import recommendation_engine
+from imaging import build_srcset, load_variants
+from models import (
+    ProductOut, ProductListOut, ProductCreate, ProductUpdate, ProductPatch, SuggestionOut,
+    BulkOperation, BulkRequest, BulkResponse, ChangeFeed,
+)
+from serialize import dumps, encode_rows, row_encoder
+from suggest import suggest_index
+from specs import METHOD_FIELDS
 from typing import Optional, List
 import aiosqlite
+import re
 
 router = APIRouter(prefix="/api/products", tags=["Products"])
 
+METHOD_KEYS = {field for _, field in METHOD_FIELDS}
+PRODUCT_COLUMNS = ["id"] + [f for f in ProductOut.model_fields if f != "id"]
+# Columns the write endpoints set; images go through the upload endpoints
+WRITE_COLUMNS = list(ProductPatch.model_fields)
+REQUIRED_COLUMNS = ("name", "category")
+MAX_BULK_OPS = 1000
+MAX_CHANGES_PAGE = 1000
+SSE_KEEPALIVE = 15  # seconds between comment lines on an idle event stream
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Relevance for search results (lower is better); name hits weigh the most
+RANK_EXPR = "bm25(products_fts, 10.0, 2.0, 2.0)"
+
 
 def row_to_dict(row):
     return dict(zip(row.keys(), row))
 
 
-@router.get("", response_model=List[ProductOut])
+def parse_fields(fields: Optional[str]):
+    """Columns to SELECT for a `fields=` projection; id always comes first."""
+    if not fields:
+        return PRODUCT_COLUMNS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in PRODUCT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [f for f in dict.fromkeys(requested) if f != "id"]
+
+
+def parse_cursor(value: str, ranked: bool):
+    """Decode a page cursor: "<id>", or "<score>:<id>" for ranked searches."""
+    try:
+        if ranked:
+            score, last_id = value.rsplit(":", 1)
+            return float(score), int(last_id)
+        return None, int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def fts_query(search: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    return " ".join(f'"{term}"*' for term in re.findall(r"\w+", search))
+
+
+async def encode_listing(db, columns, rows) -> bytes:
+    """A page of product rows as JSON; when `image` is selected each row also
+    carries `image_srcset` for its resized variants."""
+    if "image" not in columns:
+        return encode_rows(columns, rows)
+    encode = row_encoder(columns)
+    at = columns.index("image")
+    variants = await load_variants(db, list(dict.fromkeys(r[at] for r in rows if r[at])))
+    return dumps([
+        {**encode(r), "image_srcset": (build_srcset(variants[r[at]]) or None) if r[at] else None}
+        for r in rows
+    ])
+
+
+@router.get("", response_model=List[ProductListOut])
 async def list_products(
+    request: Request,
+    response: Response,
     search: Optional[str] = None,
     category: Optional[str] = None,
+    material: Optional[str] = None,
+    method: Optional[str] = None,
+    min_colors: Optional[int] = None,
+    max_days: Optional[int] = None,
+    fields: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, alias="cursor"),
+    _etag: str = Depends(catalog_etag),
     db: aiosqlite.Connection = Depends(get_db)
 ):
-    query = "SELECT * FROM products WHERE 1=1"
+    """List products a page at a time.
+
+    Pages are keyed on id (or on relevance then id when searching); follow
+    the `X-Next-Cursor` header / `Link: rel="next"` for the next page.
+    `fields=name,category` returns only those columns (plus id); rows with
+    `image` also get `image_srcset` once its variants exist.
+    """
+    if method is not None and method not in METHOD_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid method key: {method}")
+    columns = parse_fields(fields)
+    select = ", ".join(f"products.{c}" for c in columns)
+    match = fts_query(search) if search else ""
     params = []
-    if search:
-        query += " AND name LIKE ?"
-        params.append(f"%{search}%")
+    if match:
+        query = f"""
+            SELECT {select}, {RANK_EXPR} AS score FROM products_fts
+            JOIN products ON products.id = products_fts.rowid
+            WHERE products_fts MATCH ?
+        """
+        params.append(match)
+        order = " ORDER BY score, products.id"
+    else:
+        query = f"SELECT {select} FROM products WHERE 1=1"
+        order = " ORDER BY products.id"
+        if search:
+            # Punctuation-only search: nothing to tokenize, keep substring match
+            query += " AND name LIKE ?"
+            params.append(f"%{search}%")
     if category:
-        query += " AND category = ?"
+        query += " AND products.category = ?"
         params.append(category)
-    query += " ORDER BY id"
+    if material:
+        query += " AND products.material = ? COLLATE NOCASE"
+        params.append(material)
+    if method or min_colors is not None or max_days is not None:
+        # Some available method (or the requested one) must satisfy every limit
+        sub = "SELECT product_id FROM product_methods WHERE available = 1"
+        if method:
+            sub += " AND method_key = ?"
+            params.append(method)
+        if min_colors is not None and min_colors > 1:
+            sub += " AND (multi_color = 1 OR max_colors >= ?)"
+            params.append(min_colors)
+        if max_days is not None:
+            sub += " AND working_days <= ?"
+            params.append(max_days)
+        query += f" AND products.id IN ({sub})"
+    if after:
+        last_score, last_id = parse_cursor(after, ranked=bool(match))
+        if match:
+            query += f" AND ({RANK_EXPR} > ? OR ({RANK_EXPR} = ? AND products.id > ?))"
+            params += [last_score, last_score, last_id]
+        else:
+            query += " AND products.id > ?"
+            params.append(last_id)
+    query += order + " LIMIT ?"
+    params.append(limit + 1)  # one extra row tells us whether another page exists
     cursor = await db.execute(query, params)
     rows = await cursor.fetchall()
-    return [row_to_dict(r) for r in rows]
+
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = f"{last[-1]!r}:{last[0]}" if match else str(last[0])
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    # Rows are sent as stored, without ProductOut validation (also what lets
+    # partial `fields=` rows through); copy over the headers set above
+    return Response(
+        content=await encode_listing(db, columns, rows[:limit]), media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+
+@router.get("/suggest", response_model=List[SuggestionOut])
+async def suggest_products(q: str = Query(..., min_length=1), limit: int = Query(8, ge=1, le=20)):
+    """Typeahead over product name, category and material from the in-memory
+    prefix index; only touches the DB to pick up products changed since the
+    last call."""
+    if suggest_index.pending:
+        await suggest_index.refresh()
+    return suggest_index.search(q, limit)
+
+
+# ── Change feed ───────────────────────────────────────────────────────────────
+
+async def load_changes(db, since: Optional[int], limit: int) -> dict:
+    """Products changed after log position `since`, one entry per product.
+
+    Several changes to a product collapse into its current row (or a
+    tombstone once it is gone). Without `since`, only returns the current
+    position, which a client takes before its initial full load.
+    """
+    cursor = await db.execute("SELECT MIN(seq), MAX(seq) FROM catalog_changes")
+    first, last = await cursor.fetchone()
+    last = last or 0
+    feed = {"since": since, "next": last, "reset": False, "more": False, "changes": []}
+    if since is None:
+        return feed
+    if since > last or (first is not None and since < first - 1):
+        feed["reset"] = True
+        return feed
+    cursor = await db.execute("""
+        SELECT product_id, MAX(seq) AS last_seq FROM catalog_changes
+        WHERE seq > ? GROUP BY product_id ORDER BY last_seq LIMIT ?
+    """, (since, limit + 1))
+    rows = await cursor.fetchall()
+    feed["more"] = len(rows) > limit
+    rows = rows[:limit]
+    products = {}
+    if rows:
+        ids = [r[0] for r in rows]
+        cursor = await db.execute(
+            f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE id IN ({','.join('?' * len(ids))})", ids
+        )
+        encode = row_encoder(PRODUCT_COLUMNS)
+        products = {r[0]: encode(r) for r in await cursor.fetchall()}
+    feed["next"] = rows[-1][1] if rows else since
+    feed["changes"] = [
+        {"seq": seq, "id": pid, "deleted": pid not in products, "product": products.get(pid)}
+        for pid, seq in rows
+    ]
+    return feed
+
+
+@router.get("/changes", response_model=ChangeFeed)
+async def list_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(MAX_CHANGES_PAGE, ge=1, le=MAX_CHANGES_PAGE),
+    db: aiosqlite.Connection = Depends(get_db)
+):
+    """Upserts and tombstones since a log position, so clients can sync
+    deltas instead of re-fetching the catalog. Follow `next` while `more`."""
+    return Response(content=dumps(await load_changes(db, since, limit)), media_type="application/json")
+
+
+@router.get("/changes/stream")
+async def stream_changes(request: Request, since: Optional[int] = Query(None, ge=0)):
+    """Server-sent events: a `changes` event, shaped like GET /changes,
+    whenever the catalog changes. Reconnects resume from Last-Event-ID."""
+    last_event = request.headers.get("last-event-id", "")
+    if last_event.isdigit():
+        since = int(last_event)
+
+    async def events():
+        position = since
+        yield "retry: 3000\n\n"
+        while True:
+            async with connection() as db:
+                feed = await load_changes(db, position, MAX_CHANGES_PAGE)
+            if feed["changes"] or feed["reset"]:
+                body = dumps(feed).decode()
+                yield f"id: {feed['next']}\nevent: changes\ndata: {body}\n\n"
+            position = feed["next"]
+            if feed["more"]:
+                continue
+            if not await change_watcher.wait_past(position, SSE_KEEPALIVE):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/categories", response_model=List[str])
-async def get_categories(db: aiosqlite.Connection = Depends(get_db)):
+async def get_categories(
+    _etag: str = Depends(catalog_etag),
+    db: aiosqlite.Connection = Depends(get_db)
+):
     cursor = await db.execute("SELECT DISTINCT category FROM products ORDER BY category")
     rows = await cursor.fetchall()
     return [r[0] for r in rows]
 
 
 @router.get("/{product_id}", response_model=ProductOut)
-async def get_product(product_id: int, db: aiosqlite.Connection = Depends(get_db)):
-    cursor = await db.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-    row = await cursor.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return row_to_dict(row)
+async def get_product(
+    product_id: int,
+    _etag: str = Depends(catalog_etag),
+    db: aiosqlite.Connection = Depends(get_db)
+):
+    entry = recommendation_engine.lookup(product_id)
+    if entry is not None:
+        # Already encoded for the recommendation cache
+        body = entry.product_json
+    else:
+        cursor = await db.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE id = ?", (product_id,))
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Product not found")
+        body = dumps(row_encoder(PRODUCT_COLUMNS)(row))
+    return Response(content=body, media_type="application/json", headers=etag_headers(_etag))
+
+
+# ── Writes ────────────────────────────────────────────────────────────────────
+
+async def insert_product(db, values: dict):
+    """INSERT a product from the given columns; returns the stored row (caller commits)."""
+    cols = [c for c in WRITE_COLUMNS if c in values]
+    cursor = await db.execute(
+        f"INSERT INTO products ({', '.join(cols)}) VALUES ({','.join('?' * len(cols))}) RETURNING *",
+        [values[c] for c in cols],
+    )
+    return await cursor.fetchone()
+
+
+async def patch_product(db, product_id: int, values: dict):
+    """UPDATE only the given columns; returns the stored row, or None if missing."""
+    cols = [c for c in WRITE_COLUMNS if c in values]
+    if not cols:
+        cursor = await db.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+    else:
+        assignments = ", ".join(f"{c} = ?" for c in cols)
+        cursor = await db.execute(
+            f"UPDATE products SET {assignments} WHERE id = ? RETURNING *",
+            [values[c] for c in cols] + [product_id],
+        )
+    return await cursor.fetchone()
+
+
+def check_required(values: dict, creating: bool = False):
+    """name and category can never be null, and must be present on create."""
+    bad = [c for c in REQUIRED_COLUMNS if (creating or c in values) and values.get(c) is None]
+    if bad:
+        raise HTTPException(status_code=422, detail=f"Required: {', '.join(bad)}")
+
+
+async def apply_operation(db, op: BulkOperation):
+    """Run one bulk operation; returns (result, touched product id)."""
+    values = op.data.model_dump(exclude_unset=True) if op.data else {}
+    if op.op == "create":
+        check_required(values, creating=True)
+        row = await insert_product(db, values)
+        return {"op": op.op, "id": row["id"], "product": row_to_dict(row)}, row["id"]
+    if op.id is None:
+        raise HTTPException(status_code=422, detail=f"{op.op} needs an id")
+    if op.op == "update":
+        check_required(values)
+        row = await patch_product(db, op.id, values)
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Product {op.id} not found")
+        return {"op": op.op, "id": op.id, "product": row_to_dict(row)}, op.id
+    cursor = await db.execute("DELETE FROM products WHERE id = ? RETURNING id", (op.id,))
+    if not await cursor.fetchone():
+        raise HTTPException(status_code=404, detail=f"Product {op.id} not found")
+    return {"op": op.op, "id": op.id, "product": None}, op.id
+
 
+@router.patch("/bulk", response_model=BulkResponse, dependencies=[Depends(require_admin)])
+async def bulk_write(data: BulkRequest, db: aiosqlite.Connection = Depends(get_db)):
+    """Apply create / update / delete operations in order, in one transaction.
+
+    Updates only write the fields they send. If any operation fails nothing
+    is saved and the error names the failing operation's index.
+    """
+    if len(data.operations) > MAX_BULK_OPS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_OPS} operations per request")
+    results, touched = [], set()
+    for i, op in enumerate(data.operations):
+        try:
+            result, product_id = await apply_operation(db, op)
+        except HTTPException as exc:
+            await db.rollback()
+            raise HTTPException(status_code=exc.status_code, detail=f"Operation {i}: {exc.detail}")
+        results.append(result)
+        touched.add(product_id)
+    await refresh_product_specs(db, touched)
+    await db.commit()
+    for product_id in touched:
+        catalog_changed(product_id)
+    return {"results": results}
 
-@router.post("", response_model=ProductOut)
+
+@router.post("", response_model=ProductOut, dependencies=[Depends(require_admin)])
 async def create_product(data: ProductCreate, db: aiosqlite.Connection = Depends(get_db)):
-    cursor = await db.execute("""
-        INSERT INTO products (name, category, material, screen_printing, uv_printing,
-            offset_printing, digital_printing, laser_engraving, dtg_dtf,
-            embroidery, sublimation, production_time)
-        VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-    """, (
-        data.name, data.category, data.material,
-        data.screen_printing, data.uv_printing, data.offset_printing,
-        data.digital_printing, data.laser_engraving, data.dtg_dtf,
-        data.embroidery, data.sublimation, data.production_time
-    ))
+    row = await insert_product(db, data.model_dump(include=set(WRITE_COLUMNS)))
+    await refresh_product_specs(db, [row["id"]])
     await db.commit()
-    new_id = cursor.lastrowid
-    cursor = await db.execute("SELECT * FROM products WHERE id = ?", (new_id,))
-    row = await cursor.fetchone()
+    catalog_changed(row["id"])
     return row_to_dict(row)
 
 
-@router.put("/{product_id}", response_model=ProductOut)
+@router.put("/{product_id}", response_model=ProductOut, dependencies=[Depends(require_admin)])
 async def update_product(product_id: int, data: ProductUpdate, db: aiosqlite.Connection = Depends(get_db)):
-    cursor = await db.execute("SELECT id FROM products WHERE id = ?", (product_id,))
-    if not await cursor.fetchone():
+    row = await patch_product(db, product_id, data.model_dump(include=set(WRITE_COLUMNS)))
+    if not row:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await refresh_product_specs(db, [product_id])
+    await db.commit()
+    catalog_changed(product_id)
+    return row_to_dict(row)
+
+
+@router.patch("/{product_id}", response_model=ProductOut, dependencies=[Depends(require_admin)])
+async def partial_update_product(product_id: int, data: ProductPatch, db: aiosqlite.Connection = Depends(get_db)):
+    """Update only the fields present in the request body."""
+    values = data.model_dump(exclude_unset=True)
+    check_required(values)
+    row = await patch_product(db, product_id, values)
+    if not row:
         raise HTTPException(status_code=404, detail="Product not found")
-    await db.execute("""
-        UPDATE products SET name=?, category=?, material=?, screen_printing=?, uv_printing=?,
-            offset_printing=?, digital_printing=?, laser_engraving=?, dtg_dtf=?,
-            embroidery=?, sublimation=?, production_time=? WHERE id=?
-    """, (
-        data.name, data.category, data.material,
-        data.screen_printing, data.uv_printing, data.offset_printing,
-        data.digital_printing, data.laser_engraving, data.dtg_dtf,
-        data.embroidery, data.sublimation, data.production_time, product_id
-    ))
+    await refresh_product_specs(db, [product_id])
     await db.commit()
-    cursor = await db.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-    row = await cursor.fetchone()
+    catalog_changed(product_id)
     return row_to_dict(row)
 
 
-@router.delete("/{product_id}")
+@router.delete("/{product_id}", dependencies=[Depends(require_admin)])
 async def delete_product(product_id: int, db: aiosqlite.Connection = Depends(get_db)):
-    cursor = await db.execute("SELECT id FROM products WHERE id = ?", (product_id,))
+    cursor = await db.execute("DELETE FROM products WHERE id = ? RETURNING id", (product_id,))
     if not await cursor.fetchone():
         raise HTTPException(status_code=404, detail="Product not found")
-    await db.execute("DELETE FROM products WHERE id = ?", (product_id,))
     await db.commit()
+    catalog_changed(product_id)
     return {"message": "Product deleted successfully"}
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from database import get_db, connection
+from routers.auth import require_admin
+from models import MethodPrice, QuoteRequest, QuoteOut
+from quotes import METHOD_INDEX, build_quote
+from serialize import dumps
+from typing import List
+import aiosqlite
+
+router = APIRouter(prefix="/api/quotes", tags=["Quotes"])
+
+MAX_QUOTE_LINES = 20000
+
+
+@router.post("", response_model=QuoteOut)
+async def create_quote(data: QuoteRequest):
+    """Price a list of (product, method, qty, colors) lines with lead times.
+
+    Lines without `method_key` get the cheapest method that can print them.
+    Lines that can't be made come back with `feasible: false` and a reason.
+    """
+    if len(data.lines) > MAX_QUOTE_LINES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_QUOTE_LINES} lines per quote")
+    async with connection() as db:
+        try:
+            quote = await build_quote(db, data.lines)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    return Response(content=dumps(quote), media_type="application/json")
+
+
+@router.get("/prices", response_model=List[MethodPrice])
+async def list_prices(db: aiosqlite.Connection = Depends(get_db)):
+    cursor = await db.execute("""
+        SELECT method_key, qty_min, unit_price, extra_color_price, setup_fee
+        FROM method_prices ORDER BY method_key, qty_min
+    """)
+    return [dict(row) for row in await cursor.fetchall()]
+
+
+@router.put("/prices", response_model=List[MethodPrice], dependencies=[Depends(require_admin)])
+async def replace_prices(prices: List[MethodPrice], db: aiosqlite.Connection = Depends(get_db)):
+    """Replace the whole price list; each method's breaks start at their qty_min."""
+    seen = set()
+    for i, price in enumerate(prices):
+        if price.method_key not in METHOD_INDEX:
+            raise HTTPException(status_code=400, detail=f"Entry {i}: unknown method '{price.method_key}'")
+        if (price.method_key, price.qty_min) in seen:
+            raise HTTPException(
+                status_code=400, detail=f"Entry {i}: duplicate break {price.method_key} from {price.qty_min}"
+            )
+        seen.add((price.method_key, price.qty_min))
+    await db.execute("DELETE FROM method_prices")
+    await db.executemany("""
+        INSERT INTO method_prices (method_key, qty_min, unit_price, extra_color_price, setup_fee)
+        VALUES (?,?,?,?,?)
+    """, [(p.method_key, p.qty_min, p.unit_price, p.extra_color_price, p.setup_fee) for p in prices])
+    await db.commit()
+    return sorted(prices, key=lambda p: (p.method_key, p.qty_min))
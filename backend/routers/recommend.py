@@ -1,91 +1,152 @@
-from fastapi import APIRouter, Depends, HTTPException
-from database import get_db
-from models import RecommendationOut, PrintingMethodDetail, ProductOut
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from cache import catalog_etag, etag_headers
+from database import get_db, connection
+from engine import recommendation_engine, BATCH_CHUNK_SIZE, Entry
+from models import (
+    RecommendationOut, RankedRecommendationOut, TopMethodOut,
+    BatchRecommendRequest, BatchRecommendationOut,
+)
+from serialize import dumps
+from specs import METHOD_FIELDS, parse_production_time, rank_methods  # noqa: F401  (re-exported)
+from typing import List, Optional, Union
 import aiosqlite
 
 router = APIRouter(prefix="/api/recommend", tags=["Recommend"])
 
-METHOD_FIELDS = [
-    ("Screen Printing", "screen_printing"),
-    ("UV Printing", "uv_printing"),
-    ("Offset Printing", "offset_printing"),
-    ("Digital Printing", "digital_printing"),
-    ("Laser Engraving", "laser_engraving"),
-    ("DTG / DTF", "dtg_dtf"),
-    ("Embroidery", "embroidery"),
-    ("Sublimation", "sublimation"),
-]
-
-
-def parse_production_time(production_time_str: str, method_name: str):
-    if not production_time_str:
-        return None
-    lines = production_time_str.split("\n")
-    method_keywords = {
-        "Screen Printing": ["Screen"],
-        "UV Printing": ["UV"],
-        "Offset Printing": ["Offset"],
-        "Digital Printing": ["Digital"],
-        "Laser Engraving": ["Engrave", "Engraving"],
-        "DTG / DTF": ["DTG", "DTF"],
-        "Embroidery": ["Emb", "Embroidery"],
-        "Sublimation": ["Subilimation", "Sublimation"],
-    }
-    keywords = method_keywords.get(method_name, [])
-    for line in lines:
-        for kw in keywords:
-            if kw.lower() in line.lower():
-                return line.strip()
-    return None
-
-
-def row_to_dict(row):
-    return dict(zip(row.keys(), row))
-
-
-@router.get("/{product_id}", response_model=RecommendationOut)
-async def recommend(product_id: int, db: aiosqlite.Connection = Depends(get_db)):
-    cursor = await db.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-    row = await cursor.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    product_dict = row_to_dict(row)
-    methods = []
+MAX_BATCH_IDS = 10000
+NOT_FOUND = "Product not found"
+METHOD_NAMES = {field: name for name, field in METHOD_FIELDS}
+
+
+def _json_int(value) -> bytes:
+    return b"null" if value is None else str(value).encode()
 
-    for method_name, field in METHOD_FIELDS:
-        value = product_dict.get(field)
-        available = value is not None and value.strip().upper() != "NA" and value.strip() != ""
-
-        color_limit = None
-        notes = None
-        if available:
-            if value.strip().upper() == "MULTI":
-                color_limit = "Multi-color"
-            elif any(c.isdigit() for c in value):
-                parts = value.split("(")
-                color_limit = parts[0].strip() + " color(s)"
-                if len(parts) > 1:
-                    notes = "(" + parts[1]
-            else:
-                notes = value.strip()
-
-        production_time = parse_production_time(product_dict.get("production_time"), method_name)
-
-        # Per-method image filename
-        method_image = product_dict.get(f"{field}_image")
-
-        methods.append(PrintingMethodDetail(
-            method=method_name,
-            method_key=field,
-            color_limit=color_limit if available else None,
-            available=available,
-            notes=notes if available else None,
-            production_time=production_time if available else None,
-            method_image=method_image if available else None,
-        ))
-
-    return RecommendationOut(
-        product=ProductOut(**product_dict),
-        methods=methods
+
+def _ranked_payload(entry: Entry, qty: Optional[int], colors: Optional[int]) -> bytes:
+    """Splice ranking fields into the entry's pre-serialized method objects."""
+    methods = []
+    for rank, (i, feasible, lead, reason) in enumerate(rank_methods(entry.specs, qty, colors), 1):
+        methods.append(
+            entry.method_json[i][:-1]
+            + b',"rank":%d,"feasible":%s,"lead_days":%s,"reason":%s}' % (
+                rank, b"true" if feasible else b"false", _json_int(lead),
+                dumps(reason))
+        )
+    return (
+        b'{"product":' + entry.product_json
+        + b',"qty":' + _json_int(qty) + b',"colors":' + _json_int(colors)
+        + b',"methods":[' + b",".join(methods) + b"]}"
     )
+
+
+def _batch_item(product_id: int, entry: Optional[Entry]) -> bytes:
+    """Encode one batch result around an already-serialized recommendation."""
+    if entry is None:
+        return b'{"product_id":%d,"found":false,"recommendation":null,"error":"%s"}' % (
+            product_id, NOT_FOUND.encode())
+    return b'{"product_id":%d,"found":true,"recommendation":%s,"error":null}' % (product_id, entry.payload)
+
+
+@router.post("/batch", response_model=BatchRecommendationOut)
+async def recommend_batch(data: BatchRecommendRequest, stream: bool = False):
+    """Recommendations for many products at once; misses are reported per id.
+
+    With `?stream=true` the results are sent as NDJSON, one line per id,
+    fetched chunk by chunk so large baskets are never buffered whole.
+    """
+    if len(data.ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per batch")
+
+    if stream:
+        async def lines():
+            for start in range(0, len(data.ids), BATCH_CHUNK_SIZE):
+                chunk = data.ids[start:start + BATCH_CHUNK_SIZE]
+                async with connection() as db:
+                    found = await recommendation_engine.get_many(db, chunk)
+                yield b"".join(_batch_item(pid, found.get(pid)) + b"\n" for pid in chunk)
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async with connection() as db:
+        found = await recommendation_engine.get_many(db, data.ids)
+    body = b'{"results":[' + b",".join(_batch_item(pid, found.get(pid)) for pid in data.ids) + b"]}"
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/top", response_model=List[TopMethodOut])
+async def top_methods(
+    qty: int = Query(..., ge=1),
+    colors: Optional[int] = Query(None, ge=1),
+    max_days: Optional[int] = Query(None, ge=0),
+    category: Optional[str] = None,
+    k: int = Query(10, ge=1, le=100),
+    _etag: str = Depends(catalog_etag),
+    db: aiosqlite.Connection = Depends(get_db)
+):
+    """Catalog-wide top-k (product, method) pairs for a quantity and deadline.
+
+    Runs over the indexed product_methods / product_schedule rows with the
+    same slot and color rules as the per-product ranking: methods without a
+    parsed schedule stay in with an unknown lead time and sort after known
+    ones, and are left out when `max_days` is given.
+    """
+    query = """
+        SELECT pm.product_id, p.name, p.category, pm.method_key,
+               MIN(ps.working_days) AS lead_days, pm.max_colors, pm.multi_color
+        FROM product_methods pm
+        JOIN products p ON p.id = pm.product_id
+        LEFT JOIN product_schedule ps
+            ON ps.product_id = pm.product_id AND ps.method_key = pm.method_key
+           AND ps.working_days IS NOT NULL
+           AND (ps.qty_min IS NULL OR ps.qty_min <= ?)
+           AND (ps.qty_max IS NULL OR ps.qty_max >= ?)
+        WHERE pm.available = 1
+    """
+    params = [qty, qty]
+    if colors is not None:
+        query += " AND (pm.multi_color = 1 OR COALESCE(pm.max_colors, 1) >= ?)"
+        params.append(colors)
+    if category:
+        query += " AND p.category = ?"
+        params.append(category)
+    # No slot for this qty is infeasible, unless the method has no schedule at all
+    query += """
+        GROUP BY pm.product_id, pm.method_key
+        HAVING (lead_days IS NOT NULL OR pm.working_days IS NULL)
+    """
+    if max_days is not None:
+        query += " AND lead_days <= ?"
+        params.append(max_days)
+    query += """
+        ORDER BY lead_days IS NULL, lead_days, pm.multi_color DESC, COALESCE(pm.max_colors, 1) DESC, pm.product_id
+        LIMIT ?
+    """
+    params.append(k)
+    cursor = await db.execute(query, params)
+    body = dumps([
+        {
+            "product_id": pid, "product_name": name, "category": cat,
+            "method": METHOD_NAMES[key], "method_key": key, "lead_days": lead,
+            "max_colors": max_colors, "multi_color": bool(multi),
+        }
+        for pid, name, cat, key, lead, max_colors, multi in await cursor.fetchall()
+    ])
+    return Response(content=body, media_type="application/json", headers=etag_headers(_etag))
+
+
+@router.get("/{product_id}", response_model=Union[RankedRecommendationOut, RecommendationOut])
+async def recommend(
+    product_id: int,
+    qty: Optional[int] = Query(None, ge=1),
+    colors: Optional[int] = Query(None, ge=1),
+    etag: str = Depends(catalog_etag),
+    db: aiosqlite.Connection = Depends(get_db)
+):
+    """Methods for a product; with `qty` and/or `colors` they come back ranked
+    by feasibility, lead time and color capacity."""
+    entry = await recommendation_engine.get(db, product_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=NOT_FOUND)
+    body = entry.payload if qty is None and colors is None else _ranked_payload(entry, qty, colors)
+    return Response(content=body, media_type="application/json", headers=etag_headers(etag))
@@ -0,0 +1,235 @@
+import re
+from typing import NamedTuple, Optional, Tuple
+
+# (display name, DB column) for every printing method, in display order
+METHOD_FIELDS = [
+    ("Screen Printing", "screen_printing"),
+    ("UV Printing", "uv_printing"),
+    ("Offset Printing", "offset_printing"),
+    ("Digital Printing", "digital_printing"),
+    ("Laser Engraving", "laser_engraving"),
+    ("DTG / DTF", "dtg_dtf"),
+    ("Embroidery", "embroidery"),
+    ("Sublimation", "sublimation"),
+]
+
+# Keywords that identify a method's line in the production_time text.
+# Stored lowercased so matching never has to re-lowercase them.
+METHOD_KEYWORDS = {
+    "Screen Printing": ("screen",),
+    "UV Printing": ("uv",),
+    "Offset Printing": ("offset",),
+    "Digital Printing": ("digital",),
+    "Laser Engraving": ("engrave", "engraving"),
+    "DTG / DTF": ("dtg", "dtf"),
+    "Embroidery": ("emb", "embroidery"),
+    "Sublimation": ("subilimation", "sublimation"),
+}
+
+
+def split_production_lines(production_time_str: str):
+    """Split production_time into (stripped line, lowercased line) pairs."""
+    if not production_time_str:
+        return []
+    return [(line.strip(), line.lower()) for line in production_time_str.split("\n")]
+
+
+def match_production_line(lines, method_name: str):
+    """Return the first pre-split line mentioning the method, or None."""
+    keywords = METHOD_KEYWORDS.get(method_name, ())
+    for line, lowered in lines:
+        for kw in keywords:
+            if kw in lowered:
+                return line
+    return None
+
+
+def parse_production_time(production_time_str: str, method_name: str):
+    return match_production_line(split_production_lines(production_time_str), method_name)
+
+
+def parse_color_limit(value):
+    """Parse a method cell into (available, color_limit, notes)."""
+    if value is None:
+        return False, None, None
+    stripped = value.strip()
+    if stripped == "" or stripped.upper() == "NA":
+        return False, None, None
+    if stripped.upper() == "MULTI":
+        return True, "Multi-color", None
+    if any(c.isdigit() for c in value):
+        parts = value.split("(")
+        notes = "(" + parts[1] if len(parts) > 1 else None
+        return True, parts[0].strip() + " color(s)", notes
+    return True, None, stripped
+
+
+# Quantity in parentheses, as the supplier sheet writes it: "(Qty 100–500)",
+# "(Qty 5+)", "(Qty:1-100)", "(Qty : 10)", or without the word: "UV(50)",
+# "Engraving (100)", "(100-500)", "(500+)"
+QTY_RE = re.compile(r"\(\s*(?:qty\s*:?\s*)?(\d+)\s*(?:[–—-]\s*(\d+)|(\+))?\s*\)", re.IGNORECASE)
+# "= 4 working days"; also before the quantity ("2 working day (Qty :5)")
+# or with none at all ("Subilimation = 3 working day")
+DAYS_RE = re.compile(r"(\d+)\s*working\s*day", re.IGNORECASE)
+
+
+def parse_color_capacity(value):
+    """Parse a method cell into (available, max_colors, multi_color).
+
+    "2 (Prices may vary)" -> (True, 2, False), "Multi" -> (True, None, True),
+    "Engraved finish" -> (True, None, False), "NA" -> (False, None, False).
+    """
+    available, color_limit, _ = parse_color_limit(value)
+    if not available:
+        return False, None, False
+    if color_limit == "Multi-color":
+        return True, None, True
+    digits = re.search(r"\d+", color_limit or "")
+    return True, int(digits.group()) if digits else None, False
+
+
+def parse_schedule(production_time_str: str):
+    """Parse production_time into (method_key, line_no, qty_min, qty_max, working_days, line).
+
+    One line can name several methods ("DTG/DTF, Embroidery, or Sublimation");
+    it yields an entry for each. A bare "(Qty 100)" or "(100)" is a minimum with no upper
+    bound; lines without a recognizable quantity/days keep None numbers.
+    """
+    entries = []
+    for line_no, (line, lowered) in enumerate(split_production_lines(production_time_str)):
+        qty = QTY_RE.search(line)
+        qty_min, qty_max, _ = qty.groups() if qty else (None, None, None)
+        days = DAYS_RE.search(line)
+        days = days.group(1) if days else None
+        for method_name, field in METHOD_FIELDS:
+            if any(kw in lowered for kw in METHOD_KEYWORDS[method_name]):
+                entries.append((
+                    field, line_no,
+                    int(qty_min) if qty_min else None,
+                    int(qty_max) if qty_max else None,
+                    int(days) if days else None,
+                    line,
+                ))
+    return entries
+
+
+def method_rows(product: dict, schedule=None):
+    """Rows for the product_methods table:
+    (method_key, available, min_colors, max_colors, multi_color, min_qty, working_days).
+    """
+    if schedule is None:
+        schedule = parse_schedule(product.get("production_time"))
+    rows = []
+    for _, field in METHOD_FIELDS:
+        available, max_colors, multi = parse_color_capacity(product.get(field))
+        entries = [e for e in schedule if e[0] == field and e[4] is not None] if available else []
+        rows.append((
+            field,
+            int(available),
+            1 if available else None,
+            max_colors,
+            int(multi),
+            min(e[2] for e in entries) if entries else None,
+            min(e[4] for e in entries) if entries else None,
+        ))
+    return rows
+
+
+def build_methods(product: dict, schedule):
+    """PrintingMethodDetail-shaped dicts, one per method, for one product row.
+
+    `schedule` maps method_key to its product_schedule rows
+    (qty_min, qty_max, working_days, description) in line order. Values come
+    straight from the parsers with the model's types, so they are encoded
+    without going through pydantic.
+    """
+    methods = []
+    for method_name, field in METHOD_FIELDS:
+        available, color_limit, notes = parse_color_limit(product.get(field))
+        slots = schedule.get(field, ()) if available else ()
+        timed = [slot for slot in slots if slot[2] is not None]
+        methods.append({
+            "method": method_name,
+            "method_key": field,
+            "color_limit": color_limit,
+            "available": available,
+            "notes": notes,
+            "production_time": slots[0][3] if slots else None,
+            "method_image": product.get(f"{field}_image") if available else None,
+            "min_qty": min((s[0] for s in timed if s[0] is not None), default=None),
+            "working_days": min((s[2] for s in timed), default=None),
+            "schedule": [
+                {"qty_min": s[0], "qty_max": s[1], "working_days": s[2], "description": s[3]}
+                for s in slots
+            ],
+        })
+    return methods
+
+
+class MethodSpec(NamedTuple):
+    """Numeric view of one method for ranking."""
+    method_key: str
+    available: bool
+    max_colors: Optional[int]
+    multi_color: bool
+    slots: Tuple[Tuple[Optional[int], Optional[int], int], ...]  # (qty_min, qty_max, days)
+
+
+def method_specs(product: dict, schedule):
+    """MethodSpec per METHOD_FIELDS entry from a product row and its schedule rows."""
+    specs = []
+    for _, field in METHOD_FIELDS:
+        available, max_colors, multi = parse_color_capacity(product.get(field))
+        slots = tuple(
+            (qty_min, qty_max, days)
+            for qty_min, qty_max, days, _ in schedule.get(field, ())
+            if days is not None
+        ) if available else ()
+        specs.append(MethodSpec(field, available, max_colors, multi, slots))
+    return tuple(specs)
+
+
+def color_capacity(spec: MethodSpec) -> float:
+    """Colors a method can print; single-tone finishes (e.g. engraving) count as 1."""
+    if spec.multi_color:
+        return float("inf")
+    return spec.max_colors or 1
+
+
+def evaluate_method(spec: MethodSpec, qty: Optional[int] = None, colors: Optional[int] = None):
+    """Return (feasible, lead_days, reason) for one method at a quantity / color count.
+
+    A schedule slot applies when qty_min <= qty <= qty_max (no max = open
+    ended). Methods with no parsed schedule stay feasible with unknown lead time.
+    """
+    if not spec.available:
+        return False, None, "Not available for this product"
+    if colors is not None and colors > color_capacity(spec):
+        return False, None, f"Supports at most {spec.max_colors or 1} color(s)"
+    if not spec.slots:
+        return True, None, None
+    if qty is None:
+        return True, min(days for _, _, days in spec.slots), None
+    days = [
+        d for lo, hi, d in spec.slots
+        if (lo is None or lo <= qty) and (hi is None or qty <= hi)
+    ]
+    if not days:
+        lowest = min((lo for lo, _, _ in spec.slots if lo is not None), default=None)
+        if lowest is not None and qty < lowest:
+            return False, None, f"Minimum quantity is {lowest}"
+        return False, None, f"No production slot for quantity {qty}"
+    return True, min(days), None
+
+
+def rank_methods(specs, qty: Optional[int] = None, colors: Optional[int] = None):
+    """Rank methods best first: feasible, then known and shorter lead time,
+    then larger color capacity. Returns [(index, feasible, lead_days, reason)].
+    """
+    scored = []
+    for i, spec in enumerate(specs):
+        feasible, lead, reason = evaluate_method(spec, qty, colors)
+        key = (not feasible, lead is None, lead or 0, -color_capacity(spec), i)
+        scored.append((key, i, feasible, lead, reason))
+    scored.sort()
+    return [(i, feasible, lead, reason) for _, i, feasible, lead, reason in scored]
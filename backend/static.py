@@ -0,0 +1,88 @@
+"""Static serving for the content-addressed upload store.
+
+Uploaded files are named after their content and never change in place,
+so they are served as immutable with a one-year max-age, and with single
+byte-range support for resumable downloads and progressive image loaders.
+"""
+import os
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.staticfiles import StaticFiles
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header: str, size: int):
+    """(start, end) inclusive for a single `bytes=` range, None to serve the
+    whole file (absent, malformed or multi-range), or ValueError when the
+    range can't be satisfied."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first.isdigit() or (not first and last.isdigit())):
+        return None
+    if last and not last.isdigit():
+        return None
+    if not first:  # suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+async def _read_range(path: str, start: int, end: int):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class UploadFiles(StaticFiles):
+    """StaticFiles with immutable caching, Range requests, and hidden dotfiles
+    (uploads in progress are written to `.upload-*.part`)."""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        if os.path.basename(full_path).startswith("."):
+            raise HTTPException(status_code=404)
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.headers["Accept-Ranges"] = "bytes"
+        request_headers = Headers(scope=scope)
+        range_header = request_headers.get("range")
+        if (
+            not isinstance(response, FileResponse)
+            or scope["method"] != "GET"
+            or not range_header
+        ):
+            return response
+        if_range = request_headers.get("if-range")
+        if if_range and if_range not in (response.headers["etag"], response.headers["last-modified"]):
+            return response  # changed since the client's partial copy: send it all
+        size = stat_result.st_size
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        if byte_range is None:
+            return response
+        start, end = byte_range
+        headers = {
+            key: response.headers[key]
+            for key in ("cache-control", "accept-ranges", "etag", "last-modified", "content-type")
+        }
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(_read_range(str(full_path), start, end), status_code=206, headers=headers)
@@ -0,0 +1,180 @@
+import html
+import re
+from bisect import bisect_left, insort
+from database import connection
+
+WORD_RE = re.compile(r"\w+")
+SUGGEST_FIELDS = ("name", "category", "material")
+MAX_SCAN = 2000  # index entries examined per query, bounding worst-case latency
+PATCH_MAX = 256  # changed keys up to which a refresh shifts them in place instead of rebuilding
+
+
+class SuggestIndex:
+    """Sorted prefix index over product name, category and material.
+
+    `_keys` holds (token, field_no, product_id) tuples in sorted order, so
+    every token starting with a prefix sits in one contiguous slice found by
+    bisect. Writers call `mark_dirty(product_id)`; dirty products are
+    re-read on the next query so the index updates incrementally.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._products = {}  # product_id -> (name, category, material)
+        self._tokens = {}  # product_id -> every token of the product
+        self._dirty = set()
+        self._stale = True  # full rebuild needed
+
+    def mark_dirty(self, product_id: int = None):
+        if product_id is None:
+            self._stale = True
+        else:
+            self._dirty.add(product_id)
+
+    @staticmethod
+    def _entries(product_id: int, values):
+        keys = set()
+        for field_no, text in enumerate(values):
+            for token in WORD_RE.findall((text or "").lower()):
+                keys.add((token, field_no, product_id))
+        return keys
+
+    def _remove(self, product_id: int) -> set:
+        values = self._products.pop(product_id, None)
+        self._tokens.pop(product_id, None)
+        if values is None:
+            return set()
+        return self._entries(product_id, values)
+
+    def _add(self, product_id: int, values) -> set:
+        self._products[product_id] = values
+        keys = self._entries(product_id, values)
+        self._tokens[product_id] = tuple({key[0] for key in keys})
+        return keys
+
+    def _apply(self, removed: set, added: set):
+        """Drop `removed` from `_keys` and merge in `added`, keeping it sorted.
+
+        A single product's edit is shifted in place. Larger batches (bulk
+        imports, bursts of catalog changes) find positions by bisect and
+        rebuild the list once from the slices between them, so they cost one
+        copy of the index rather than a list shift per key.
+        """
+        keys = self._keys
+        if len(removed) + len(added) <= PATCH_MAX:
+            for key in removed:
+                i = bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    del keys[i]
+            for key in added:
+                insort(keys, key)
+            return
+        if removed:
+            kept, start = [], 0
+            for i in sorted(bisect_left(keys, key) for key in removed):
+                kept += keys[start:i]
+                start = i + 1
+            kept += keys[start:]
+            keys = kept
+        if added:
+            merged, start = [], 0
+            for key in sorted(added):
+                i = bisect_left(keys, key, start)
+                merged += keys[start:i]
+                merged.append(key)
+                start = i
+            merged += keys[start:]
+            keys = merged
+        self._keys = keys
+
+    async def refresh(self):
+        """Apply pending changes: a full rebuild when stale, else only dirty ids."""
+        if self._stale:
+            self._dirty.clear()
+            self._stale = False
+            async with connection() as db:
+                cursor = await db.execute("SELECT id, name, category, material FROM products")
+                rows = await cursor.fetchall()
+            self._keys = []
+            self._products = {}
+            self._tokens = {}
+            for r in rows:
+                keys = self._entries(r[0], r[1:])
+                self._products[r[0]] = tuple(r[1:])
+                self._tokens[r[0]] = tuple({key[0] for key in keys})
+                self._keys.extend(keys)
+            self._keys.sort()
+            return
+        if not self._dirty:
+            return
+        ids = list(self._dirty)
+        self._dirty.clear()
+        placeholders = ",".join("?" * len(ids))
+        async with connection() as db:
+            cursor = await db.execute(
+                f"SELECT id, name, category, material FROM products WHERE id IN ({placeholders})", ids
+            )
+            rows = await cursor.fetchall()
+        removed, added = set(), set()
+        for pid in ids:
+            removed |= self._remove(pid)
+        for r in rows:
+            added |= self._add(r[0], tuple(r[1:]))
+        self._apply(removed - added, added - removed)
+
+    @property
+    def pending(self) -> bool:
+        return self._stale or bool(self._dirty)
+
+    def search(self, q: str, limit: int = 8):
+        """Products whose name/category/material words start with every query word.
+
+        Name matches come before category/material matches.
+        """
+        words = WORD_RE.findall(q.lower())
+        if not words:
+            return []
+        pivot = max(words, key=len)  # longest word gives the narrowest slice
+        others = list(words)
+        others.remove(pivot)
+        start = bisect_left(self._keys, (pivot,))
+        matches = {}  # product_id -> best field_no
+        for token, field_no, pid in self._keys[start:start + MAX_SCAN]:
+            if not token.startswith(pivot):
+                break
+            if field_no < matches.get(pid, len(SUGGEST_FIELDS)) and self._has_words(pid, others):
+                matches[pid] = field_no
+        ranked = sorted(matches.items(), key=lambda m: (m[1], (self._products[m[0]][0] or "").lower()))
+        return [self._suggestion(pid, field_no, words) for pid, field_no in ranked[:limit]]
+
+    def _has_words(self, product_id: int, words) -> bool:
+        tokens = self._tokens[product_id]
+        return all(any(t.startswith(w) for t in tokens) for w in words)
+
+    def _suggestion(self, product_id: int, field_no: int, words):
+        values = self._products[product_id]
+        text = values[field_no] or ""
+        return {
+            "id": product_id,
+            "name": values[0],
+            "field": SUGGEST_FIELDS[field_no],
+            "highlight": highlight(text, words),
+        }
+
+
+def highlight(text: str, words) -> str:
+    """HTML-escape `text`, wrapping word prefixes matching the query in <mark>."""
+    parts = []
+    pos = 0
+    for m in WORD_RE.finditer(text):
+        token = m.group().lower()
+        best = max((len(w) for w in words if token.startswith(w)), default=0)
+        if best:
+            parts.append(html.escape(text[pos:m.start()]))
+            parts.append("<mark>" + html.escape(text[m.start():m.start() + best]) + "</mark>")
+            pos = m.start() + best
+    parts.append(html.escape(text[pos:]))
+    return "".join(parts)
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,42 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# CPU-bound work (image resizing, PDF rendering, artwork analysis) runs here
+WORKER_PROCESSES = int(os.environ.get("WORKER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+_tasks = set()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES)
+    return _pool
+
+
+async def run_in_process(fn, *args, **kwargs):
+    """Run a picklable top-level function in the shared process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(fn, *args, **kwargs))
+
+
+def spawn(coro):
+    """Start a fire-and-forget task, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def shutdown():
+    global _pool
+    for task in list(_tasks):
+        task.cancel()
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -1,4 +1,5 @@
 import { BrowserRouter, Routes, Route, Navigate } from 'react-router-dom'
+import axios from 'axios'
 import Navbar from './components/Navbar'
 import Home from './pages/Home'
 import Recommend from './pages/Recommend'
@@ -6,6 +7,15 @@ import Login from './pages/Login'
 import Admin from './pages/Admin'
 import './index.css'
 
+// The API rejects expired admin tokens on every write: send the user back to login
+axios.interceptors.response.use(undefined, error => {
+  if (error.response?.status === 401 && localStorage.getItem('token')) {
+    localStorage.removeItem('token')
+    window.location.assign('/login')
+  }
+  return Promise.reject(error)
+})
+
 function ProtectedRoute({ children }) {
   const token = localStorage.getItem('token')
   return token ? children : <Navigate to="/login" replace />
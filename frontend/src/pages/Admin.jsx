@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import axios from 'axios'
 import { API, getImageUrl } from './Home'
@@ -141,6 +141,16 @@ function MethodImageUploader({ productId, methodKey, methodLabel, methodIcon, cu
     )
 }
 
+// Merge change-feed entries into the product list; tombstones remove
+function applyChanges(list, changes) {
+    const byId = new Map(list.map(p => [p.id, p]))
+    for (const c of changes) {
+        if (c.deleted) byId.delete(c.id)
+        else byId.set(c.id, c.product)
+    }
+    return [...byId.values()].sort((a, b) => a.id - b.id)
+}
+
 export default function Admin() {
     const navigate = useNavigate()
     const [products, setProducts] = useState([])
@@ -153,6 +163,7 @@ export default function Admin() {
     const [toast, setToast] = useState(null)
     const [deleteId, setDeleteId] = useState(null)
     const [activeSection, setActiveSection] = useState('details') // 'details' | 'images'
+    const sinceRef = useRef(null) // change-feed position the table is current to
 
     const token = localStorage.getItem('token')
     const headers = { Authorization: `Bearer ${token}` }
@@ -162,15 +173,47 @@ export default function Admin() {
     async function fetchProducts() {
         setLoading(true)
         try {
-            const params = search ? { search } : {}
-            const res = await axios.get(`${API}/api/products`, { params })
-            setProducts(res.data)
+            // Take the feed position first, so writes made during the load are replayed after it
+            sinceRef.current = search ? null : (await axios.get(`${API}/api/products/changes`)).data.next
+            // Follow the cursor so the admin table always shows every product
+            const all = []
+            let cursor = null
+            do {
+                const params = { limit: 500, ...(search ? { search } : {}), ...(cursor ? { cursor } : {}) }
+                const res = await axios.get(`${API}/api/products`, { params })
+                all.push(...res.data)
+                cursor = res.headers['x-next-cursor']
+            } while (cursor)
+            setProducts(all)
         } catch { showToast('Failed to load.', 'error') }
         finally { setLoading(false) }
     }
 
+    // Apply only what changed since the last load; searches and a lost feed position reload
+    async function syncProducts() {
+        if (search || sinceRef.current === null) return fetchProducts()
+        try {
+            let feed
+            do {
+                feed = (await axios.get(`${API}/api/products/changes`, { params: { since: sinceRef.current } })).data
+                if (feed.reset) return fetchProducts()
+                sinceRef.current = feed.next
+                const changes = feed.changes
+                setProducts(list => applyChanges(list, changes))
+            } while (feed.more)
+        } catch { return fetchProducts() }
+    }
+
     useEffect(() => { fetchProducts() }, [search])
 
+    // Live updates from other admins, tabs and imports
+    useEffect(() => {
+        if (search) return
+        const source = new EventSource(`${API}/api/products/changes/stream`)
+        source.addEventListener('changes', () => syncProducts())
+        return () => source.close()
+    }, [search])
+
     function openCreate() { setEditProduct(null); setForm(EMPTY_FORM); setActiveSection('details'); setShowModal(true) }
 
     function openEdit(p) {
@@ -197,7 +240,7 @@ export default function Admin() {
                 await axios.post(`${API}/api/products`, form, { headers })
                 showToast('Created! Open Edit to add images.')
             }
-            setShowModal(false); fetchProducts()
+            setShowModal(false); syncProducts()
         } catch { showToast('Failed to save.', 'error') }
         finally { setSaving(false) }
     }
@@ -343,7 +386,7 @@ export default function Admin() {
                                     <ImageUploader
                                         productId={editProduct.id}
                                         currentImage={form.image}
-                                        onUploaded={img => { setForm(f => ({ ...f, image: img })); fetchProducts() }}
+                                        onUploaded={img => { setForm(f => ({ ...f, image: img })); syncProducts() }}
                                     />
                                 </div>
 
@@ -395,7 +438,7 @@ export default function Admin() {
                             <div style={{ display: 'flex', gap: 10, justifyContent: 'center' }}>
                                 <button className="btn btn-ghost" onClick={() => setDeleteId(null)}>Cancel</button>
                                 <button id="confirm-delete" className="btn btn-danger" onClick={async () => {
-                                    try { await axios.delete(`${API}/api/products/${deleteId}`, { headers }); showToast('Deleted.'); setDeleteId(null); fetchProducts() }
+                                    try { await axios.delete(`${API}/api/products/${deleteId}`, { headers }); showToast('Deleted.'); setDeleteId(null); syncProducts() }
                                     catch { showToast('Failed.', 'error') }
                                 }}>Yes, Delete</button>
                             </div>
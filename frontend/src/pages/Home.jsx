@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import axios from 'axios'
 
@@ -25,10 +25,25 @@ export function getImageUrl(image) {
     return `${API}/uploads/${image}`
 }
 
+// WebP variants from an API `srcset` map ({ webp: "/uploads/… 320w, …" }) as an
+// <img srcSet>; undefined until the server has rendered them
+export function getSrcSet(srcset) {
+    if (!srcset?.webp) return undefined
+    return srcset.webp.split(', ').map(entry => `${API}${entry}`).join(', ')
+}
+
+// Rendered width of a grid card image (cards are 240px+ wide, full width on phones)
+const CARD_IMG_SIZES = '(max-width: 600px) 100vw, 320px'
+
+const METHOD_FIELDS = ['screen_printing', 'uv_printing', 'offset_printing', 'digital_printing',
+    'laser_engraving', 'dtg_dtf', 'embroidery', 'sublimation']
+
+// Only the columns the product grid renders
+const GRID_FIELDS = ['name', 'category', 'material', 'image', ...METHOD_FIELDS].join(',')
+const PAGE_SIZE = 60
+
 function countMethods(product) {
-    const fields = ['screen_printing', 'uv_printing', 'offset_printing', 'digital_printing',
-        'laser_engraving', 'dtg_dtf', 'embroidery', 'sublimation']
-    return fields.filter(f => product[f] && product[f].toUpperCase() !== 'NA').length
+    return METHOD_FIELDS.filter(f => product[f] && product[f].toUpperCase() !== 'NA').length
 }
 
 function SkeletonCard() {
@@ -48,34 +63,127 @@ function SkeletonCard() {
 export default function Home() {
     const [products, setProducts] = useState([])
     const [categories, setCategories] = useState([])
-    const [search, setSearch] = useState('')
+    const [query, setQuery] = useState('') // what is typed; drives the typeahead
+    const [search, setSearch] = useState('') // submitted term; drives the listing
+    const [suggestions, setSuggestions] = useState([])
+    const [activeSuggestion, setActiveSuggestion] = useState(-1)
     const [activeCategory, setActiveCategory] = useState('All')
     const [loading, setLoading] = useState(true)
+    const [nextCursor, setNextCursor] = useState(null)
+    const [loadingMore, setLoadingMore] = useState(false)
+    const [moreFailed, setMoreFailed] = useState(false) // stops scroll-triggered retries
+    const requestRef = useRef(0) // bumps on every new search, so stale pages are dropped
+    const sentinelRef = useRef(null)
+    const suggestRef = useRef(0) // drops typeahead responses that arrive out of order
     const navigate = useNavigate()
 
+    const fetchPage = useCallback(async (cursor) => {
+        const params = { fields: GRID_FIELDS, limit: PAGE_SIZE }
+        if (search) params.search = search
+        if (activeCategory !== 'All') params.category = activeCategory
+        if (cursor) params.cursor = cursor
+        const res = await axios.get(`${API}/api/products`, { params })
+        return { items: res.data, cursor: res.headers['x-next-cursor'] || null }
+    }, [search, activeCategory])
+
     const fetchProducts = useCallback(async () => {
+        const request = ++requestRef.current
         setLoading(true)
+        setMoreFailed(false)
         try {
-            const params = {}
-            if (search) params.search = search
-            if (activeCategory !== 'All') params.category = activeCategory
-            const res = await axios.get(`${API}/api/products`, { params })
-            setProducts(res.data)
+            const page = await fetchPage(null)
+            if (request !== requestRef.current) return
+            setProducts(page.items)
+            setNextCursor(page.cursor)
         } catch {
+            if (request !== requestRef.current) return
             setProducts([])
+            setNextCursor(null)
         } finally {
-            setLoading(false)
+            if (request === requestRef.current) setLoading(false)
         }
-    }, [search, activeCategory])
+    }, [fetchPage])
+
+    // Follow X-Next-Cursor one page at a time as the grid scrolls
+    const loadMore = useCallback(async () => {
+        if (!nextCursor || loadingMore) return
+        const request = requestRef.current
+        setLoadingMore(true)
+        setMoreFailed(false)
+        try {
+            const page = await fetchPage(nextCursor)
+            if (request !== requestRef.current) return
+            setProducts(prev => [...prev, ...page.items])
+            setNextCursor(page.cursor)
+        } catch {
+            if (request === requestRef.current) setMoreFailed(true) // keep the cursor; the button retries
+        } finally { setLoadingMore(false) }
+    }, [fetchPage, nextCursor, loadingMore])
 
     useEffect(() => {
         axios.get(`${API}/api/products/categories`).then(r => setCategories(r.data)).catch(() => { })
     }, [])
 
+    useEffect(() => { fetchProducts() }, [fetchProducts])
+
+    // Typeahead: /suggest is served from memory, so it is asked on every keystroke
+    const changeQuery = async (value) => {
+        setQuery(value)
+        setActiveSuggestion(-1)
+        const request = ++suggestRef.current
+        if (!value.trim()) { setSuggestions([]); return }
+        try {
+            const res = await axios.get(`${API}/api/products/suggest`, { params: { q: value } })
+            if (request === suggestRef.current) setSuggestions(res.data)
+        } catch {
+            if (request === suggestRef.current) setSuggestions([])
+        }
+    }
+
+    const closeSuggestions = () => {
+        suggestRef.current++
+        setSuggestions([])
+        setActiveSuggestion(-1)
+    }
+
+    const submitSearch = (e) => {
+        e.preventDefault()
+        if (activeSuggestion >= 0) {
+            navigate(`/recommend/${suggestions[activeSuggestion].id}`)
+            return
+        }
+        closeSuggestions()
+        setSearch(query.trim())
+    }
+
+    const clearSearch = () => {
+        closeSuggestions()
+        setQuery('')
+        setSearch('')
+    }
+
+    const onSearchKeyDown = (e) => {
+        if (!suggestions.length) return
+        if (e.key === 'ArrowDown') {
+            e.preventDefault()
+            setActiveSuggestion(i => (i + 1) % suggestions.length)
+        } else if (e.key === 'ArrowUp') {
+            e.preventDefault()
+            setActiveSuggestion(i => (i <= 0 ? suggestions.length : i) - 1)
+        } else if (e.key === 'Escape') {
+            closeSuggestions()
+        }
+    }
+
     useEffect(() => {
-        const t = setTimeout(fetchProducts, 280)
-        return () => clearTimeout(t)
-    }, [fetchProducts])
+        const sentinel = sentinelRef.current
+        if (loading || !sentinel || !nextCursor || moreFailed) return
+        const observer = new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting) loadMore()
+        }, { rootMargin: '400px' })
+        observer.observe(sentinel)
+        return () => observer.disconnect()
+    }, [loading, nextCursor, moreFailed, loadMore])
 
     return (
         <div className="page">
@@ -90,19 +198,39 @@ export default function Home() {
                     Select any promotional product and instantly discover compatible printing
                     techniques, color limits, and production timelines.
                 </p>
-                <div className="search-bar">
+                <form className="search-bar" onSubmit={submitSearch}>
                     <span className="search-icon">🔍</span>
                     <input
                         id="product-search"
                         type="text"
                         placeholder="Search products... e.g. Mug, Pen, T-Shirt"
-                        value={search}
-                        onChange={e => setSearch(e.target.value)}
+                        autoComplete="off"
+                        value={query}
+                        onChange={e => changeQuery(e.target.value)}
+                        onKeyDown={onSearchKeyDown}
+                        onBlur={closeSuggestions}
                     />
-                    {search && (
-                        <button className="btn btn-ghost btn-sm btn-icon" onClick={() => setSearch('')}>✕</button>
+                    {query && (
+                        <button type="button" className="btn btn-ghost btn-sm btn-icon" onClick={clearSearch}>✕</button>
                     )}
-                </div>
+                    {suggestions.length > 0 && (
+                        <ul className="suggest-list">
+                            {suggestions.map((s, i) => (
+                                <li
+                                    key={s.id}
+                                    className={`suggest-item ${i === activeSuggestion ? 'active' : ''}`}
+                                    // mousedown fires before the input's blur closes the list
+                                    onMouseDown={e => { e.preventDefault(); navigate(`/recommend/${s.id}`) }}
+                                    onMouseEnter={() => setActiveSuggestion(i)}
+                                >
+                                    {/* highlight is HTML-escaped by the API apart from its <mark> tags */}
+                                    <span dangerouslySetInnerHTML={{ __html: s.highlight }} />
+                                    {s.field !== 'name' && <span className="suggest-name">{s.name}</span>}
+                                </li>
+                            ))}
+                        </ul>
+                    )}
+                </form>
                 <div className="filter-pills">
                     {['All', ...categories].map(cat => (
                         <button
@@ -120,10 +248,10 @@ export default function Home() {
             {/* STATS */}
             <div className="stats-bar">
                 <p>
-                    {loading ? 'Loading...' : <><strong>{products.length}</strong> products found</>}
+                    {loading ? 'Loading...' : <><strong>{products.length}{nextCursor ? '+' : ''}</strong> products found</>}
                 </p>
                 {(activeCategory !== 'All' || search) && (
-                    <button className="btn btn-ghost btn-sm" onClick={() => { setActiveCategory('All'); setSearch('') }}>
+                    <button className="btn btn-ghost btn-sm" onClick={() => { setActiveCategory('All'); clearSearch() }}>
                         ✕ Clear filters
                     </button>
                 )}
@@ -152,6 +280,8 @@ export default function Home() {
                                     <div className="product-card-img-wrap">
                                         <img
                                             src={getImageUrl(p.image)}
+                                            srcSet={getSrcSet(p.image_srcset)}
+                                            sizes={CARD_IMG_SIZES}
                                             alt={p.name}
                                             className="product-card-img"
                                             onError={e => { e.target.style.display = 'none'; e.target.nextSibling.style.display = 'flex' }}
@@ -177,6 +307,14 @@ export default function Home() {
                         ))
                 }
             </div>
+
+            {!loading && nextCursor && (
+                <div ref={sentinelRef} style={{ display: 'flex', justifyContent: 'center', margin: '24px 0' }}>
+                    <button className="btn btn-ghost btn-sm" onClick={loadMore} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : moreFailed ? 'Retry' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </div>
     )
 }
@@ -1,7 +1,7 @@
 import { useEffect, useState, useRef, useCallback } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import axios from 'axios'
-import { API, getIcon, getImageUrl } from './Home'
+import { API, getIcon, getImageUrl, getSrcSet } from './Home'
 
 const METHOD_ICONS = {
     'Screen Printing': '🖨️',
@@ -134,6 +134,7 @@ export default function Recommend() {
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState(null)
     const [lightbox, setLightbox] = useState(null) // { images: [], startIndex: 0 }
+    const [srcsets, setSrcsets] = useState({}) // image key ("product" or method key) -> srcSet
 
     useEffect(() => {
         setLoading(true)
@@ -141,6 +142,11 @@ export default function Recommend() {
             .then(r => setData(r.data))
             .catch(() => setError('Product not found.'))
             .finally(() => setLoading(false))
+        // Resized variants for the header and method cards; the lightbox keeps the originals
+        setSrcsets({})
+        axios.get(`${API}/api/products/${id}/images`)
+            .then(r => setSrcsets(Object.fromEntries(r.data.map(img => [img.key, getSrcSet(img.srcset)]))))
+            .catch(() => { })
     }, [id])
 
     // Prevent body scroll when lightbox is open
@@ -196,7 +202,7 @@ export default function Recommend() {
             <div className="recommend-header">
                 {imgUrl ? (
                     <div className="recommend-header-img-wrap" onClick={() => setLightbox({ images: [{ url: imgUrl, label: product.name }], startIndex: 0 })} style={{ cursor: 'zoom-in' }}>
-                        <img src={imgUrl} alt={product.name} className="recommend-header-img"
+                        <img src={imgUrl} srcSet={srcsets.product} sizes="110px" alt={product.name} className="recommend-header-img"
                             onError={e => { e.target.style.display = 'none'; e.target.parentElement.innerHTML = `<div class="recommend-header-icon">${catIcon}</div>` }} />
                         <div className="lightbox-zoom-hint">🔍</div>
                     </div>
@@ -223,6 +229,7 @@ export default function Recommend() {
                                 key={m.method}
                                 method={m}
                                 productImg={imgUrl}
+                                srcSet={srcsets[m.method_key] || (m.method_image ? undefined : srcsets.product)}
                                 onImageClick={() => openLightbox(m.method_key)}
                             />
                         ))}
@@ -255,7 +262,7 @@ export default function Recommend() {
 }
 
 // ─── Method Card ─────────────────────────────────────────────────────────────
-function MethodCard({ method, productImg, onImageClick }) {
+function MethodCard({ method, productImg, srcSet, onImageClick }) {
     const available = method.available
     const methodImgUrl = method.method_image ? getImageUrl(method.method_image) : null
     const displayImg = methodImgUrl || (available ? productImg : null)
@@ -270,6 +277,8 @@ function MethodCard({ method, productImg, onImageClick }) {
                 >
                     <img
                         src={displayImg}
+                        srcSet={srcSet}
+                        sizes="(max-width: 700px) 100vw, 400px"
                         alt={method.method}
                         className="method-card-img"
                         onError={e => e.target.parentElement.style.display = 'none'}
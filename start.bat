@@ -11,7 +11,8 @@ echo  Starting Backend  (FastAPI on http://localhost:8000) ...
 echo  Starting Frontend (React  on http://localhost:5173) ...
 echo.
 
-:: Start Backend in a new window
+:: Start Backend in a new window (single auto-reloading dev server;
+:: for multiple worker processes use gunicorn.conf.py, see README)
 start "PrintSpec Backend" cmd /k "cd /d "d:\Specification System\backend" && python -m uvicorn main:app --port 8000 --reload"
 
 :: Wait 3 seconds for backend to initialize